@@ -0,0 +1,75 @@
+"""Add canonical pair key and unique index to vote
+
+Revision ID: 3c9e1f2a7b40
+Revises: d73584c88322
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "3c9e1f2a7b40"
+down_revision: Union[str, Sequence[str], None] = "d73584c88322"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _kept(alias: str) -> str:
+    """Condición SQL: el voto sobrevive a la deduplicación (anónimo o el primero del par)."""
+    return (
+        f"({alias}.voter_id IS NULL OR {alias}.id IN ("
+        "SELECT MIN(id) FROM vote WHERE voter_id IS NOT NULL GROUP BY voter_id, pair_lo, pair_hi))"
+    )
+
+
+def upgrade() -> None:
+    op.add_column("vote", sa.Column("pair_lo", sa.Integer(), nullable=True))
+    op.add_column("vote", sa.Column("pair_hi", sa.Integer(), nullable=True))
+
+    # Backfill portable (Postgres y SQLite)
+    op.execute(
+        """
+        UPDATE vote SET
+            pair_lo = CASE WHEN winner_id < loser_id THEN winner_id ELSE loser_id END,
+            pair_hi = CASE WHEN winner_id < loser_id THEN loser_id ELSE winner_id END
+        """
+    )
+
+    # Votos duplicados anteriores (carrera del pre-SELECT): se conserva el primero.
+    # Antes de borrarlos, los contadores de los perfiles afectados se recalculan
+    # con los votos que se quedan
+    op.execute(
+        f"""
+        UPDATE profile SET
+            voted_count = (
+                SELECT COUNT(*) FROM vote v
+                WHERE (v.winner_id = profile.id OR v.loser_id = profile.id) AND {_kept("v")}
+            ),
+            win_count = (
+                SELECT COUNT(*) FROM vote v
+                WHERE v.winner_id = profile.id AND {_kept("v")}
+            )
+        WHERE id IN (
+            SELECT winner_id FROM vote WHERE NOT {_kept("vote")}
+            UNION
+            SELECT loser_id FROM vote WHERE NOT {_kept("vote")}
+        )
+        """
+    )
+    op.execute(f"DELETE FROM vote WHERE NOT {_kept('vote')}")
+
+    with op.batch_alter_table("vote") as batch_op:
+        batch_op.alter_column("pair_lo", existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column("pair_hi", existing_type=sa.Integer(), nullable=False)
+
+    op.create_index("uq_vote_voter_pair", "vote", ["voter_id", "pair_lo", "pair_hi"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("uq_vote_voter_pair", table_name="vote")
+    with op.batch_alter_table("vote") as batch_op:
+        batch_op.drop_column("pair_hi")
+        batch_op.drop_column("pair_lo")
@@ -0,0 +1,56 @@
+"""Add season-scoped profile ratings
+
+Revision ID: 7a4d2c9e5b13
+Revises: 3c9e1f2a7b40
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "7a4d2c9e5b13"
+down_revision: Union[str, Sequence[str], None] = "3c9e1f2a7b40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("profile") as batch_op:
+        batch_op.add_column(sa.Column("rating_season_id", sa.Integer(), nullable=True))
+        batch_op.create_foreign_key("fk_profile_rating_season_id", "season", ["rating_season_id"], ["id"])
+    op.create_index(op.f("ix_profile_rating_season_id"), "profile", ["rating_season_id"], unique=False)
+
+    # Los ratings actuales pertenecen a la temporada activa (si la hay)
+    op.execute(
+        """
+        UPDATE profile SET rating_season_id = (
+            SELECT id FROM season WHERE is_active ORDER BY id DESC LIMIT 1
+        )
+        """
+    )
+
+    op.create_table(
+        "profile_season_rating",
+        sa.Column("season_id", sa.Integer(), nullable=False),
+        sa.Column("profile_id", sa.Integer(), nullable=False),
+        sa.Column("elo_score", sa.Integer(), nullable=False),
+        sa.Column("voted_count", sa.Integer(), nullable=False),
+        sa.Column("win_count", sa.Integer(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.text("(CURRENT_TIMESTAMP)"), nullable=True),
+        sa.ForeignKeyConstraint(["profile_id"], ["profile.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["season_id"], ["season.id"]),
+        sa.PrimaryKeyConstraint("season_id", "profile_id"),
+    )
+    op.create_index(op.f("ix_profile_season_rating_profile_id"), "profile_season_rating", ["profile_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_profile_season_rating_profile_id"), table_name="profile_season_rating")
+    op.drop_table("profile_season_rating")
+    op.drop_index(op.f("ix_profile_rating_season_id"), table_name="profile")
+    with op.batch_alter_table("profile") as batch_op:
+        batch_op.drop_constraint("fk_profile_rating_season_id", type_="foreignkey")
+        batch_op.drop_column("rating_season_id")
@@ -0,0 +1,35 @@
+"""Add profile random_key for database-side pair sampling
+
+Revision ID: b8e5f1c3d920
+Revises: 7a4d2c9e5b13
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "b8e5f1c3d920"
+down_revision: Union[str, Sequence[str], None] = "7a4d2c9e5b13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("profile", sa.Column("random_key", sa.Float(), nullable=True))
+
+    # random() devuelve [0, 1) en Postgres y un entero de 64 bits en SQLite
+    if op.get_bind().dialect.name == "sqlite":
+        op.execute("UPDATE profile SET random_key = (random() / 18446744073709551616.0) + 0.5")
+    else:
+        op.execute("UPDATE profile SET random_key = random()")
+
+    op.create_index("ix_profile_pool_random", "profile", ["type", "gender", "random_key"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_profile_pool_random", table_name="profile")
+    with op.batch_alter_table("profile") as batch_op:
+        batch_op.drop_column("random_key")
@@ -0,0 +1,27 @@
+"""Index profile elo_score
+
+Revision ID: e4b7a9c2d615
+Revises: b8e5f1c3d920
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e4b7a9c2d615"
+down_revision: Union[str, Sequence[str], None] = "b8e5f1c3d920"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Los ratings de temporadas pasadas no se tocan aquí: se leen como
+    # iniciales y los archiva RatingService.reset_stale en segundo plano
+    op.create_index(op.f("ix_profile_elo_score"), "profile", ["elo_score"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_profile_elo_score"), table_name="profile")
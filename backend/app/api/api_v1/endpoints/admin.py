@@ -1,6 +1,6 @@
 from typing import Any, List
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
@@ -8,7 +8,18 @@ from app import models, schemas
 from app.api import deps
 from app.models.profile import Profile
 from app.models.comment import Comment
+from app.api.api_v1.endpoints.profiles import participation_cache
+from app.core.cache import cache_stats
 from app.services.season_service import season_service
+from app.services.ranking_service import ranking_service
+from app.services.leaderboard_service import leaderboard_service
+from app.services.pair_service import pair_service
+from app.services.profile_card_service import profile_card_service
+from app.services.vote_ingestion import vote_ingestion_service
+from app.services.badge_events import badge_event_service
+from app.services.badge_service import badge_service
+from app.services.badge_sweep import badge_sweep_service
+from app.services.rating_service import rating_service
 
 router = APIRouter()
 
@@ -48,14 +59,11 @@ async def approve_profile(
     profile.is_approved = True
     await db.commit()
     await db.refresh(profile)
-    try:
-        from app.core.redis_client import redis_client
-        if redis_client:
-            for key in redis_client.scan_iter("ranking:*"):
-                redis_client.delete(key)
-            redis_client.delete(f"participation:{profile.user_id}")
-    except Exception:
-        pass
+    await ranking_service.invalidate_profiles(profile)
+    await leaderboard_service.sync_profiles(profile)
+    await profile_card_service.invalidate(profile.id)
+    await pair_service.sync_pools(profile)
+    await participation_cache.delete(participation_cache.key(profile.user_id))
     return profile
 
 @router.post("/{profile_id}/reject")
@@ -74,26 +82,119 @@ async def reject_profile(
     
     profile.is_active = False
     await db.commit()
-    try:
-        from app.core.redis_client import redis_client
-        if redis_client:
-            redis_client.delete(f"participation:{profile.user_id}")
-    except Exception:
-        pass
+    await ranking_service.invalidate_profiles(profile)
+    await leaderboard_service.sync_profiles(profile)
+    await profile_card_service.invalidate(profile.id)
+    await pair_service.sync_pools(profile)
+    await participation_cache.delete(participation_cache.key(profile.user_id))
     return {"status": "rejected"}
 
 @router.post("/season/reset", response_model=List[schemas.Profile])
 async def reset_season(
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(deps.get_async_db),
     admin_user: models.User = Depends(check_admin)
 ):
     """
     Manually trigger season reset (award badges + reset ELO).
+    Only the active season changes here: past ratings read as the initial
+    ones right away, and the leaderboard reload and the archive/reset of
+    the old rows run after the response.
     """
     next_season_name = f"Season_{datetime.now().strftime('%Y_%m_%d_%H%M')}"
     winners = await season_service.async_reset_rankings_and_award_badges(db, next_season_name)
+    season = await season_service.get_active_season(db)
+    rebuild = await leaderboard_service.is_ready()
+    if rebuild:
+        await leaderboard_service.mark_stale()
+    await ranking_service.invalidate_ranking_cache()
+    await profile_card_service.clear()
+    await badge_event_service.reset_thresholds()
+    await badge_service.invalidate_user_badges(*{p.user_id for p in winners if p.user_id})
+    background_tasks.add_task(season_service.finish_rollover, season.id, rebuild)
     return winners
 
+@router.post("/season/ratings/reset")
+async def reset_stale_ratings(
+    chunk_size: int = 1000,
+    restart: bool = False,
+    max_chunks: int = 0,
+    db: AsyncSession = Depends(deps.get_async_db),
+    admin_user: models.User = Depends(check_admin)
+):
+    """
+    Archive and reset the ratings left from past seasons, in chunks.
+    Resumes from the last checkpoint unless restart=true.
+    """
+    season = await season_service.get_active_season(db)
+    if not season:
+        raise HTTPException(status_code=404, detail="No active season")
+    return await rating_service.reset_stale(
+        db, season.id, chunk_size=chunk_size, restart=restart, max_chunks=max_chunks or None
+    )
+
+@router.get("/votes/ingestion")
+async def get_vote_ingestion_metrics(
+    admin_user: models.User = Depends(check_admin)
+):
+    """
+    Lag and throughput metrics of the write-behind vote queue.
+    """
+    return await vote_ingestion_service.metrics()
+
+@router.get("/badges/events")
+async def get_badge_event_metrics(
+    admin_user: models.User = Depends(check_admin)
+):
+    """
+    Backlog and throughput metrics of the badge evaluation worker.
+    """
+    return await badge_event_service.metrics()
+
+@router.post("/badges/sweep")
+async def sweep_badges(
+    chunk_size: int = 1000,
+    restart: bool = False,
+    db: AsyncSession = Depends(deps.get_async_db),
+    admin_user: models.User = Depends(check_admin)
+):
+    """
+    Award every earned ranking badge for the active season in one pass over the ranking.
+    Resumes from the last checkpoint unless restart=true.
+    """
+    return await badge_sweep_service.sweep(db, chunk_size=chunk_size, restart=restart)
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    admin_user: models.User = Depends(check_admin)
+):
+    """
+    Hit/miss/latency counters of every cache namespace for this worker.
+    """
+    return cache_stats()
+
+@router.post("/leaderboard/rebuild")
+async def rebuild_leaderboard(
+    db: AsyncSession = Depends(deps.get_async_db),
+    admin_user: models.User = Depends(check_admin)
+):
+    """
+    Reload the Redis leaderboard sorted sets from the database.
+    """
+    loaded = await leaderboard_service.rebuild(db)
+    return {"loaded": loaded, "ready": await leaderboard_service.is_ready()}
+
+@router.post("/pairs/pools/rebuild")
+async def rebuild_pair_pools(
+    db: AsyncSession = Depends(deps.get_async_db),
+    admin_user: models.User = Depends(check_admin)
+):
+    """
+    Reload the Redis candidate pools used for pair selection from the database.
+    """
+    loaded = await pair_service.rebuild_pools(db)
+    return {"loaded": loaded, "ready": await pair_service.pools_ready()}
+
 @router.delete("/comments/{comment_id}", status_code=status.HTTP_200_OK)
 async def delete_comment(
     comment_id: int,
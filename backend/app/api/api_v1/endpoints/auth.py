@@ -10,7 +10,6 @@ from app import schemas, models
 from app.api import deps
 from app.core import security
 from app.core.config import settings
-from app.core.redis_client import redis_client
 
 router = APIRouter()
 
@@ -44,15 +43,16 @@ async def login_access_token(
 async def refresh_token(
     req: schemas.RefreshTokenRequest,
     db: Session = Depends(deps.get_db),
+    redis=Depends(deps.get_redis),
 ) -> Any:
     """
     Refrescar token de acceso
     """
     try:
         # Validar blacklist en Redis antes de decodificar
-        if redis_client:
+        if redis:
             try:
-                if redis_client.get(f"token:blacklist:{req.refresh_token}"):
+                if await redis.get(f"token:blacklist:{req.refresh_token}"):
                     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Token revocado")
             except Exception:
                 pass
@@ -97,19 +97,20 @@ async def refresh_token(
 @router.post("/logout", response_model=schemas.Msg)
 async def logout(
     req: schemas.RefreshTokenRequest,
+    redis=Depends(deps.get_redis),
 ) -> Any:
     """
     Logout: revocar refresh token para evitar nuevos accesos.
     Opcionalmente, los access tokens activos expiran pronto; se puede colocar también en blacklist si se desea.
     """
     try:
-        if redis_client:
+        if redis:
             try:
                 # Calcular expiración restante del token para usarla como TTL
                 payload = jwt.decode(req.refresh_token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
                 exp = payload.get("exp")
                 ttl = max(int(exp - (__import__("time").time())), 1) if exp else settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
-                redis_client.setex(f"token:blacklist:{req.refresh_token}", ttl, "1")
+                await redis.setex(f"token:blacklist:{req.refresh_token}", ttl, "1")
             except Exception:
                 # Si hay error con Redis o decode, continuar sin bloquear
                 pass
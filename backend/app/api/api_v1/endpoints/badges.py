@@ -17,8 +17,11 @@ async def get_badge_progress(
     """
     Obtiene el mejor ranking actual del usuario para mostrar progreso.
     """
-    best_rank = await badge_service.get_best_rank(db, current_user.id)
-    return {"best_rank": best_rank}
+    best = await badge_service.get_best_rank_entry(db, current_user.id)
+    return {
+        "best_rank": best["rank"] if best else None,
+        "percentile": best["percentile"] if best else None,
+    }
 
 @router.get("/", response_model=List[schemas.Badge])
 async def read_badges(
@@ -45,21 +48,9 @@ async def read_user_badges(
     """
     Retrieve badges for current user.
     """
-    # Check for new badges based on current ranking
-    # In a real app, this might be async or triggered by events, 
-    # but for simplicity/responsiveness we check on profile view.
-    try:
-        await badge_service.check_and_award_badges(db, current_user.id)
-    except Exception as e:
-        print(f"Error checking badges: {e}")
-        
-    query = select(models.UserBadge).filter(models.UserBadge.user_id == current_user.id)
-    # Eager load badge info
-    from sqlalchemy.orm import selectinload
-    query = query.options(selectinload(models.UserBadge.badge))
-    
-    result = await db.execute(query)
-    return result.scalars().all()
+    # Lectura pura y cacheada: las badges nuevas las otorga el worker de
+    # eventos (cruces de umbral en el voto) o POST /badges/check.
+    return await badge_service.get_user_badges(db, current_user.id)
 
 @router.post("/check", status_code=200)
 async def check_badges(
@@ -1,11 +1,9 @@
-import asyncio
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import update, func
 from jose import jwt
 from app.core.config import settings
-from app.core.redis_client import redis_client
 from app.api import deps
 from app import models, schemas
 
@@ -13,7 +11,7 @@ router = APIRouter()
 
 
 @router.websocket("/ws/notifications")
-async def websocket_notifications(websocket: WebSocket):
+async def websocket_notifications(websocket: WebSocket, redis=Depends(deps.get_redis)):
     """
     WebSocket de notificaciones.
     Requiere token JWT en query param: ?token=...
@@ -33,19 +31,19 @@ async def websocket_notifications(websocket: WebSocket):
         await websocket.close(code=1008)
         return
 
-    if not redis_client:
+    if not redis:
         # Si Redis no está disponible, cerrar con código de política
         await websocket.close(code=1011)
         return
 
-    pubsub = redis_client.pubsub()
+    pubsub = redis.pubsub()
     channel = f"notifications:{user_id}"
-    pubsub.subscribe(channel)
+    await pubsub.subscribe(channel)
 
     try:
-        # Bucle principal: sondeo de pubsub no bloqueante
+        # Bucle principal: get_message espera hasta 1 s sin bloquear el event loop
         while True:
-            message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
             if message and "data" in message:
                 try:
                     data = message["data"]
@@ -54,9 +52,6 @@ async def websocket_notifications(websocket: WebSocket):
                     await websocket.send_text(data)
                 except Exception:
                     break
-            else:
-                # Pequeña espera para ceder el control y evitar alto uso de CPU
-                await asyncio.sleep(0.3)
     except WebSocketDisconnect:
         pass
     except Exception:
@@ -64,7 +59,7 @@ async def websocket_notifications(websocket: WebSocket):
         pass
     finally:
         try:
-            pubsub.close()
+            await pubsub.aclose()
         except Exception:
             pass
 
@@ -77,13 +72,15 @@ async def list_my_notifications(
     db: AsyncSession = Depends(deps.get_async_db),
     current_user: models.User = Depends(deps.get_current_user_async),
 ):
-    q = select(models.Notification).filter(models.Notification.user_id == current_user.id)
+    # Solo las columnas de schemas.Notification, como filas planas (sin ORM)
+    N = models.Notification
+    q = select(N.id, N.user_id, N.type, N.payload, N.is_read, N.created_at).filter(N.user_id == current_user.id)
     if unread_only:
-        q = q.filter(models.Notification.is_read == False)
-    q = q.order_by(models.Notification.created_at.desc()).offset(offset).limit(limit)
+        q = q.filter(N.is_read == False)
+    q = q.order_by(N.created_at.desc()).offset(offset).limit(limit)
 
     result = await db.execute(q)
-    items = result.scalars().all()
+    items = result.mappings().all()
 
     count_q = select(func.count(models.Notification.id)).filter(models.Notification.user_id == current_user.id)
     if unread_only:
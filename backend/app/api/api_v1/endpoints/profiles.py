@@ -1,6 +1,6 @@
 from typing import List, Any, Optional
-import json
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+import orjson
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response, status, UploadFile, File, Form
 from fastapi.encoders import jsonable_encoder
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
@@ -14,120 +14,126 @@ from app.api.deps import get_async_db
 from app.models.profile import Profile, ProfileType, Gender
 from app.models.comment import Comment
 from app.services.storage import storage_service
-from app.core.redis_client import redis_client
+from app.core.cache import CacheNamespace, cached
+from app.core.config import settings
+from app.services.ranking_service import ranking_cache, ranking_service
+from app.services.leaderboard_service import leaderboard_service
+from app.services.rating_service import rating_service
+from app.services.pair_service import pair_service, NoMorePairs, PairMode
+from app.services.profile_card_service import profile_card_service
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-def _invalidate_ranking_cache():
-    if redis_client:
-        try:
-            for key in redis_client.scan_iter("ranking:*"):
-                redis_client.delete(key)
-        except Exception:
-            pass
+participation_cache = CacheNamespace("participation", ttl=30)
+
+
+async def _invalidate_participation_cache(user_id: int):
+    await participation_cache.delete(participation_cache.key(user_id))
+
+
+async def _load_pairs(db: AsyncSession, pairs: List[List[int]]) -> List[List[dict]]:
+    """Tarjetas de los perfiles de varios pares; descarta los que ya no están disponibles."""
+    cards = await profile_card_service.get_many(db, [pid for pair in pairs for pid in pair])
+    by_id = {pid: c for pid, c in cards.items() if c["is_active"] and c["is_approved"]}
+    return [[by_id[a], by_id[b]] for a, b in pairs if a in by_id and b in by_id]
 
-def _invalidate_participation_cache(user_id: int):
-    if redis_client:
-        try:
-            redis_client.delete(f"participation:{user_id}")
-        except Exception:
-            pass
 
 @router.get("/pair", response_model=List[schemas.Profile])
 async def get_random_pair(
+    background_tasks: BackgroundTasks,
     type: ProfileType = ProfileType.REAL,
     gender: Gender = Gender.FEMALE,
     category_id: Optional[int] = None,
+    mode: PairMode = PairMode.RANDOM,
     db: AsyncSession = Depends(get_async_db),
     current_user: Optional[models.User] = Depends(deps.get_current_user_optional_async)
 ):
     """
     Obtener dos perfiles aleatorios del mismo tipo y género para comparar.
+    Con mode=close el rival tiene un ELO cercano al del primero; con
+    mode=explore salen más a menudo los perfiles con pocos votos.
+    """
+    pairs = await get_pairs(background_tasks, 1, type, gender, category_id, mode, db, current_user)
+    return pairs[0]
+
+
+@router.get("/pairs", response_model=List[List[schemas.Profile]])
+async def get_pairs(
+    background_tasks: BackgroundTasks,
+    count: int = 5,
+    type: ProfileType = ProfileType.REAL,
+    gender: Gender = Gender.FEMALE,
+    category_id: Optional[int] = None,
+    mode: PairMode = PairMode.RANDOM,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[models.User] = Depends(deps.get_current_user_optional_async)
+):
+    """
+    Obtener varios emparejamientos de una vez. Para usuarios autenticados
+    salen de su cola de pares pregenerados, que se rellena en segundo plano.
     """
     # Forzar tipo REAL por ahora según requerimientos
     type = ProfileType.REAL
-    
-    query = select(Profile).filter(
-        Profile.type == type,
-        Profile.gender == gender,
-        Profile.is_active == True,
-        Profile.is_approved == True
-    )
-    
-    if category_id:
-        query = query.filter(Profile.category_id == category_id)
-
-    # Optimización: Obtener IDs candidatos
-    import random
-    
-    # Obtener solo los IDs que cumplen los criterios
-    # En async, seleccionamos solo la columna ID
-    id_query = query.with_only_columns(Profile.id)
-    cache_key = f"pair_candidates:{type}:{gender}:{category_id or 'none'}"
-    candidate_ids = None
-    if redis_client:
+    count = max(1, min(count, settings.PAIR_MAX_BATCH))
+    user_id = current_user.id if current_user else None
+
+    profiles: List[List[dict]] = []
+    remaining = None
+    # Si todos los pares caen al cargar las tarjetas (perfil desactivado o sin
+    # aprobar desde que se encoló o muestreó) se piden otros una vez más; el
+    # 404 solo lo decide el pool
+    for _ in range(2):
         try:
-            cached = redis_client.get(cache_key)
-            if cached:
-                candidate_ids = json.loads(cached)
-        except Exception:
-            pass
-    if not candidate_ids:
-        result = await db.execute(id_query)
-        candidate_ids = result.scalars().all()
-        if redis_client and candidate_ids:
-            try:
-                redis_client.setex(cache_key, 30, json.dumps(candidate_ids))
-            except Exception:
-                pass
-    
-    if len(candidate_ids) < 2:
-        raise HTTPException(status_code=404, detail="No hay suficientes perfiles para comparar")
-
-    selected_ids = None
-
-    if current_user:
-        from app.models.vote import Vote
-
-        id_set = set(candidate_ids)
-        votes_rows = await db.execute(
-            select(Vote.winner_id, Vote.loser_id).filter(Vote.voter_id == current_user.id)
-        )
-        voted_pairs = set()
-        for w, l in votes_rows.all():
-            if w in id_set and l in id_set and w != l:
-                voted_pairs.add((w, l) if w < l else (l, w))
-
-        total_pairs = len(candidate_ids) * (len(candidate_ids) - 1) // 2
-        if total_pairs > 0 and len(voted_pairs) >= total_pairs:
+            pairs, remaining = await pair_service.next_pairs(db, user_id, type, gender, category_id, count, mode)
+        except NoMorePairs:
+            pool = await pair_service.candidate_pool(db, type, gender, category_id)
+            if len(pool) < 2:
+                raise HTTPException(status_code=404, detail="No hay suficientes perfiles para comparar")
             raise HTTPException(
                 status_code=404,
                 detail="¡No hay más emparejamientos para votar! Ya los has visto todos."
             )
+        profiles = await _load_pairs(db, pairs)
+        if profiles:
+            break
+    else:
+        raise HTTPException(status_code=503, detail="No se pudieron cargar emparejamientos, inténtalo de nuevo")
 
-        for _ in range(60):
-            a, b = random.sample(candidate_ids, 2)
-            pair = (a, b) if a < b else (b, a)
-            if pair not in voted_pairs:
-                selected_ids = [a, b]
-                break
+    if remaining is not None and remaining < settings.PAIR_PREFETCH_SIZE // 2:
+        background_tasks.add_task(pair_service.refill_in_background, user_id, type, gender, category_id, mode)
+    return profiles
 
-        if not selected_ids:
-            raise HTTPException(
-                status_code=404,
-                detail="¡No hay más emparejamientos para votar! Ya los has visto todos."
-            )
-    else:
-        selected_ids = random.sample(candidate_ids, 2)
 
-    profiles_query = select(Profile).filter(Profile.id.in_(selected_ids))
-    result = await db.execute(profiles_query)
-    profiles = result.scalars().all()
+@router.get("/", response_model=schemas.ProfileBatch)
+async def get_profiles_batch(
+    ids: str = Query(..., description="Ids separados por comas"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    """
+    Varios perfiles en una petición (p. ej. los profile_id de las
+    notificaciones). Se leen de las tarjetas de perfil y los fallos se cargan
+    con una sola consulta; la respuesta respeta el orden pedido.
+    """
+    try:
+        requested = [int(x) for x in ids.split(",") if x.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Lista de ids inválida")
+    if not requested:
+        raise HTTPException(status_code=400, detail="Se requiere al menos un id")
+    if len(requested) > settings.PROFILE_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"Máximo {settings.PROFILE_BATCH_MAX} ids por petición")
+
+    cards = await profile_card_service.get_many(db, requested)
+    # Los perfiles pendientes de moderación, desactivados o que dejaron el juego no son públicos
+    visible = {pid: c for pid, c in cards.items() if c["is_active"] and c["is_approved"]}
+    return {
+        "items": [{"id": pid, "found": pid in visible, "profile": visible.get(pid)} for pid in requested],
+        "missing": [pid for pid in dict.fromkeys(requested) if pid not in visible],
+    }
 
-    return profiles
 
 @router.post("/", response_model=Any)
 async def create_profile(
@@ -269,8 +275,11 @@ async def upload_profile_direct(
     db.add(db_obj)
     await db.commit()
     await db.refresh(db_obj)
-    _invalidate_ranking_cache()
-    _invalidate_participation_cache(current_user.id)
+    await ranking_service.invalidate_profiles(db_obj)
+    await leaderboard_service.sync_profiles(db_obj)
+    await profile_card_service.invalidate(db_obj.id)
+    await pair_service.sync_pools(db_obj)
+    await _invalidate_participation_cache(current_user.id)
     
     try:
         logger.info(f"participation_status_changed user_id={current_user.id} profile_id={db_obj.id} action=create_approved")
@@ -302,38 +311,29 @@ async def get_participation_status(
     db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(deps.get_current_user_async)
 ):
-    cache_key = f"participation:{current_user.id}"
-    if redis_client:
-        try:
-            cached = redis_client.get(cache_key)
-            if cached:
-                return json.loads(cached)
-        except Exception:
-            pass
+    return await _participation_status(db, current_user.id)
+
 
+@cached(participation_cache, key=lambda db, user_id: (user_id,))
+async def _participation_status(db: AsyncSession, user_id: int) -> dict:
     result = await db.execute(
         select(Profile.id).filter(
-            Profile.user_id == current_user.id,
+            Profile.user_id == user_id,
             Profile.is_active == True,
             Profile.is_approved == True,
         )
     )
     active_id = result.scalars().first()
-    data = {
+    return {
         "participating": bool(active_id),
         "active_profile_id": active_id,
         "can_upload": not bool(active_id),
         "message": "Participando en el ranking" if active_id else "Sin foto activa en el ranking"
     }
-    if redis_client:
-        try:
-            redis_client.setex(cache_key, 30, json.dumps(data))
-        except Exception:
-            pass
-    return data
 
 @router.get("/ranking", response_model=List[schemas.Profile])
 async def get_ranking(
+    request: Request,
     type: ProfileType = ProfileType.REAL,
     gender: Gender = None,
     category_id: Optional[int] = None,
@@ -342,20 +342,37 @@ async def get_ranking(
 ):
     """
     Obtener los perfiles mejor calificados.
+    Caché primero: bytes finales ya comprimidos (un solo viaje a Redis). En un
+    fallo la rellena el leaderboard de Redis si está cargado, si no la BD;
+    los perfiles ya vienen validados con schemas.Profile y se responden tal cual.
     """
-    # Generación de clave de caché
-    cache_key = f"ranking:{type}:{gender}:{category_id}:{limit}"
-    
-    # Intentar obtener de caché
-    if redis_client:
-        try:
-            cached_data = redis_client.get(cache_key)
-            if cached_data:
-                return json.loads(cached_data)
-        except Exception as e:
-            print(f"⚠️ Error de lectura en caché Redis: {e}")
+    cache_key, hit = await ranking_service.ranking_body(
+        type, gender, category_id, limit, request.headers.get("accept-encoding")
+    )
+    if hit is not None:
+        body, encoding = hit
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        return Response(body, media_type="application/json", headers=headers)
+
+    async def load():
+        # Leaderboard en Redis (ZREVRANGE + tarjetas de perfil) si está cargado
+        leaderboard = await leaderboard_service.top(db, type, gender, category_id, limit)
+        if leaderboard is not None:
+            return leaderboard
+        return await _ranking_from_db(db, type, gender, category_id, limit)
+
+    profiles = await ranking_cache.get_or_load(
+        cache_key, load, ranking_service.ranking_stale_keys([(type, gender, category_id)], limit)[0]
+    )
+    return Response(orjson.dumps(profiles), media_type="application/json", headers={"Vary": "Accept-Encoding"})
 
-    query = select(Profile).filter(
+
+async def _ranking_from_db(db: AsyncSession, type: ProfileType, gender: Optional[Gender],
+                           category_id: Optional[int], limit: int) -> List[dict]:
+    # Solo se ordena en la BD; los perfiles salen de las tarjetas
+    query = select(Profile.id).filter(
         Profile.type == type,
         Profile.is_active == True,
         Profile.is_approved == True
@@ -367,20 +384,89 @@ async def get_ranking(
     if category_id:
         query = query.filter(Profile.category_id == category_id)
         
-    query = query.order_by(Profile.elo_score.desc()).limit(limit)
+    query = query.order_by((await rating_service.elo_order(db)).desc()).limit(limit)
     result = await db.execute(query)
-    results = result.scalars().all()
+    ids = result.scalars().all()
+    cards = await profile_card_service.get_many(db, ids)
+    return [cards[pid] for pid in ids if pid in cards]
 
-    # Cachear resultados
-    if redis_client:
-        try:
-            # Convertir objetos ORM a lista de dicts para serialización JSON
-            data_to_cache = jsonable_encoder(results)
-            redis_client.setex(cache_key, 60, json.dumps(data_to_cache))
-        except Exception as e:
-            print(f"⚠️ Error de escritura en caché Redis: {e}")
-        
-    return results
+
+def _parse_list(raw: Optional[str], parse, name: str) -> list:
+    try:
+        return list(dict.fromkeys(parse(x.strip()) for x in (raw or "").split(",") if x.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Valor inválido en {name}")
+
+
+async def _load_rankings(db: AsyncSession, type: ProfileType, views: List[tuple], limit: int) -> List[List[dict]]:
+    """
+    Top `limit` de varias vistas con una sola consulta: row_number() por
+    categoría y/o género (las dimensiones que la petición filtra).
+    """
+    genders = {g for _, g, _ in views if g}
+    categories = {c for _, _, c in views if c}
+    partition = ([Profile.category_id] if categories else []) + ([Profile.gender] if genders else [])
+    position = func.row_number().over(
+        partition_by=partition or None,
+        order_by=((await rating_service.elo_order(db)).desc(), Profile.id),
+    ).label("position")
+    inner = select(Profile.id, Profile.gender, Profile.category_id, position).filter(
+        Profile.type == type,
+        Profile.is_active == True,
+        Profile.is_approved == True,
+    )
+    if genders:
+        inner = inner.filter(Profile.gender.in_(genders))
+    if categories:
+        inner = inner.filter(Profile.category_id.in_(categories))
+    ranked = inner.subquery()
+    result = await db.execute(
+        select(ranked.c.id, ranked.c.gender, ranked.c.category_id)
+        .filter(ranked.c.position <= limit)
+        .order_by(ranked.c.position)
+    )
+    rows = result.all()
+
+    cards = await profile_card_service.get_many(db, [row.id for row in rows])
+    by_view: dict = {}
+    for row in rows:
+        view_key = (row.gender if genders else None, row.category_id if categories else None)
+        if row.id in cards:
+            by_view.setdefault(view_key, []).append(cards[row.id])
+    return [by_view.get((g, c), []) for _, g, c in views]
+
+
+@router.get("/rankings", response_model=List[schemas.RankingView])
+async def get_rankings(
+    type: ProfileType = ProfileType.REAL,
+    genders: Optional[str] = Query(None, description="Géneros separados por comas; vacío = todos"),
+    category_ids: Optional[str] = Query(None, description="Categorías separadas por comas; vacío = todas"),
+    limit: int = 50,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Varios rankings (producto de categorías x géneros) en una respuesta.
+    Caché: un MGET para todas las vistas; las que fallan se calculan juntas
+    con una consulta con ventana.
+    """
+    gender_list = _parse_list(genders, Gender, "genders") or [None]
+    category_list = _parse_list(category_ids, int, "category_ids") or [None]
+    views = [(type, g, c) for c in category_list for g in gender_list]
+    if len(views) > settings.RANKING_BATCH_MAX_VIEWS:
+        raise HTTPException(status_code=400, detail=f"Máximo {settings.RANKING_BATCH_MAX_VIEWS} rankings por petición")
+
+    rankings = await leaderboard_service.top_many(db, views, limit)
+    if rankings is None:
+        rankings = await ranking_cache.get_or_load_many(
+            await ranking_service.ranking_cache_keys(views, limit),
+            lambda missing: _load_rankings(db, type, [views[i] for i in missing], limit),
+            ranking_service.ranking_stale_keys(views, limit),
+        )
+
+    return [
+        {"gender": g, "category_id": c, "profiles": profiles}
+        for (_, g, c), profiles in zip(views, rankings)
+    ]
 
 @router.post("/{id}/leave", response_model=schemas.Profile)
 async def leave_game(
@@ -401,8 +487,11 @@ async def leave_game(
     db.add(profile)
     await db.commit()
     await db.refresh(profile)
-    _invalidate_ranking_cache()
-    _invalidate_participation_cache(profile.user_id)
+    await ranking_service.invalidate_profiles(profile)
+    await leaderboard_service.sync_profiles(profile)
+    await profile_card_service.invalidate(profile.id)
+    await pair_service.sync_pools(profile)
+    await _invalidate_participation_cache(profile.user_id)
     try:
         logger.info(f"participation_status_changed user_id={profile.user_id} profile_id={profile.id} action=leave")
     except Exception:
@@ -429,18 +518,36 @@ async def delete_profile(
         
     await db.delete(profile)
     await db.commit()
+    await ranking_service.invalidate_profiles(profile)
+    await leaderboard_service.remove_profiles(profile)
+    await pair_service.remove_from_pools(profile)
+    await profile_card_service.invalidate(profile.id)
+    await _invalidate_participation_cache(profile.user_id)
     return profile
 
 
+@router.get("/{id}/seasons", response_model=List[schemas.ProfileSeasonRating])
+async def get_profile_season_history(
+    id: int,
+    db: AsyncSession = Depends(get_async_db),
+) -> Any:
+    """
+    Rating del perfil en cada temporada en la que recibió votos.
+    """
+    result = await db.execute(select(Profile.id).filter(Profile.id == id))
+    if not result.scalars().first():
+        raise HTTPException(status_code=404, detail="Perfil no encontrado")
+    return await rating_service.history(db, id)
+
+
 @router.get("/{id}/comments", response_model=List[schemas.Comment])
 async def get_profile_comments(
     id: int,
     db: AsyncSession = Depends(get_async_db),
     current_user: Optional[models.User] = Depends(deps.get_current_user_optional_async),
 ) -> Any:
-    result = await db.execute(select(Profile).filter(Profile.id == id, Profile.is_active == True))
-    profile = result.scalars().first()
-    if not profile:
+    card = await profile_card_service.get(db, id)
+    if not card or not card["is_active"]:
         raise HTTPException(status_code=404, detail="Perfil no encontrado")
 
     comments_result = await db.execute(
@@ -457,9 +564,8 @@ async def add_profile_comment(
     db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(deps.get_current_user_async),
 ) -> Any:
-    result = await db.execute(select(Profile).filter(Profile.id == id, Profile.is_active == True))
-    profile = result.scalars().first()
-    if not profile:
+    card = await profile_card_service.get(db, id)
+    if not card or not card["is_active"]:
         raise HTTPException(status_code=404, detail="Perfil no encontrado")
 
     content = comment_in.content.strip()
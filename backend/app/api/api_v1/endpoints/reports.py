@@ -3,24 +3,34 @@ from typing import Any, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import noload, selectinload
 
 from app import models, schemas
 from app.api import deps
 from app.api.deps import get_async_db
 from app.api.api_v1.endpoints.admin import check_admin
-from app.core.redis_client import redis_client
+from app.services.profile_card_service import profile_card_service
 import json
 
 
 router = APIRouter()
 
 
+async def _with_profile_cards(db: AsyncSession, reports) -> List[dict]:
+    """Informes con el perfil reportado tomado de las tarjetas de perfil."""
+    cards = await profile_card_service.get_many(db, [r.target_profile_id for r in reports if r.target_profile_id])
+    return [
+        {**schemas.Report.model_validate(r).model_dump(), "target_profile": cards.get(r.target_profile_id)}
+        for r in reports
+    ]
+
+
 @router.post("/", response_model=schemas.Report, status_code=status.HTTP_201_CREATED)
 async def create_report(
     report_in: schemas.ReportCreate,
     db: AsyncSession = Depends(get_async_db),
     current_user: models.User = Depends(deps.get_current_user_async),
+    redis=Depends(deps.get_redis),
 ) -> Any:
     if not report_in.target_profile_id and not report_in.target_user_id and not report_in.target_comment_id:
         raise HTTPException(
@@ -68,8 +78,8 @@ async def create_report(
             db.add(notification)
             await db.commit()
             await db.refresh(notification)
-            if redis_client:
-                redis_client.publish(f"notifications:{admin.id}", json.dumps({"type": "new_report", "payload": payload}))
+            if redis:
+                await redis.publish(f"notifications:{admin.id}", json.dumps({"type": "new_report", "payload": payload}))
         except Exception:
             # Silenciar errores de notificación para no afectar creación de reporte
             pass
@@ -84,7 +94,7 @@ async def list_reports(
 ) -> Any:
     query = select(models.Report).options(
         selectinload(models.Report.reporter),
-        selectinload(models.Report.target_profile),
+        noload(models.Report.target_profile),
         selectinload(models.Report.target_user),
         selectinload(models.Report.target_comment),
     )
@@ -99,7 +109,7 @@ async def list_reports(
                 status_code=status.HTTP_400_BAD_REQUEST, detail="Estado de reporte inválido"
             )
     result = await db.execute(query.order_by(models.Report.created_at.desc()))
-    return result.scalars().all()
+    return await _with_profile_cards(db, result.scalars().all())
 
 
 @router.patch("/{report_id}", response_model=schemas.Report)
@@ -1,16 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app import models, schemas
 from app.api import deps
 from app.api.deps import get_async_db
 from app.services.voting_service import voting_service
+from app.services.vote_ingestion import vote_ingestion_service
 
 from app.core.ratelimit import RateLimiter
 
 router = APIRouter()
 
-@router.post("/", response_model=schemas.Vote, dependencies=[Depends(RateLimiter(times=10, seconds=10))])
+@router.post(
+    "/",
+    response_model=schemas.Vote,
+    dependencies=[Depends(RateLimiter(times=10, seconds=10))],
+    responses={status.HTTP_202_ACCEPTED: {"model": schemas.VoteQueued}},
+)
 async def cast_vote(
     vote_in: schemas.VoteCreate,
     db: AsyncSession = Depends(get_async_db),
@@ -19,11 +26,26 @@ async def cast_vote(
     """
     Emitir un voto entre dos perfiles (winner/loser).
     Autenticación requerida. Ya no exige tener foto propia activa/aprobada para votar.
+    Con VOTE_INGESTION_MODE=queue el voto se encola y se responde 202.
     """
     try:
+        if vote_ingestion_service.enabled:
+            queue_id = await vote_ingestion_service.enqueue(
+                db,
+                winner_id=vote_in.winner_id,
+                loser_id=vote_in.loser_id,
+                voter_id=current_user.id
+            )
+            queued = schemas.VoteQueued(
+                winner_id=vote_in.winner_id,
+                loser_id=vote_in.loser_id,
+                queue_id=queue_id
+            )
+            return JSONResponse(status_code=status.HTTP_202_ACCEPTED, content=queued.model_dump())
+
         vote = await voting_service.record_vote(
-            db, 
-            winner_id=vote_in.winner_id, 
+            db,
+            winner_id=vote_in.winner_id,
             loser_id=vote_in.loser_id,
             voter_id=current_user.id
         )
@@ -11,7 +11,7 @@ from app import models, schemas
 from app.core import security
 from app.core.config import settings
 from app.db.session import SessionLocal, AsyncSessionLocal
-from app.core.redis_client import redis_client
+from app.core.redis_client import get_redis
 
 reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/auth/login/access-token"
@@ -24,6 +24,21 @@ def get_db() -> Generator:
     finally:
         db.close()
 
+async def get_unrevoked_token(
+    token: str = Depends(reusable_oauth2), redis=Depends(get_redis)
+) -> str:
+    """Token del usuario tras comprobar la blacklist de Redis."""
+    if redis:
+        try:
+            if await redis.get(f"token:blacklist:{token}"):
+                raise HTTPException(
+                    status_code=status.HTTP_403_FORBIDDEN,
+                    detail="Token revocado"
+                )
+        except Exception:
+            pass
+    return token
+
 async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
     if AsyncSessionLocal is None:
         raise RuntimeError("Async DB driver no disponible. Instala 'asyncpg' para Postgres.")
@@ -34,19 +49,9 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 def get_current_user(
-    db: Session = Depends(get_db), token: str = Depends(reusable_oauth2)
+    db: Session = Depends(get_db), token: str = Depends(get_unrevoked_token)
 ) -> models.User:
     try:
-        # Verificar blacklist
-        if redis_client:
-            try:
-                if redis_client.get(f"token:blacklist:{token}"):
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Token revocado"
-                    )
-            except Exception:
-                pass
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
@@ -68,18 +73,9 @@ def get_current_user(
     return user
 
 async def get_current_user_async(
-    db: AsyncSession = Depends(get_async_db), token: str = Depends(reusable_oauth2)
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(get_unrevoked_token)
 ) -> models.User:
     try:
-        if redis_client:
-            try:
-                if redis_client.get(f"token:blacklist:{token}"):
-                    raise HTTPException(
-                        status_code=status.HTTP_403_FORBIDDEN,
-                        detail="Token revocado"
-                    )
-            except Exception:
-                pass
         payload = jwt.decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
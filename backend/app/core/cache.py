@@ -0,0 +1,559 @@
+import asyncio
+import base64
+import enum
+import functools
+import gzip
+import logging
+import random
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import orjson
+
+from app.core import redis_client as redis_module
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin él solo se guarda la variante gzip
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+MISSING = object()
+
+# Variantes comprimidas que puede guardar un espacio (ver CacheNamespace.get_body)
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {"gzip": lambda data: gzip.compress(data, compresslevel=6)}
+if brotli is not None:
+    COMPRESSORS["br"] = lambda data: brotli.compress(data, quality=5)
+
+# Espacios de caché registrados (ver cache_stats y /admin/cache/stats)
+namespaces: Dict[str, "CacheNamespace"] = {}
+
+
+def accepted_encodings(header: Optional[str]) -> Set[str]:
+    """Codificaciones de un Accept-Encoding (las de q=0 se descartan)."""
+    accepted = set()
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+        if not name:
+            continue
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) == 0:
+                    continue
+            except ValueError:
+                pass
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+def key_part(value) -> str:
+    """Fragmento de clave: None/"" -> "all", enums por su valor."""
+    if value is None or value == "":
+        return "all"
+    if isinstance(value, enum.Enum):
+        return str(value.value)
+    return str(value)
+
+
+class CacheNamespace:
+    """
+    Caché de dos niveles para un tipo de dato: LRU con TTL en el proceso
+    (opcional, local_ttl > 0) delante de claves JSON en Redis.
+
+    Con versioned=True las claves llevan la generación global del espacio
+    y la de cada ámbito (p. ej. una vista de ranking): invalidar es un INCR
+    y las entradas viejas caducan por TTL. Como la versión se lee de Redis,
+    el nivel local nunca sirve datos invalidados; en espacios sin versión
+    el nivel local puede ir hasta local_ttl segundos por detrás de otros
+    workers, así que solo se activa donde eso es aceptable.
+
+    Con negative_ttl > 0 los None también se cachean (durante ese tiempo).
+    Los valores se devuelven compartidos: quien llama no debe mutarlos.
+
+    Contra estampidas al caducar o invalidar una clave:
+      - single-flight: en cada worker, una sola carga por clave; el resto
+        espera su resultado;
+      - entre workers, un lock corto en Redis (SET NX EX LOCK_TTL): solo
+        quien lo obtiene consulta la BD, los demás esperan a que aparezca
+        la clave (o al vencimiento del lock);
+      - con stale_ttl > 0 (stale-while-revalidate) se guarda además la
+        última copia bajo la clave sin versión, y mientras otro recalcula
+        se sirve esa copia en vez de esperar;
+      - los TTL llevan hasta un TTL_JITTER de variación para que las claves
+        escritas a la vez no caduquen a la vez.
+
+    Con encodings (p. ej. ("br", "gzip")) cada valor se guarda además
+    comprimido en <clave>:<codificación> (base64, el cliente de Redis
+    decodifica texto), y get_body devuelve directamente los bytes de la
+    respuesta sin deserializar ni volver a comprimir. En espacios
+    versionados los cuerpos van bajo la clave sin versión
+    (<clave>:body:<codificación>) con la clave versionada delante, así
+    lookup_body lee versiones y cuerpo en un solo viaje y descarta el
+    cuerpo si su generación ya no es la actual.
+    """
+    VERSION_PREFIX = "cachever"
+    LOCK_PREFIX = "cachelock"
+    LOCK_TTL = 5
+    LOCK_POLL_INTERVAL = 0.05
+    TTL_JITTER = 0.1
+
+    def __init__(self, name: str, ttl: int, local_ttl: float = 0, local_max: int = 1024,
+                 negative_ttl: int = 0, versioned: bool = False, stale_ttl: int = 0,
+                 encodings: Sequence[str] = ()):
+        self.name = name
+        self.ttl = ttl
+        self.local_ttl = local_ttl
+        self.local_max = local_max
+        self.negative_ttl = negative_ttl
+        self.versioned = versioned
+        self.stale_ttl = stale_ttl
+        self.encodings = [e for e in encodings if e in COMPRESSORS]
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._flights: Dict[str, asyncio.Future] = {}
+        self.reset_stats()
+        namespaces[name] = self
+
+    @property
+    def redis(self):
+        return redis_module.async_redis
+
+    # -- claves --------------------------------------------------------
+
+    def version_key(self, scope: Optional[str] = None) -> str:
+        return f"{self.VERSION_PREFIX}:{self.name}:{scope if scope is not None else '__global__'}"
+
+    def key(self, *parts) -> str:
+        """Clave sin versión (espacios no versionados)."""
+        return ":".join([self.name] + [key_part(p) for p in parts])
+
+    def stale_key(self, *parts) -> str:
+        """Última copia de una entrada, que sobrevive a sus versiones."""
+        return f"{self.key(*parts)}:stale"
+
+    async def keys(self, entries: Sequence[Tuple[tuple, Iterable[str]]]) -> List[str]:
+        """
+        Claves de varias entradas (partes, ámbitos). En espacios versionados
+        todas las versiones se leen con un solo MGET.
+        """
+        if not self.versioned:
+            return [self.key(*parts) for parts, _ in entries]
+        entries = [(parts, list(scopes)) for parts, scopes in entries]
+        version_keys = self._version_keys(entries)
+        versions = [None] * len(version_keys)
+        if self.redis:
+            try:
+                versions = await self.redis.mget(version_keys)
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Redis error reading cache versions ({self.name}): {e}")
+        return self._versioned_keys(entries, versions)
+
+    def _version_keys(self, entries: Sequence[Tuple[tuple, List[str]]]) -> List[str]:
+        return [self.version_key()] + [self.version_key(s) for _, scopes in entries for s in scopes]
+
+    def _versioned_keys(self, entries: Sequence[Tuple[tuple, List[str]]], versions: Sequence) -> List[str]:
+        global_version, offset = versions[0] or 0, 1
+        result = []
+        for parts, scopes in entries:
+            scoped = versions[offset:offset + len(scopes)]
+            offset += len(scopes)
+            suffix = ".".join(str(v or 0) for v in scoped) or "0"
+            result.append(f"{self.key(*parts)}:g{global_version}:v{suffix}")
+        return result
+
+    # -- lectura y escritura -------------------------------------------
+
+    def _get_local(self, key: str):
+        entry = self._local.get(key)
+        if entry is None:
+            return MISSING
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._local[key]
+            return MISSING
+        self._local.move_to_end(key)
+        return value
+
+    def _set_local(self, key: str, value, ttl: float):
+        if ttl <= 0:
+            return
+        self._local[key] = (time.monotonic() + ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_max:
+            self._local.popitem(last=False)
+
+    async def get_many(self, keys: Sequence[str]) -> List[Any]:
+        """Valores cacheados (MISSING si no hay): nivel local y un MGET para el resto."""
+        values = [self._get_local(k) for k in keys]
+        self.stats["local_hits"] += sum(1 for v in values if v is not MISSING)
+        pending = [i for i, v in enumerate(values) if v is MISSING]
+        if pending and self.redis:
+            started = time.perf_counter()
+            try:
+                raw = await self.redis.mget([keys[i] for i in pending])
+            except Exception as e:
+                raw = [None] * len(pending)
+                self.stats["errors"] += 1
+                logger.error(f"Redis error reading cache ({self.name}): {e}")
+            self.stats["redis_ms"] += (time.perf_counter() - started) * 1000
+            for i, data in zip(pending, raw):
+                if data is None:
+                    continue
+                value = orjson.loads(data)
+                values[i] = value
+                self.stats["redis_hits"] += 1
+                self._set_local(keys[i], value, min(self.local_ttl, self.negative_ttl) if value is None else self.local_ttl)
+        misses = sum(1 for v in values if v is MISSING)
+        self.stats["misses"] += misses
+        self.stats["negative_hits"] += sum(1 for v in values if v is None)
+        return values
+
+    async def get(self, key: str):
+        return (await self.get_many([key]))[0]
+
+    def _encoding_for(self, accept_encoding: Optional[str]) -> Optional[str]:
+        accepted = accepted_encodings(accept_encoding)
+        return next((e for e in self.encodings if e in accepted), None)
+
+    def _body_key(self, key: str, encoding: Optional[str]) -> str:
+        """Dónde está en Redis el cuerpo de una entrada en una codificación."""
+        if self.versioned:
+            base = key.rpartition(":g")[0] if ":g" in key else key
+            return f"{base}:body:{encoding or 'identity'}"
+        return f"{key}:{encoding}" if encoding else key
+
+    def _body(self, key: str, encoding: Optional[str], raw: Optional[str]) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Bytes de un cuerpo leído de Redis, o None si falta o es de otra generación."""
+        if raw is not None and self.versioned:
+            tag, _, raw = raw.partition("\n")
+            if tag != key:
+                raw = None
+        if raw is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["redis_hits"] += 1
+        body = base64.b64decode(raw) if encoding else raw.encode()
+        self._set_local(f"{key}:{encoding or 'identity'}", body, self.local_ttl)
+        return body, encoding
+
+    def _get_local_body(self, key: str, encoding: Optional[str]) -> Optional[Tuple[bytes, Optional[str]]]:
+        body = self._get_local(f"{key}:{encoding or 'identity'}")
+        if body is MISSING:
+            return None
+        self.stats["local_hits"] += 1
+        return body, encoding
+
+    async def get_body(self, key: str, accept_encoding: Optional[str] = None) -> Optional[Tuple[bytes, Optional[str]]]:
+        """
+        Bytes listos para enviar de una entrada y su Content-Encoding (None
+        sin comprimir), con la mejor variante que acepte el cliente: nivel
+        local o un único GET. None si no está en caché.
+        """
+        encoding = self._encoding_for(accept_encoding)
+        hit = self._get_local_body(key, encoding)
+        if hit is not None:
+            return hit
+        raw = None
+        if self.redis:
+            started = time.perf_counter()
+            try:
+                raw = await self.redis.get(self._body_key(key, encoding))
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Redis error reading cache body ({self.name}): {e}")
+            self.stats["redis_ms"] += (time.perf_counter() - started) * 1000
+        return self._body(key, encoding, raw)
+
+    async def lookup_body(self, parts: tuple, scopes: Iterable[str] = (),
+                          accept_encoding: Optional[str] = None) -> Tuple[str, Optional[Tuple[bytes, Optional[str]]]]:
+        """
+        Clave (versionada) de una entrada y, si está en caché, su cuerpo como
+        en get_body. Versiones y cuerpo van en el mismo pipeline: un acierto
+        cuesta un viaje a Redis. La clave sirve para rellenar tras un fallo.
+        """
+        if not self.versioned:
+            key = self.key(*parts)
+            return key, await self.get_body(key, accept_encoding)
+        encoding = self._encoding_for(accept_encoding)
+        entries = [(parts, list(scopes))]
+        version_keys = self._version_keys(entries)
+        versions, raw = [None] * len(version_keys), None
+        if self.redis:
+            started = time.perf_counter()
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.mget(version_keys)
+                pipe.get(self._body_key(self.key(*parts), encoding))
+                versions, raw = await pipe.execute()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Redis error reading cache body ({self.name}): {e}")
+            self.stats["redis_ms"] += (time.perf_counter() - started) * 1000
+        key = self._versioned_keys(entries, versions)[0]
+        hit = self._get_local_body(key, encoding)
+        if hit is not None:
+            return key, hit
+        return key, self._body(key, encoding, raw)
+
+    def _jittered(self, ttl: int) -> int:
+        return max(1, int(ttl * (1 + random.uniform(0, self.TTL_JITTER))))
+
+    async def set_many(self, items: Dict[str, Any], ttl: Optional[int] = None,
+                 stale_keys: Optional[Dict[str, str]] = None):
+        """
+        Guarda valores en ambos niveles; los None solo si hay caché negativa.
+        stale_keys (clave -> clave sin versión) guarda también la última copia.
+        """
+        ttl = ttl or self.ttl
+        stored = {}
+        for key, value in items.items():
+            if value is None and not self.negative_ttl:
+                continue
+            item_ttl = self._jittered(self.negative_ttl if value is None else ttl)
+            self._set_local(key, value, min(self.local_ttl, item_ttl))
+            data = orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+            stored[key] = (item_ttl, data)
+            if value is not None and self.encodings:
+                raw = data
+                self._set_local(f"{key}:identity", raw, min(self.local_ttl, item_ttl))
+                # Con versión, la clave va delante del cuerpo (ver lookup_body)
+                tag = f"{key}\n" if self.versioned else ""
+                if self.versioned:
+                    stored[self._body_key(key, None)] = (item_ttl, tag + raw.decode())
+                for encoding in self.encodings:
+                    body = COMPRESSORS[encoding](raw)
+                    self._set_local(f"{key}:{encoding}", body, min(self.local_ttl, item_ttl))
+                    stored[self._body_key(key, encoding)] = (item_ttl, tag + base64.b64encode(body).decode("ascii"))
+            if value is not None and self.stale_ttl and stale_keys and key in stale_keys:
+                stored[stale_keys[key]] = (ttl + self.stale_ttl, data)
+        if not self.redis or not stored:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for key, (item_ttl, data) in stored.items():
+                pipe.setex(key, item_ttl, data)
+            await pipe.execute()
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Redis error writing cache ({self.name}): {e}")
+
+    async def set(self, key: str, value, ttl: Optional[int] = None, stale_key: Optional[str] = None):
+        await self.set_many({key: value}, ttl, {key: stale_key} if stale_key else None)
+
+    async def _get_stale(self, stale_keys: Sequence[str]) -> Optional[List[Any]]:
+        """Copias viejas de todas las claves, o None si falta alguna."""
+        if not self.stale_ttl or not stale_keys or not self.redis:
+            return None
+        try:
+            raw = await self.redis.mget(list(stale_keys))
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Redis error reading stale cache ({self.name}): {e}")
+            return None
+        if any(data is None for data in raw):
+            return None
+        self.stats["stale_hits"] += len(raw)
+        return [orjson.loads(data) for data in raw]
+
+    async def _acquire(self, flight_key: str) -> Tuple[bool, Optional[str]]:
+        """
+        Lock de recálculo entre workers: (obtenido, token). Sin Redis (o si
+        falla) se recalcula sin lock.
+        """
+        if not self.redis:
+            return True, None
+        token = uuid.uuid4().hex
+        try:
+            acquired = await self.redis.set(f"{self.LOCK_PREFIX}:{flight_key}", token, nx=True, ex=self.LOCK_TTL)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Redis error acquiring cache lock ({self.name}): {e}")
+            return True, None
+        return bool(acquired), token if acquired else None
+
+    async def _release(self, flight_key: str, token: Optional[str]):
+        if not token or not self.redis:
+            return
+        lock_key = f"{self.LOCK_PREFIX}:{flight_key}"
+        try:
+            if await self.redis.get(lock_key) == token:
+                await self.redis.delete(lock_key)
+        except Exception as e:
+            logger.error(f"Redis error releasing cache lock ({self.name}): {e}")
+
+    async def _wait_for(self, keys: Sequence[str]) -> Optional[List[Any]]:
+        """Espera a que otro worker escriba las claves (hasta LOCK_TTL)."""
+        self.stats["lock_waits"] += 1
+        deadline = time.monotonic() + self.LOCK_TTL
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+            values = await self.get_many(keys)
+            if all(v is not MISSING for v in values):
+                return values
+        return None
+
+    async def _load_coordinated(self, keys: Sequence[str], stale_keys: Sequence[str],
+                                loader: Callable[[], Awaitable[List[Any]]]) -> List[Any]:
+        flight_key = keys[0] if len(keys) == 1 else "|".join(sorted(keys))
+        acquired, token = await self._acquire(flight_key)
+        if not acquired:
+            stale = await self._get_stale(stale_keys)
+            if stale is not None:
+                return stale
+            values = await self._wait_for(keys)
+            if values is not None:
+                return values
+        try:
+            started = time.perf_counter()
+            values = await loader()
+            self.stats["loads"] += 1
+            self.stats["load_ms"] += (time.perf_counter() - started) * 1000
+            await self.set_many(dict(zip(keys, values)), stale_keys=dict(zip(keys, stale_keys)) if stale_keys else None)
+            return values
+        finally:
+            await self._release(flight_key, token)
+
+    async def get_or_load_many(self, keys: Sequence[str], loader: Callable[[List[int]], Awaitable[List[Any]]],
+                               stale_keys: Optional[Sequence[str]] = None) -> List[Any]:
+        """
+        Valores de varias claves; las que faltan se cargan juntas con
+        loader(índices) bajo single-flight, lock y stale-while-revalidate.
+        """
+        values = await self.get_many(keys)
+        missing = [i for i, v in enumerate(values) if v is MISSING]
+        if not missing:
+            return values
+        missing_keys = [keys[i] for i in missing]
+        missing_stale = [stale_keys[i] for i in missing] if stale_keys else []
+        flight_key = "|".join(sorted(missing_keys))
+
+        flight = self._flights.get(flight_key)
+        if flight is not None:
+            # Ya hay un recálculo en este worker: copia vieja o su resultado
+            self.stats["coalesced"] += 1
+            loaded = await self._get_stale(missing_stale)
+            if loaded is None:
+                loaded = await asyncio.shield(flight)
+        else:
+            flight = asyncio.get_running_loop().create_future()
+            self._flights[flight_key] = flight
+            try:
+                loaded = await self._load_coordinated(missing_keys, missing_stale, lambda: loader(missing))
+                flight.set_result(loaded)
+            except asyncio.CancelledError:
+                flight.cancel()
+                raise
+            except Exception as e:
+                flight.set_exception(e)
+                flight.exception()  # ya se propaga aquí; evita el aviso si nadie más esperaba
+                raise
+            finally:
+                del self._flights[flight_key]
+        for i, value in zip(missing, loaded):
+            values[i] = value
+        return values
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]],
+                          stale_key: Optional[str] = None):
+        async def load_one(_):
+            return [await loader()]
+
+        return (await self.get_or_load_many([key], load_one, [stale_key] if stale_key else None))[0]
+
+    # -- invalidación --------------------------------------------------
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            for suffix in ["", ":identity"] + [f":{e}" for e in self.encodings]:
+                self._local.pop(f"{key}{suffix}", None)
+        bodies = [None] + self.encodings if self.versioned and self.encodings else self.encodings
+        keys = tuple(keys) + tuple(dict.fromkeys(self._body_key(k, e) for k in keys for e in bodies))
+        if not self.redis or not keys:
+            return
+        try:
+            await self.redis.delete(*keys)
+            self.stats["invalidations"] += len(keys)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Redis error deleting cache ({self.name}): {e}")
+
+    async def invalidate(self, *scopes: str):
+        """Sube la versión de los ámbitos dados (espacios versionados)."""
+        scopes = sorted(set(scopes))
+        if not self.redis or not scopes:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for scope in scopes:
+                pipe.incr(self.version_key(scope))
+            await pipe.execute()
+            self.stats["invalidations"] += len(scopes)
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Redis error invalidating cache ({self.name}): {e}")
+
+    def clear_local(self):
+        self._local.clear()
+
+    async def invalidate_all(self):
+        """Invalida todo el espacio: versión global si es versionado, local siempre."""
+        self.clear_local()
+        if not self.versioned or not self.redis:
+            return
+        try:
+            await self.redis.incr(self.version_key())
+            self.stats["invalidations"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.error(f"Redis error invalidating cache ({self.name}): {e}")
+
+    # -- métricas ------------------------------------------------------
+
+    def reset_stats(self):
+        self.stats: Dict[str, float] = {
+            "local_hits": 0, "redis_hits": 0, "negative_hits": 0, "misses": 0,
+            "loads": 0, "load_ms": 0.0, "redis_ms": 0.0, "invalidations": 0, "errors": 0,
+            "stale_hits": 0, "coalesced": 0, "lock_waits": 0,
+        }
+
+    def snapshot(self) -> Dict:
+        """Contadores de este worker, con hits totales y ratio."""
+        hits = self.stats["local_hits"] + self.stats["redis_hits"]
+        total = hits + self.stats["misses"]
+        loads = self.stats["loads"]
+        return {
+            **self.stats,
+            "load_ms": round(self.stats["load_ms"], 3),
+            "redis_ms": round(self.stats["redis_ms"], 3),
+            "hits": hits,
+            "hit_ratio": round(hits / total, 4) if total else None,
+            "avg_load_ms": round(self.stats["load_ms"] / loads, 3) if loads else None,
+        }
+
+
+def cached(namespace: CacheNamespace, key: Callable[..., tuple],
+           scopes: Optional[Callable[..., Iterable[str]]] = None):
+    """
+    Decorador de funciones async cacheadas en `namespace`. `key` (y `scopes`
+    en espacios versionados) reciben los mismos argumentos que la función y
+    devuelven las partes de la clave. El resultado debe ser serializable a JSON.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            parts = key(*args, **kwargs)
+            cache_key = (await namespace.keys([(parts, scopes(*args, **kwargs) if scopes else ())]))[0]
+            stale_key = namespace.stale_key(*parts) if namespace.stale_ttl else None
+            return await namespace.get_or_load(cache_key, lambda: fn(*args, **kwargs), stale_key)
+
+        wrapper.cache = namespace
+        return wrapper
+    return decorator
+
+
+def cache_stats() -> Dict[str, Dict]:
+    return {name: ns.snapshot() for name, ns in sorted(namespaces.items())}
@@ -38,7 +38,62 @@ class Settings(BaseSettings):
     # REDIS
     REDIS_HOST: str = "localhost"
     REDIS_PORT: int = 6379
-    
+    # Pool del cliente async (app/core/redis_client.py): conexiones máximas por
+    # worker y segundos que espera una petición a que se libere una
+    REDIS_MAX_CONNECTIONS: int = 50
+    REDIS_POOL_TIMEOUT: int = 5
+
+    # Ingesta de votos: "sync" (transacción por voto) o "queue" (write-behind)
+    VOTE_INGESTION_MODE: str = "sync"
+    VOTE_QUEUE_STREAM: str = "votes:stream"
+    VOTE_QUEUE_BATCH_SIZE: int = 200
+    VOTE_QUEUE_FLUSH_INTERVAL_MS: int = 200
+    VOTE_WORKER_IN_PROCESS: bool = True
+    # Entregas de un voto (o evento de badges) que falla por sí solo antes de
+    # apartarlo al stream de descartes (<stream>:dead)
+    VOTE_QUEUE_MAX_DELIVERIES: int = 5
+    # Entradas de un stream sin confirmar durante más de esto (consumidor caído)
+    # las reclama otro worker con XAUTOCLAIM
+    STREAM_CLAIM_IDLE_MS: int = 30000
+
+    # Evaluación de badges por eventos (cruces de umbral de posición)
+    BADGE_EVENT_STREAM: str = "badges:events"
+    BADGE_EVENT_BATCH_SIZE: int = 100
+    BADGE_EVENT_FLUSH_INTERVAL_MS: int = 500
+    BADGE_WORKER_IN_PROCESS: bool = True
+    BADGES_ME_CACHE_TTL: int = 300
+
+    # Caché de dos niveles (app/core/cache.py): TTL del nivel local por worker.
+    # Los rankings leen siempre su versión de Redis, así que no sirven datos invalidados
+    RANKING_CACHE_LOCAL_TTL: int = 5
+    # Tiempo extra que se conserva la copia anterior de cada ranking (stale-while-revalidate)
+    RANKING_CACHE_STALE_TTL: int = 300
+    BADGES_CACHE_LOCAL_TTL: int = 60
+
+    # Cola de emparejamientos pregenerados por usuario (GET /profiles/pairs)
+    PAIR_PREFETCH_SIZE: int = 20
+    PAIR_MAX_BATCH: int = 20
+    PAIR_QUEUE_TTL: int = 600
+    # Ventana de ELO del modo ?mode=close
+    PAIR_CLOSE_WINDOW: int = 100
+    # Sin Redis, el índice por ELO del modo close se recarga desde la BD cada N segundos
+    PAIR_CLOSE_REFRESH: int = 300
+    # Modo ?mode=explore: peso 1 / (1 + votos) ** alpha, recarga desde la BD cada N segundos
+    PAIR_EXPLORE_ALPHA: float = 1.0
+    PAIR_EXPLORE_REFRESH: int = 300
+    # Fracción de pares del pool ya votados a partir de la cual se enumeran en vez de muestrear
+    PAIR_COVERAGE_ENUMERATE: float = 0.5
+    # Sin pools en Redis, a partir de este tamaño se muestrea dentro de la BD (random_key)
+    PAIR_DB_SAMPLE_THRESHOLD: int = 5000
+
+    # Tarjetas de perfil (perfil público serializado): LRU local delante del hash de Redis
+    PROFILE_CARD_LOCAL_TTL: int = 10
+    PROFILE_CARD_LOCAL_MAX: int = 10000
+    # Máximo de ids por petición en GET /profiles?ids=
+    PROFILE_BATCH_MAX: int = 200
+    # Máximo de vistas (categorías x géneros) en GET /profiles/rankings
+    RANKING_BATCH_MAX_VIEWS: int = 50
+
     # Cloudflare R2 / S3
     R2_BUCKET_NAME: Optional[str] = None
     R2_ACCOUNT_ID: Optional[str] = None
@@ -1,6 +1,6 @@
 from app.core.config import settings
-from fastapi import HTTPException, Request, status
-from app.core.redis_client import redis_client
+from fastapi import Depends, HTTPException, Request, status
+from app.core.redis_client import get_redis
 import time
 import redis
 from jose import jwt
@@ -10,7 +10,7 @@ def RateLimiter(times: int, seconds: int):
     Dependencia simple de limitador de tasa usando Redis.
     Permite 'times' peticiones por 'seconds' segundos.
     """
-    async def wrapper(request: Request):
+    async def wrapper(request: Request, redis_client=Depends(get_redis)):
         if not redis_client:
             return  # Omitir si redis no está disponible
 
@@ -32,7 +32,7 @@ def RateLimiter(times: int, seconds: int):
         key = f"rate_limit:{request.url.path}:{client_id}"
         
         try:
-            current = redis_client.get(key)
+            current = await redis_client.get(key)
             
             if current and int(current) >= times:
                 raise HTTPException(
@@ -44,7 +44,7 @@ def RateLimiter(times: int, seconds: int):
             pipe = redis_client.pipeline()
             pipe.incr(key)
             pipe.expire(key, seconds)
-            pipe.execute()
+            await pipe.execute()
             
         except redis.RedisError:
             # Fallback: si redis falla, dejar pasar la petición
@@ -0,0 +1,36 @@
+import bisect
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class RatingIndex:
+    """
+    Índice de un pool ordenado por (ELO, id) para el modo CLOSE sin Redis.
+    Buscar la ventana de un ancla es O(log n) con bisect sobre `scores`;
+    mover o quitar un perfil cuesta una búsqueda y un desplazamiento de la lista.
+    """
+
+    def __init__(self, items: Iterable[Tuple[int, int]] = ()):
+        entries = sorted((score, pid) for pid, score in items)
+        self._entries: List[Tuple[int, int]] = entries
+        self.ids: List[int] = [pid for _, pid in entries]
+        self.scores: List[int] = [score for score, _ in entries]
+        self._score: Dict[int, int] = {pid: score for score, pid in entries}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, pid: int) -> bool:
+        return pid in self._score
+
+    def set(self, pid: int, score: Optional[int]):
+        """Mueve el perfil a su nuevo ELO; con None lo quita del índice."""
+        old = self._score.pop(pid, None)
+        if old is not None:
+            i = bisect.bisect_left(self._entries, (old, pid))
+            del self._entries[i], self.ids[i], self.scores[i]
+        if score is not None:
+            i = bisect.bisect_left(self._entries, (score, pid))
+            self._entries.insert(i, (score, pid))
+            self.ids.insert(i, pid)
+            self.scores.insert(i, score)
+            self._score[pid] = score
@@ -1,8 +1,12 @@
+from typing import Optional
+
 import redis
+import redis.asyncio as aioredis
 import fakeredis
 from app.core.config import settings
 
-# Crear cliente redis
+# Cliente síncrono: solo para scripts fuera del event loop. La aplicación
+# usa async_redis (más abajo).
 # Usar try-except para manejar casos donde redis podría no estar disponible
 try:
     redis_client = redis.Redis(
@@ -16,3 +20,50 @@ try:
 except:
     print("⚠️ Redis (real) no encontrado. Usando FakeRedis en memoria.")
     redis_client = fakeredis.FakeRedis(decode_responses=True)
+
+# Cliente async de la aplicación sobre un pool de conexiones explícito. Se
+# crea en el arranque (init_async_redis) y se cierra al apagar
+# (close_async_redis); los endpoints lo reciben con deps.get_redis y los
+# servicios lo leen de aquí. None hasta el arranque: se trata como "sin Redis".
+async_redis: Optional[aioredis.Redis] = None
+
+
+async def init_async_redis() -> aioredis.Redis:
+    """
+    Crea el pool y el cliente async (idempotente). Si Redis no responde se
+    usa FakeAsyncRedis en memoria, como el cliente síncrono.
+    """
+    global async_redis
+    if async_redis is not None:
+        return async_redis
+    pool = aioredis.BlockingConnectionPool(
+        host=settings.REDIS_HOST,
+        port=settings.REDIS_PORT,
+        decode_responses=True,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+        socket_connect_timeout=1,
+    )
+    client = aioredis.Redis(connection_pool=pool)
+    try:
+        await client.ping()
+        print("✅ Conectado a Redis real (async)")
+    except Exception:
+        print("⚠️ Redis (real) no encontrado. Usando FakeAsyncRedis en memoria.")
+        await client.aclose(close_connection_pool=True)
+        client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    async_redis = client
+    return client
+
+
+async def get_redis() -> Optional[aioredis.Redis]:
+    """Dependencia de FastAPI: el cliente async compartido (None sin Redis)."""
+    return async_redis
+
+
+async def close_async_redis():
+    """Cierra el cliente async y su pool (apagado de la app o fin de un script)."""
+    global async_redis
+    client, async_redis = async_redis, None
+    if client is not None:
+        await client.aclose(close_connection_pool=True)
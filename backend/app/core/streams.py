@@ -0,0 +1,150 @@
+import json
+import logging
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import redis
+
+from app.core import redis_client as redis_module
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RedisStreamQueue:
+    """
+    Cola duradera sobre un Redis Stream con grupo de consumidores.
+    Entrega al menos una vez: lo leído y no confirmado (XACK) se vuelve
+    a entregar al mismo consumidor en la siguiente lectura, y lo que un
+    consumidor caído deja pendiente lo reclama otro pasado `claim_idle_ms`.
+    """
+
+    def __init__(self, stream: str, group: str, consumer: Optional[str] = None,
+                 claim_idle_ms: Optional[int] = None):
+        self.stream = stream
+        self.group = group
+        self._consumer = consumer
+        self.claim_idle_ms = claim_idle_ms if claim_idle_ms is not None else settings.STREAM_CLAIM_IDLE_MS
+        self.client = None  # Permite inyectar otro cliente (tests)
+        self._group_client = None
+
+    @property
+    def consumer(self) -> str:
+        # Un consumidor por proceso (host:pid). Se calcula al usarlo para que
+        # los workers creados con fork no hereden el nombre del padre.
+        return self._consumer or f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def redis(self):
+        return self.client if self.client is not None else redis_module.async_redis
+
+    async def ensure_group(self):
+        client = self.redis
+        if self._group_client is client:
+            return
+        try:
+            await client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_client = client
+
+    async def add(self, fields: Dict[str, Any]) -> str:
+        await self.ensure_group()
+        return await self.redis.xadd(self.stream, {"data": json.dumps(fields)})
+
+    async def read(self, count: int) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Lee hasta `count` entradas en orden de llegada. Primero reentrega las
+        pendientes de este consumidor (p.ej. un lote que falló), después las
+        que otro consumidor dejó sin confirmar más de `claim_idle_ms` y por
+        último las nuevas. No bloquea (sin BLOCK): quien llama decide cuánto
+        esperar entre lecturas.
+        """
+        await self.ensure_group()
+        entries = await self._read_from("0", count)
+        if not entries:
+            entries = await self._claim_idle(count)
+        if not entries:
+            entries = await self._read_from(">", count)
+        return entries
+
+    @staticmethod
+    def _parse(items) -> List[Tuple[str, Dict[str, Any]]]:
+        # Las entradas ya borradas (XDEL) llegan sin campos
+        return [(entry_id, json.loads(fields["data"])) for entry_id, fields in items or [] if fields]
+
+    async def _read_from(self, start_id: str, count: int) -> List[Tuple[str, Dict[str, Any]]]:
+        response = await self.redis.xreadgroup(self.group, self.consumer, {self.stream: start_id}, count=count)
+        entries = []
+        for _, items in response or []:
+            entries.extend(self._parse(items))
+        return entries
+
+    async def _claim_idle(self, count: int) -> List[Tuple[str, Dict[str, Any]]]:
+        response = await self.redis.xautoclaim(
+            self.stream, self.group, self.consumer,
+            min_idle_time=self.claim_idle_ms, start_id="0-0", count=count,
+        )
+        entries = self._parse(response[1])
+        if entries:
+            logger.warning(f"stream.claimed stream={self.stream} consumer={self.consumer} count={len(entries)}")
+        return entries
+
+    @property
+    def dead_stream(self) -> str:
+        return f"{self.stream}:dead"
+
+    async def delivery_counts(self, entry_ids: List[str]) -> Dict[str, int]:
+        """Veces que se ha entregado cada entrada pendiente de este consumidor."""
+        if not entry_ids:
+            return {}
+        # Una consulta exacta por ID en un solo viaje: los IDs no se ordenan
+        # como texto ("…-10" < "…-9") y un rango min/max podría perder entradas
+        pipe = self.redis.pipeline(transaction=False)
+        for entry_id in entry_ids:
+            pipe.xpending_range(self.stream, self.group, min=entry_id, max=entry_id,
+                                count=1, consumername=self.consumer)
+        return {p["message_id"]: p["times_delivered"] for found in await pipe.execute() for p in found}
+
+    async def dead_letter(self, entries: List[Tuple[str, Dict[str, Any]]], error: str):
+        """
+        Aparta entradas que no se pueden procesar al stream de descartes
+        (con el ID original y el error) y las confirma en el principal.
+        """
+        if not entries:
+            return
+        entry_ids = [entry_id for entry_id, _ in entries]
+        pipe = self.redis.pipeline()
+        for entry_id, data in entries:
+            pipe.xadd(self.dead_stream, {"data": json.dumps(data), "entry_id": entry_id, "error": error[:500]})
+        pipe.xack(self.stream, self.group, *entry_ids)
+        pipe.xdel(self.stream, *entry_ids)
+        await pipe.execute()
+
+    async def ack(self, entry_ids: List[str]):
+        if not entry_ids:
+            return
+        pipe = self.redis.pipeline()
+        pipe.xack(self.stream, self.group, *entry_ids)
+        pipe.xdel(self.stream, *entry_ids)
+        await pipe.execute()
+
+    async def lag(self) -> Dict[str, Optional[int]]:
+        """
+        Métricas de retraso: entradas sin confirmar y antigüedad de la más vieja.
+        """
+        try:
+            length = await self.redis.xlen(self.stream)
+            oldest = await self.redis.xrange(self.stream, count=1)
+        except redis.RedisError as e:
+            logger.error(f"Redis error in stream lag {self.stream}: {e}")
+            return {"length": None, "oldest_age_ms": None}
+        oldest_age_ms = None
+        if oldest:
+            # Los IDs de stream empiezan por el timestamp en milisegundos
+            oldest_ms = int(oldest[0][0].split("-", 1)[0])
+            oldest_age_ms = max(0, int(time.time() * 1000) - oldest_ms)
+        return {"length": length, "oldest_age_ms": oldest_age_ms}
@@ -0,0 +1,120 @@
+import random
+from typing import Dict, Iterable, List, Tuple
+
+
+class WeightedSampler:
+    """
+    Muestreo ponderado sobre un árbol de Fenwick: cambiar un peso y extraer
+    un elemento cuestan O(log n), y construirlo O(n).
+    Los elementos se identifican por clave (id de perfil); quitar uno deja
+    su peso a 0 y su hueco sin usar hasta la siguiente reconstrucción.
+    """
+
+    def __init__(self, items: Iterable[Tuple[int, float]] = ()):
+        self._keys: List[int] = []
+        self._slots: Dict[int, int] = {}
+        self._weights: List[float] = []
+        for key, weight in items:
+            self._slots[key] = len(self._keys)
+            self._keys.append(key)
+            self._weights.append(max(float(weight), 0.0))
+        # Construcción lineal: cada nodo suma su valor en el padre inmediato
+        n = len(self._weights)
+        self._tree = [0.0] + self._weights[:]
+        for i in range(1, n + 1):
+            parent = i + (i & -i)
+            if parent <= n:
+                self._tree[parent] += self._tree[i]
+        self._active = sum(1 for w in self._weights if w > 0)
+
+    def __len__(self) -> int:
+        return self._active
+
+    def __contains__(self, key: int) -> bool:
+        return self.weight(key) > 0
+
+    def weight(self, key: int) -> float:
+        slot = self._slots.get(key)
+        return self._weights[slot] if slot is not None else 0.0
+
+    @property
+    def total(self) -> float:
+        return self._prefix(len(self._weights))
+
+    def keys(self) -> List[int]:
+        return [k for k, w in zip(self._keys, self._weights) if w > 0]
+
+    def _prefix(self, i: int) -> float:
+        total = 0.0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _add(self, slot: int, delta: float):
+        i = slot + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def set(self, key: int, weight: float):
+        """Fija el peso de una clave (0 la excluye del muestreo)."""
+        weight = max(float(weight), 0.0)
+        slot = self._slots.get(key)
+        if slot is None:
+            if weight == 0:
+                return
+            # Nodo nuevo al final: su valor es el peso más el tramo que cubre
+            i = len(self._weights) + 1
+            self._slots[key] = i - 1
+            self._keys.append(key)
+            self._weights.append(weight)
+            self._tree.append(weight + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+            self._active += 1
+            return
+        old = self._weights[slot]
+        self._active += (weight > 0) - (old > 0)
+        self._weights[slot] = weight
+        self._add(slot, weight - old)
+
+    def remove(self, key: int):
+        self.set(key, 0)
+
+    def _find(self, u: float) -> int:
+        """Primer hueco cuya suma acumulada supera u (descenso binario)."""
+        n = len(self._weights)
+        pos = 0
+        step = 1 << n.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= n and self._tree[nxt] <= u:
+                pos = nxt
+                u -= self._tree[nxt]
+            step >>= 1
+        return min(pos, n - 1)
+
+    def sample(self) -> int:
+        if not self._active:
+            raise ValueError("Sampler vacío")
+        for _ in range(8):
+            slot = self._find(random.random() * self.total)
+            # El redondeo acumulado puede caer en un hueco vacío: se repite
+            if self._weights[slot] > 0:
+                return self._keys[slot]
+        return random.choice(self.keys())
+
+    def sample_pair(self) -> List[int]:
+        """Dos claves distintas; la segunda, ponderada entre las restantes."""
+        if self._active < 2:
+            raise ValueError("Se necesitan al menos dos elementos")
+        first = self.sample()
+        slot = self._slots[first]
+        weight = self._weights[slot]
+        self._add(slot, -weight)
+        self._weights[slot] = 0.0
+        try:
+            second = self.sample()
+        finally:
+            self._weights[slot] = weight
+            self._add(slot, weight)
+        return [first, second]
@@ -8,5 +8,6 @@ from app.models.vote import Vote  # noqa
 from app.models.follow import Follow  # noqa
 from app.models.notification import Notification  # noqa
 from app.models.badge import Badge, UserBadge  # noqa
+from app.models.profile_season_rating import ProfileSeasonRating  # noqa
 from app.models.report import Report  # noqa
 from app.models.comment import Comment  # noqa
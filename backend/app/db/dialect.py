@@ -0,0 +1,12 @@
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def dialect_insert(db: AsyncSession, model):
+    """
+    Devuelve el INSERT específico del dialecto de la sesión (Postgres o SQLite),
+    que soporta ON CONFLICT DO NOTHING / DO UPDATE.
+    """
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
@@ -0,0 +1,62 @@
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, TypeVar
+
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# SQLSTATE de Postgres: deadlock_detected y serialization_failure
+RETRYABLE_SQLSTATES = {"40P01", "40001"}
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """
+    Indica si un error de BD es transitorio (deadlock, fallo de serialización
+    o SQLite bloqueado) y la transacción puede reintentarse completa.
+    """
+    if not isinstance(exc, DBAPIError):
+        return False
+    orig = getattr(exc, "orig", None)
+    code = getattr(orig, "sqlstate", None) or getattr(orig, "pgcode", None)
+    if code in RETRYABLE_SQLSTATES:
+        return True
+    return "database is locked" in str(orig).lower()
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """
+    Indica si un error no depende de los datos: los reintentables y la BD
+    caída o inaccesible (conexión perdida, timeout). Más tarde puede funcionar.
+    """
+    if is_retryable_error(exc):
+        return True
+    if isinstance(exc, DBAPIError) and exc.connection_invalidated:
+        return True
+    return isinstance(exc, (OperationalError, InterfaceError, PoolTimeoutError, OSError))
+
+
+async def run_with_retry(
+    db: AsyncSession,
+    fn: Callable[[], Awaitable[T]],
+    attempts: int = 5,
+    base_delay: float = 0.01,
+) -> T:
+    """
+    Ejecuta `fn` (una transacción completa) reintentando ante deadlocks con
+    backoff exponencial y jitter. Hace rollback antes de cada reintento.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            return await fn()
+        except DBAPIError as exc:
+            await db.rollback()
+            if attempt == attempts or not is_retryable_error(exc):
+                raise
+            delay = base_delay * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+            logger.warning(f"db.retry attempt={attempt} delay_ms={round(delay * 1000, 1)} error={exc.orig}")
+            await asyncio.sleep(delay)
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -5,8 +6,13 @@ from fastapi.middleware.gzip import GZipMiddleware
 from sqlalchemy import text
 from app.core.config import settings
 from app.api.api_v1.api import api_router
-from app.core.redis_client import redis_client
-from app.db.session import engine
+from app.core import redis_client as redis_module
+from app.core.redis_client import init_async_redis, close_async_redis
+from app.db.session import engine, AsyncSessionLocal
+from app.services.vote_ingestion import vote_ingestion_service
+from app.services.leaderboard_service import leaderboard_service
+from app.services.pair_service import pair_service
+from app.services.badge_events import badge_event_service
 
 # Configuración de logging
 logging.basicConfig(
@@ -46,10 +52,31 @@ else:
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+_background_tasks = []
+_stop_event = asyncio.Event()
+
+
+async def _rebuild_leaderboard():
+    try:
+        async with AsyncSessionLocal() as db:
+            await leaderboard_service.rebuild(db)
+    except Exception as exc:
+        logger.error("startup.leaderboard.error", extra={"error": str(exc)})
+
+
+async def _rebuild_pair_pools():
+    try:
+        async with AsyncSessionLocal() as db:
+            await pair_service.rebuild_pools(db)
+    except Exception as exc:
+        logger.error("startup.pair_pools.error", extra={"error": str(exc)})
+
 
 @app.on_event("startup")
 async def startup_event():
     logger.info("startup.begin")
+    # Pool de conexiones async compartido por toda la app
+    await init_async_redis()
 
     db_ok = False
     try:
@@ -60,9 +87,10 @@ async def startup_event():
         logger.error("startup.postgres.error", extra={"error": str(exc)})
 
     redis_ok = False
-    if redis_client:
+    redis = redis_module.async_redis
+    if redis:
         try:
-            redis_ok = bool(redis_client.ping())
+            redis_ok = bool(await redis.ping())
         except Exception as exc:
             logger.error("startup.redis.error", extra={"error": str(exc)})
 
@@ -74,6 +102,33 @@ async def startup_event():
         },
     )
 
+    if redis_ok and AsyncSessionLocal and not await leaderboard_service.is_ready():
+        _background_tasks.append(asyncio.create_task(_rebuild_leaderboard()))
+
+    if redis_ok and AsyncSessionLocal and not await pair_service.pools_ready():
+        _background_tasks.append(asyncio.create_task(_rebuild_pair_pools()))
+
+    if vote_ingestion_service.enabled and settings.VOTE_WORKER_IN_PROCESS and AsyncSessionLocal:
+        _background_tasks.append(
+            asyncio.create_task(vote_ingestion_service.run(AsyncSessionLocal, _stop_event))
+        )
+
+    if redis_ok and settings.BADGE_WORKER_IN_PROCESS and AsyncSessionLocal:
+        _background_tasks.append(
+            asyncio.create_task(badge_event_service.run(AsyncSessionLocal, _stop_event))
+        )
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    _stop_event.set()
+    for task in _background_tasks:
+        try:
+            await asyncio.wait_for(task, timeout=5)
+        except Exception:
+            task.cancel()
+    await close_async_redis()
+
 @app.get("/")
 async def root():
     return {"message": "Bienvenido a la API de Carómetro", "docs": "/docs"}
@@ -91,10 +146,11 @@ async def health_check():
 
     redis_ok = None
     redis_error = None
-    if redis_client is not None:
+    redis = redis_module.async_redis
+    if redis is not None:
         redis_ok = False
         try:
-            redis_ok = bool(redis_client.ping())
+            redis_ok = bool(await redis.ping())
         except Exception as exc:
             redis_error = str(exc)
 
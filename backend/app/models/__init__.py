@@ -3,6 +3,7 @@ from .category import Category
 from .profile import Profile, ProfileType, Gender
 from .vote import Vote
 from .badge import Season, Badge, UserBadge
+from .profile_season_rating import ProfileSeasonRating
 from .follow import Follow
 from .notification import Notification
 from .report import Report, ReportStatus
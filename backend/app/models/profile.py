@@ -1,8 +1,23 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Float, ForeignKey, Enum, Index, select
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import enum
+import random
 from app.db.base_class import Base
+from app.models.badge import Season
+
+DEFAULT_ELO = 1200
+
+
+def active_season_id():
+    """Subconsulta escalar con el id de la temporada activa (NULL si no hay)."""
+    return (
+        select(Season.id)
+        .where(Season.is_active == True)
+        .order_by(Season.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
 
 class Gender(enum.Enum):
     MALE = "male"
@@ -14,13 +29,26 @@ class ProfileType(enum.Enum):
     AI = "ai"
 
 class Profile(Base):
+    __table_args__ = (
+        # Muestreo en la BD de pools grandes (ver PairService.candidate_pool)
+        Index("ix_profile_pool_random", "type", "gender", "random_key"),
+    )
+
     id = Column(Integer, primary_key=True, index=True)
     type = Column(Enum(ProfileType), nullable=False, index=True)
     gender = Column(Enum(Gender), nullable=False, index=True)
     image_url = Column(String, nullable=False)
-    elo_score = Column(Integer, default=1200)
+    # Rating de la temporada rating_season_id: columnas normales (elo_score
+    # indexado). Si esa temporada ya no es la activa se leen como iniciales
+    # (RatingService.column) hasta que RatingService.reset_stale las archiva
+    # en profile_season_rating y las reinicia en segundo plano; un perfil al
+    # que le llega un voto antes se archiva y reinicia en ese mismo UPDATE.
+    elo_score = Column(Integer, default=DEFAULT_ELO, index=True)
     voted_count = Column(Integer, default=0)
     win_count = Column(Integer, default=0)
+
+    # Temporada a la que pertenecen elo_score/voted_count/win_count
+    rating_season_id = Column(Integer, ForeignKey("season.id"), nullable=True, index=True, default=active_season_id())
     
     # Enlace de usuario para personas reales
     user_id = Column(Integer, ForeignKey("user.id"), nullable=True, index=True)
@@ -32,6 +60,11 @@ class Profile(Base):
 
     is_active = Column(Boolean, default=True, index=True)
     is_approved = Column(Boolean, default=False, index=True)
+
+    # Posición aleatoria en [0, 1) para muestrear sin cargar todos los ids.
+    # Se fija al crear el perfil y no se toca al votar; el sesgo de los huecos
+    # entre claves se reparte con scripts/reshuffle_random_keys.py
+    random_key = Column(Float, nullable=True, default=random.random)
     
     # Aspectos legales
     legal_consent = Column(Boolean, default=False)
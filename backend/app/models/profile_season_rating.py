@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from sqlalchemy.sql import func
+from app.db.base_class import Base
+
+
+class ProfileSeasonRating(Base):
+    """Rating final de un perfil en una temporada pasada (histórico)."""
+    __tablename__ = "profile_season_rating"
+
+    season_id = Column(Integer, ForeignKey("season.id"), primary_key=True)
+    profile_id = Column(Integer, ForeignKey("profile.id", ondelete="CASCADE"), primary_key=True, index=True)
+    elo_score = Column(Integer, nullable=False)
+    voted_count = Column(Integer, nullable=False, default=0)
+    win_count = Column(Integer, nullable=False, default=0)
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,11 +1,36 @@
-from sqlalchemy import Column, Integer, ForeignKey, DateTime
+from typing import Tuple
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
 from sqlalchemy.sql import func
 from app.db.base_class import Base
 
+
+def canonical_pair(a: int, b: int) -> Tuple[int, int]:
+    """Par ordenado (menor, mayor): el mismo para ambos sentidos del voto."""
+    return (a, b) if a < b else (b, a)
+
+
+def _default_pair_lo(context) -> int:
+    params = context.get_current_parameters()
+    return canonical_pair(params["winner_id"], params["loser_id"])[0]
+
+
+def _default_pair_hi(context) -> int:
+    params = context.get_current_parameters()
+    return canonical_pair(params["winner_id"], params["loser_id"])[1]
+
+
 class Vote(Base):
     id = Column(Integer, primary_key=True, index=True)
     winner_id = Column(Integer, ForeignKey("profile.id"), nullable=False, index=True)
     loser_id = Column(Integer, ForeignKey("profile.id"), nullable=False, index=True)
     voter_id = Column(Integer, ForeignKey("user.id"), nullable=True, index=True)
+
+    # Clave canónica del emparejamiento para detectar votos duplicados por índice
+    pair_lo = Column(Integer, nullable=False, default=_default_pair_lo)
+    pair_hi = Column(Integer, nullable=False, default=_default_pair_hi)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("uq_vote_voter_pair", "voter_id", "pair_lo", "pair_hi", unique=True),
+    )
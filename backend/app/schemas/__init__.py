@@ -1,6 +1,6 @@
 from .user import User, UserCreate, UserUpdate
-from .profile import Profile, ProfileCreate, ProfileUpdate
-from .vote import Vote, VoteCreate
+from .profile import Profile, ProfileCreate, ProfileUpdate, ProfileSeasonRating, ProfileLookup, ProfileBatch, RankingView
+from .vote import Vote, VoteCreate, VoteQueued
 from .category import Category, CategoryCreate, CategoryUpdate
 from .token import Token, TokenPayload
 from .msg import Msg, ForgotPassword, ResetPassword
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from app.models.profile import ProfileType, Gender
@@ -36,3 +36,26 @@ class Profile(ProfileBase):
 
     class Config:
         from_attributes = True
+
+class ProfileLookup(BaseModel):
+    id: int
+    found: bool
+    profile: Optional[Profile] = None
+
+class ProfileBatch(BaseModel):
+    # En el orden pedido; los ids inexistentes o no aprobados van con found=False
+    items: List[ProfileLookup]
+    missing: List[int]
+
+class RankingView(BaseModel):
+    # None = sin filtrar por esa dimensión
+    gender: Optional[Gender] = None
+    category_id: Optional[int] = None
+    profiles: List[Profile]
+
+class ProfileSeasonRating(BaseModel):
+    season_id: int
+    season_name: Optional[str] = None
+    elo_score: int
+    voted_count: int
+    win_count: int
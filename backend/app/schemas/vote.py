@@ -15,3 +15,7 @@ class Vote(VoteBase):
 
     class Config:
         from_attributes = True
+
+class VoteQueued(VoteBase):
+    status: str = "queued"
+    queue_id: str
@@ -0,0 +1,190 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import redis_client as redis_module
+from app.core.config import settings
+from app.core.streams import RedisStreamQueue
+from app.db.retry import is_transient_error
+from app.services.badge_service import badge_service
+from app.services.leaderboard_service import leaderboard_service
+from app.services.rank_service import rank_service
+
+logger = logging.getLogger(__name__)
+
+
+class BadgeEventService:
+    """
+    Evaluación de badges dirigida por eventos: el camino del voto detecta
+    cuándo un perfil cruza un umbral de posición (el min_position de las
+    badges de ranking activas) y encola un evento; un worker otorga las
+    badges y emite notificaciones.
+    """
+    REACHED_KEY = "badges:reached"
+
+    def __init__(self):
+        self.queue = RedisStreamQueue(settings.BADGE_EVENT_STREAM, "badge-workers")
+        self.batch_size = settings.BADGE_EVENT_BATCH_SIZE
+        self.flush_interval = settings.BADGE_EVENT_FLUSH_INTERVAL_MS / 1000
+        self.emitted_total = 0
+        self.processed_total = 0
+        self.awarded_total = 0
+        self.dead_lettered_total = 0
+        self.last_applied_lag_ms = None
+        self.session_factory = None  # Sesión propia para leer los umbrales
+        self._thresholds: Optional[Tuple[float, Tuple[int, ...]]] = None
+
+    @property
+    def redis(self):
+        return redis_module.async_redis
+
+    @staticmethod
+    def threshold_for(rank: int, thresholds: Sequence[int]) -> Optional[int]:
+        """Umbral más exigente que cumple una posición (None si no entra en ninguno)."""
+        return next((t for t in thresholds if rank <= t), None)
+
+    async def thresholds(self) -> Tuple[int, ...]:
+        """
+        Posiciones de las badges de ranking activas, de menor a mayor. Se
+        releen de la BD cada BADGES_CACHE_LOCAL_TTL segundos para recoger las
+        que añada o cambie un admin.
+        """
+        cached = self._thresholds
+        if cached and time.monotonic() - cached[0] < settings.BADGES_CACHE_LOCAL_TTL:
+            return cached[1]
+        session_factory = self.session_factory
+        if session_factory is None:
+            from app.db.session import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        if session_factory is None:
+            return cached[1] if cached else ()
+        try:
+            async with session_factory() as db:
+                badges = await badge_service.get_ranking_badges(db)
+        except Exception as e:
+            logger.error(f"badge_events.thresholds error: {e}")
+            return cached[1] if cached else ()
+        thresholds = tuple(sorted({b.min_position for b in badges}))
+        self._thresholds = (time.monotonic(), thresholds)
+        return thresholds
+
+    async def detect(self, *profiles) -> int:
+        """
+        Tras un voto: compara la posición actual de los perfiles con el mejor
+        umbral ya alcanzado y encola un evento por cada cruce nuevo.
+        Solo usa el leaderboard de Redis; si no está listo no hace nada y las
+        badges se siguen pudiendo revisar con POST /badges/check.
+        """
+        profiles = [p for p in profiles if p.user_id]
+        if not self.redis or not profiles or not await leaderboard_service.is_ready():
+            return 0
+        thresholds = await self.thresholds()
+        if not thresholds:
+            return 0
+        ranks = await rank_service.ranks_from_leaderboard([p.id for p in profiles])
+        if not ranks:
+            return 0
+        emitted = 0
+        try:
+            reached = await self.redis.hmget(self.REACHED_KEY, [p.id for p in profiles])
+            for p, previous in zip(profiles, reached):
+                entry = ranks.get(p.id)
+                threshold = self.threshold_for(entry["rank"], thresholds) if entry else None
+                if threshold is None or (previous is not None and int(previous) <= threshold):
+                    continue
+                await self.redis.hset(self.REACHED_KEY, p.id, threshold)
+                await self.queue.add({
+                    "user_id": p.user_id,
+                    "profile_id": p.id,
+                    "rank": entry["rank"],
+                    "threshold": threshold,
+                })
+                emitted += 1
+        except Exception as e:
+            logger.error(f"Redis error in badge event detection: {e}")
+        self.emitted_total += emitted
+        return emitted
+
+    async def reset_thresholds(self):
+        """Nueva temporada: los umbrales vuelven a poder cruzarse."""
+        if not self.redis:
+            return
+        try:
+            await self.redis.delete(self.REACHED_KEY)
+        except Exception as e:
+            logger.error(f"Redis error resetting badge thresholds: {e}")
+
+    async def process_batch(self, db: AsyncSession) -> int:
+        """
+        Procesa un lote de eventos: una evaluación por usuario, aunque tenga
+        varios eventos en el lote. Se confirman los eventos de los usuarios
+        evaluados; los de un usuario que falla quedan pendientes hasta agotar
+        VOTE_QUEUE_MAX_DELIVERIES entregas y entonces se apartan, sin frenar
+        al resto. Devuelve cuántas entradas se consumieron.
+        """
+        entries = await self.queue.read(self.batch_size)
+        if not entries:
+            return 0
+        by_user: Dict[int, List[Tuple[str, Dict]]] = defaultdict(list)
+        for entry_id, data in entries:
+            by_user[data["user_id"]].append((entry_id, data))
+        done: List[str] = []
+        deliveries = None
+        for user_id in sorted(by_user):
+            user_entries = by_user[user_id]
+            try:
+                awarded = await badge_service.check_and_award_badges(db, user_id)
+            except Exception as e:
+                await db.rollback()
+                if is_transient_error(e):
+                    # No es culpa del evento: el resto se reintenta en la siguiente lectura
+                    logger.error(f"badge_worker.error: {e}")
+                    break
+                if deliveries is None:
+                    deliveries = await self.queue.delivery_counts([entry_id for entry_id, _ in entries])
+                if max(deliveries.get(entry_id, 1) for entry_id, _ in user_entries) >= settings.VOTE_QUEUE_MAX_DELIVERIES:
+                    await self.queue.dead_letter(user_entries, repr(e))
+                    self.dead_lettered_total += len(user_entries)
+                    logger.error(f"badge_worker.dead_letter user_id={user_id} error={e!r}")
+                else:
+                    logger.error(f"badge_worker.user_failed user_id={user_id} error={e!r}")
+                continue
+            self.awarded_total += len(awarded)
+            done.extend(entry_id for entry_id, _ in user_entries)
+        await self.queue.ack(done)
+
+        newest_ms = int(entries[-1][0].split("-", 1)[0])
+        self.last_applied_lag_ms = max(0, int(time.time() * 1000) - newest_ms)
+        self.processed_total += len(entries)
+        return len(entries)
+
+    async def run(self, session_factory, stop_event: Optional[asyncio.Event] = None):
+        logger.info(f"badge_worker.start batch_size={self.batch_size} flush_interval_ms={int(self.flush_interval * 1000)}")
+        while not (stop_event and stop_event.is_set()):
+            consumed = 0
+            try:
+                async with session_factory() as db:
+                    consumed = await self.process_batch(db)
+            except Exception as e:
+                logger.error(f"badge_worker.error: {e}")
+            if consumed < self.batch_size:
+                await asyncio.sleep(self.flush_interval)
+        logger.info("badge_worker.stop")
+
+    async def metrics(self) -> Dict:
+        return {
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "backlog": await self.queue.lag(),
+            "emitted_total": self.emitted_total,
+            "processed_total": self.processed_total,
+            "awarded_total": self.awarded_total,
+            "dead_lettered_total": self.dead_lettered_total,
+            "last_applied_lag_ms": self.last_applied_lag_ms,
+        }
+
+badge_event_service = BadgeEventService()
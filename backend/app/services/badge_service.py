@@ -1,153 +1,197 @@
-from typing import List, Optional
+from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import func, and_, desc
+from sqlalchemy import insert
+from sqlalchemy.orm import selectinload
+from app import schemas
+from app.core.cache import CacheNamespace, cached
+from app.core.config import settings
 from app.models.badge import Badge, UserBadge
 from app.models.profile import Profile
 from app.models.user import User
 from app.models.notification import Notification
-from app.core.redis_client import redis_client
+from app.core import redis_client as redis_module
+from app.services.rank_service import rank_service
+from app.services.season_service import season_service
+from app.db.dialect import dialect_insert
 from fastapi.encoders import jsonable_encoder
 import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+all_badges_cache = CacheNamespace("all_badges", ttl=3600, local_ttl=settings.BADGES_CACHE_LOCAL_TTL)
+user_badges_cache = CacheNamespace("badges:me", ttl=settings.BADGES_ME_CACHE_TTL)
+
 
 class BadgeService:
     async def get_all_badges(self, db: AsyncSession) -> List[Badge]:
-        cache_key = "all_badges"
-
-        if redis_client:
-            try:
-                cached = redis_client.get(cache_key)
-                if cached:
-                    badges_data = json.loads(cached)
-                    return [Badge(**data) for data in badges_data]
-            except Exception as e:
-                logger.error(f"Redis error in get_all_badges: {e}")
+        return [Badge(**data) for data in await self._all_badges_data(db)]
 
+    @staticmethod
+    @cached(all_badges_cache, key=lambda db: ())
+    async def _all_badges_data(db: AsyncSession) -> List[dict]:
         result = await db.execute(
             select(Badge)
             .filter(Badge.is_active == True)
             .order_by(Badge.min_position.asc().nulls_last())
         )
-        badges = result.scalars().all()
-        
-        if redis_client:
-            try:
-                badges_data = jsonable_encoder(badges)
-                redis_client.setex(cache_key, 3600, json.dumps(badges_data))
-            except Exception as e:
-                logger.error(f"Redis set error in get_all_badges: {e}")
-            
-        return badges
+        return jsonable_encoder(result.scalars().all())
 
-    async def get_user_badges(self, db: AsyncSession, user_id: int) -> List[UserBadge]:
+    async def invalidate_user_badges(self, *user_ids: int):
+        await user_badges_cache.delete(*[user_badges_cache.key(uid) for uid in user_ids])
+
+    async def get_user_badges(self, db: AsyncSession, user_id: int) -> List[dict]:
+        """
+        Badges del usuario (lectura pura, cacheada). Se invalida al otorgar badges.
+        """
+        return await self._user_badges_data(db, user_id)
+
+    @staticmethod
+    @cached(user_badges_cache, key=lambda db, user_id: (user_id,))
+    async def _user_badges_data(db: AsyncSession, user_id: int) -> List[dict]:
         result = await db.execute(
             select(UserBadge)
-            .options(select(UserBadge.badge)) # Eager load badge info
+            .options(selectinload(UserBadge.badge))
             .filter(UserBadge.user_id == user_id)
+            .order_by(UserBadge.id)
+        )
+        return jsonable_encoder([schemas.UserBadge.model_validate(ub) for ub in result.scalars().all()])
+
+    async def _ranked_profile_ids(self, db: AsyncSession, user_id: int) -> List[int]:
+        result = await db.execute(
+            select(Profile.id).filter(
+                Profile.user_id == user_id,
+                Profile.is_active == True,
+                Profile.is_approved == True,
+            )
         )
         return result.scalars().all()
 
+    async def get_best_rank_entry(self, db: AsyncSession, user_id: int) -> Optional[dict]:
+        """Posición y percentil del mejor perfil del usuario (None si no está en el ranking)"""
+        ranks = await rank_service.get_ranks(db, await self._ranked_profile_ids(db, user_id))
+        return min(ranks.values(), key=lambda r: r["rank"], default=None)
+
     async def get_best_rank(self, db: AsyncSession, user_id: int) -> Optional[int]:
         """Obtiene la mejor posición en el ranking de cualquiera de los perfiles del usuario"""
-        # Cache best rank for short time? No, it changes frequently.
-        subquery = (
-            select(
-                Profile.user_id,
-                func.rank().over(order_by=desc(Profile.elo_score)).label("rank")
+        best = await self.get_best_rank_entry(db, user_id)
+        return best["rank"] if best else None
+
+    async def get_ranking_badges(self, db: AsyncSession) -> List[Badge]:
+        """Badges de ranking por posición, de la más exigente a la menos."""
+        result = await db.execute(
+            select(Badge)
+            .filter(
+                Badge.category == "ranking",
+                Badge.is_active == True,
+                Badge.min_position.isnot(None),
             )
-            .filter(Profile.is_active == True, Profile.is_approved == True)
-            .subquery()
+            .order_by(Badge.min_position.asc())
         )
-        
-        query = select(func.min(subquery.c.rank)).filter(subquery.c.user_id == user_id)
-        result = await db.execute(query)
-        return result.scalar()
+        return result.scalars().all()
 
-    async def check_and_award_badges(self, db: AsyncSession, user_id: int):
+    async def insert_awards(
+        self, db: AsyncSession, awards: List[Tuple[int, int, Badge]], season_id: Optional[int]
+    ) -> List[Tuple[int, dict]]:
         """
-        Verifica si el usuario merece nuevas badges basadas en sus perfiles y las asigna.
+        Inserta por lotes las badges (user_id, profile_id, badge) que aún no
+        existen en la temporada, junto con sus notificaciones. No hace commit.
+        Devuelve (user_id, payload) de las filas realmente insertadas.
         """
-        # 1. Obtener badges disponibles de tipo ranking
-        # Use get_all_badges to leverage cache? 
-        # But we need to filter by category='ranking'. 
-        # Let's just query db or filter the cached result if we implemented cache properly.
-        # For simplicity and consistency with transaction, query DB.
-        ranking_badges_result = await db.execute(
-            select(Badge).filter(Badge.category == "ranking", Badge.is_active == True)
+        if not awards:
+            return []
+        # Ante repetidos gana el primero (el mejor perfil si vienen en orden de ranking)
+        by_key = {}
+        for user_id, profile_id, badge in awards:
+            by_key.setdefault((user_id, badge.id), (profile_id, badge))
+        existing = await db.execute(
+            select(UserBadge.user_id, UserBadge.badge_id).filter(
+                UserBadge.user_id.in_({user_id for user_id, _ in by_key}),
+                UserBadge.badge_id.in_({badge_id for _, badge_id in by_key}),
+                UserBadge.season_id == season_id if season_id else UserBadge.season_id.is_(None),
+            )
         )
-        ranking_badges = ranking_badges_result.scalars().all()
-        
-        if not ranking_badges:
-            return
+        pending = sorted(set(by_key) - {tuple(row) for row in existing.all()})
+        if not pending:
+            return []
 
-        # 2. Obtener perfiles del usuario
-        user_profiles_result = await db.execute(
-            select(Profile).filter(Profile.user_id == user_id, Profile.is_active == True)
+        # El índice único descarta las que otra petición ya insertó
+        result = await db.execute(
+            dialect_insert(db, UserBadge)
+            .values([
+                {"user_id": user_id, "badge_id": badge_id, "profile_id": by_key[(user_id, badge_id)][0], "season_id": season_id}
+                for user_id, badge_id in pending
+            ])
+            .on_conflict_do_nothing(index_elements=["user_id", "badge_id", "season_id"])
+            .returning(UserBadge.user_id, UserBadge.badge_id)
         )
-        user_profiles = user_profiles_result.scalars().all()
+        awarded = []
+        for user_id, badge_id in sorted(tuple(row) for row in result.all()):
+            profile_id, badge = by_key[(user_id, badge_id)]
+            awarded.append((user_id, {
+                "badge_id": badge.id,
+                "badge_name": badge.name,
+                "badge_icon": badge.icon,
+                "badge_slug": badge.slug,
+                "profile_id": profile_id,
+            }))
+        if awarded:
+            await db.execute(
+                insert(Notification),
+                [{"user_id": user_id, "type": "badge_awarded", "payload": payload} for user_id, payload in awarded],
+            )
+        return awarded
 
-        if not user_profiles:
+    async def publish_awards(self, awarded: List[Tuple[int, dict]]):
+        """Tras el commit: invalida /badges/me y publica en tiempo real en un solo viaje a Redis."""
+        if not awarded:
             return
+        await self.invalidate_user_badges(*{user_id for user_id, _ in awarded})
+        redis = redis_module.async_redis
+        if not redis:
+            return
+        try:
+            pipe = redis.pipeline(transaction=False)
+            for user_id, payload in awarded:
+                pipe.publish(f"notifications:{user_id}", json.dumps({"type": "badge_awarded", **payload}))
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis publish error in publish_awards: {e}")
 
-        # 3. Calcular rankings de manera eficiente
-        subquery = (
-            select(
-                Profile.id,
-                func.rank().over(order_by=desc(Profile.elo_score)).label("rank")
-            )
-            .filter(Profile.is_active == True, Profile.is_approved == True)
-            .subquery()
-        )
-
-        user_profile_ids = [p.id for p in user_profiles]
-        
-        ranks_query = select(subquery.c.id, subquery.c.rank).filter(subquery.c.id.in_(user_profile_ids))
-        ranks_result = await db.execute(ranks_query)
-        profile_ranks = {row.id: row.rank for row in ranks_result.all()}
+    async def check_and_award_badges(self, db: AsyncSession, user_id: int) -> List[dict]:
+        """
+        Verifica si el usuario merece nuevas badges basadas en sus perfiles y las asigna.
+        Todo se resuelve en memoria a partir de una sola consulta de posiciones;
+        las badges y sus notificaciones se insertan por lotes con un único commit.
+        Devuelve los payloads de las badges nuevas.
+        """
+        # 1. Obtener badges disponibles de tipo ranking
+        ranking_badges = await self.get_ranking_badges(db)
+        if not ranking_badges:
+            return []
 
-        for profile in user_profiles:
-            current_rank = profile_ranks.get(profile.id)
+        # 2. Posiciones de todos los perfiles del usuario en una sola consulta
+        ranks = await rank_service.get_ranks(db, await self._ranked_profile_ids(db, user_id))
+        if not ranks:
+            return []
+        best = min(ranks.values(), key=lambda r: (r["rank"], r["profile_id"]))
 
-            if not current_rank:
-                continue
+        # 3. Badges ganadas con el mejor perfil (si entra en un umbral, entra en todos los mayores)
+        earned = [(user_id, best["profile_id"], b) for b in ranking_badges if best["rank"] <= b.min_position]
+        if not earned:
+            return []
 
-            # 4. Verificar badges
-            for badge in ranking_badges:
-                if badge.min_position and current_rank <= badge.min_position:
-                    # Verificar si ya tiene la badge
-                    existing_badge_query = select(UserBadge).filter(
-                        UserBadge.user_id == user_id,
-                        UserBadge.badge_id == badge.id,
-                    )
-                    existing_badge = (await db.execute(existing_badge_query)).scalars().first()
+        # 4. Inserción masiva y un único commit
+        active_season = await season_service.get_active_season(db)
+        awarded = await self.insert_awards(db, earned, active_season.id if active_season else None)
+        if not awarded:
+            return []
+        await db.commit()
 
-                    if not existing_badge:
-                        new_user_badge = UserBadge(
-                            user_id=user_id,
-                            badge_id=badge.id,
-                            profile_id=profile.id,
-                        )
-                        db.add(new_user_badge)
-                        
-                        # Crear notificación
-                        notification = Notification(
-                            user_id=user_id,
-                            type="badge_awarded",
-                            payload={
-                                "badge_id": badge.id,
-                                "badge_name": badge.name,
-                                "badge_icon": badge.icon,
-                                "badge_slug": badge.slug,
-                                "profile_id": profile.id
-                            }
-                        )
-                        db.add(notification)
-                        
-                        await db.commit() # Commit inmediato para notificaciones realtime
+        # 5. Tiempo real después del commit
+        await self.publish_awards(awarded)
+        return [payload for _, payload in awarded]
 
     async def init_default_badges(self, db: AsyncSession):
         """Crea las badges por defecto si no existen"""
@@ -0,0 +1,152 @@
+import json
+import logging
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import redis_client as redis_module
+from app.models.profile import Profile
+from app.services.badge_service import badge_service
+from app.services.rating_service import rating_service
+from app.services.season_service import season_service
+
+logger = logging.getLogger(__name__)
+
+
+class BadgeSweepService:
+    """
+    Barrido de badges de toda la temporada: recorre el ranking global una
+    sola vez, en orden (elo desc, id asc) y por bloques con paginación por
+    clave, asignando posiciones con la semántica de rank() y otorgando en
+    bloque todas las badges de ranking ganadas.
+    El progreso se guarda en Redis tras cada bloque para poder reanudar.
+    """
+    CHECKPOINT_PREFIX = "badges:sweep"
+
+    @property
+    def redis(self):
+        return redis_module.async_redis
+
+    def checkpoint_key(self, season_id: Optional[int]) -> str:
+        return f"{self.CHECKPOINT_PREFIX}:{season_id or 'none'}"
+
+    async def _load_checkpoint(self, key: str) -> Optional[Dict]:
+        if not self.redis:
+            return None
+        try:
+            raw = await self.redis.get(key)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.error(f"Redis error loading sweep checkpoint: {e}")
+            return None
+
+    async def _save_checkpoint(self, key: str, state: Dict):
+        if not self.redis:
+            return
+        try:
+            await self.redis.set(key, json.dumps(state))
+        except Exception as e:
+            logger.error(f"Redis error saving sweep checkpoint: {e}")
+
+    async def _clear_checkpoint(self, key: str):
+        if not self.redis:
+            return
+        try:
+            await self.redis.delete(key)
+        except Exception:
+            pass
+
+    async def sweep(
+        self, db: AsyncSession, chunk_size: int = 1000, restart: bool = False, max_chunks: Optional[int] = None
+    ) -> Dict:
+        """
+        Ejecuta (o reanuda) el barrido. Se detiene al pasar la posición de la
+        badge menos exigente, porque más abajo ya no se gana ninguna.
+        `max_chunks` permite trocear el trabajo en varias ejecuciones.
+        """
+        t0 = time.perf_counter()
+        badges = await badge_service.get_ranking_badges(db)
+        active_season = await season_service.get_active_season(db)
+        season_id = active_season.id if active_season else None
+        key = self.checkpoint_key(season_id)
+        if restart:
+            await self._clear_checkpoint(key)
+
+        state = await self._load_checkpoint(key)
+        resumed = state is not None
+        if not state:
+            state = {
+                "last_elo": None,
+                "last_id": None,
+                "position": 0,
+                "rank": 0,
+                "rows": 0,
+                "awarded": 0,
+            }
+        rows_at_start = state["rows"]
+        max_position = badges[-1].min_position if badges else 0
+        completed = not badges
+        chunks = 0
+        # ELO de la temporada activa: las filas aún sin reiniciar cuentan como 1200
+        elo = await rating_service.elo_order(db)
+
+        while not completed and (max_chunks is None or chunks < max_chunks):
+            chunks += 1
+            query = (
+                select(Profile.id, Profile.user_id, elo.label("elo_score"))
+                .filter(Profile.is_active == True, Profile.is_approved == True)
+                .order_by(elo.desc(), Profile.id.asc())
+                .limit(chunk_size)
+            )
+            if state["last_id"] is not None:
+                query = query.filter(or_(
+                    elo < state["last_elo"],
+                    and_(elo == state["last_elo"], Profile.id > state["last_id"]),
+                ))
+            chunk = (await db.execute(query)).all()
+            if not chunk:
+                completed = True
+                break
+
+            awards = []
+            for row in chunk:
+                state["position"] += 1
+                # Empates comparten posición, como rank() OVER (ORDER BY elo DESC)
+                if row.elo_score != state["last_elo"]:
+                    state["rank"] = state["position"]
+                state["last_elo"], state["last_id"] = row.elo_score, row.id
+                state["rows"] += 1
+                if state["rank"] > max_position:
+                    completed = True
+                    break
+                if row.user_id:
+                    awards += [(row.user_id, row.id, b) for b in badges if state["rank"] <= b.min_position]
+
+            awarded = await badge_service.insert_awards(db, awards, season_id)
+            await db.commit()
+            await badge_service.publish_awards(awarded)
+            state["awarded"] += len(awarded)
+            await self._save_checkpoint(key, state)
+
+        if completed:
+            await self._clear_checkpoint(key)
+        elapsed = time.perf_counter() - t0
+        rows = state["rows"] - rows_at_start
+        stats = {
+            "season_id": season_id,
+            "resumed": resumed,
+            "completed": completed,
+            "chunks": chunks,
+            "rows": rows,
+            "awarded": state["awarded"],
+            "last_rank": state["rank"],
+            "elapsed_s": round(elapsed, 3),
+            "rows_per_sec": round(rows / elapsed, 1) if elapsed > 0 else None,
+        }
+        logger.info(f"badge_sweep.done {stats}")
+        return stats
+
+badge_sweep_service = BadgeSweepService()
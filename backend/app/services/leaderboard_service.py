@@ -0,0 +1,182 @@
+import logging
+from typing import Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import redis_client as redis_module
+from app.models.profile import Profile
+from app.services.profile_card_service import profile_card_service
+from app.services.ranking_service import ranking_service
+from app.services.rating_service import rating_service
+
+logger = logging.getLogger(__name__)
+
+
+class LeaderboardService:
+    """
+    Ranking mantenido de forma incremental en Redis: un sorted set por vista
+    (tipo/género/categoría, ver RankingService.profile_namespaces) más uno
+    global. Los perfiles salen de las tarjetas (ProfileCardService), la misma
+    caché que el resto de lecturas.
+    Solo se sirve desde Redis cuando se ha hecho una reconstrucción completa
+    (marca lb:ready); si no, los lectores vuelven a la BD.
+    """
+    PREFIX = "lb"
+    GLOBAL_KEY = "lb:global"
+    READY_KEY = "lb:ready"
+    REBUILD_LOCK_KEY = "lb:rebuild:lock"
+
+    @property
+    def redis(self):
+        return redis_module.async_redis
+
+    def key(self, namespace: str) -> str:
+        return f"{self.PREFIX}:{namespace}"
+
+    async def is_ready(self) -> bool:
+        if not self.redis:
+            return False
+        try:
+            return bool(await self.redis.exists(self.READY_KEY))
+        except Exception as e:
+            logger.error(f"Redis error in leaderboard is_ready: {e}")
+            return False
+
+    async def mark_stale(self):
+        """Quita la marca lb:ready: los lectores van a la BD hasta la próxima reconstrucción."""
+        if not self.redis:
+            return
+        try:
+            await self.redis.delete(self.READY_KEY)
+        except Exception as e:
+            logger.error(f"Redis error in leaderboard mark_stale: {e}")
+
+    def _keys_for(self, profile) -> List[str]:
+        keys = [self.key(ns) for ns in ranking_service.profile_namespaces(profile.type, profile.gender, profile.category_id)]
+        return keys + [self.GLOBAL_KEY]
+
+    def _add_to_pipe(self, pipe, profile):
+        for key in self._keys_for(profile):
+            pipe.zadd(key, {profile.id: profile.elo_score})
+
+    def _remove_from_pipe(self, pipe, profile):
+        for key in self._keys_for(profile):
+            pipe.zrem(key, profile.id)
+
+    async def sync_profiles(self, *profiles):
+        """
+        Refleja el estado actual de los perfiles: ZADD si están activos y
+        aprobados, ZREM si no. Se llama después del commit.
+        """
+        if not self.redis or not profiles:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for p in profiles:
+                if p.is_active and p.is_approved:
+                    self._add_to_pipe(pipe, p)
+                else:
+                    self._remove_from_pipe(pipe, p)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis error in leaderboard sync: {e}")
+
+    async def remove_profiles(self, *profiles):
+        if not self.redis or not profiles:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for p in profiles:
+                self._remove_from_pipe(pipe, p)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis error in leaderboard remove: {e}")
+
+    async def _cards(self, db: AsyncSession, ids: List[int]) -> Optional[Dict[int, dict]]:
+        cards = await profile_card_service.get_many(db, [int(pid) for pid in ids])
+        # Un perfil que ya no existe: el llamador usa la BD
+        return cards if len(cards) == len(set(ids)) else None
+
+    async def top(self, db: AsyncSession, type, gender=None, category_id=None, limit: int = 50) -> Optional[List[Dict]]:
+        """
+        Top `limit` de una vista: ZREVRANGE + tarjetas. Devuelve None si el
+        leaderboard no está listo o le falta algún perfil (el llamador usa la BD).
+        """
+        if limit <= 0 or not await self.is_ready():
+            return None
+        try:
+            key = self.key(ranking_service.namespace(type, gender, category_id))
+            ids = [int(pid) for pid in await self.redis.zrevrange(key, 0, limit - 1)]
+        except Exception as e:
+            logger.error(f"Redis error in leaderboard top: {e}")
+            return None
+        cards = await self._cards(db, ids)
+        return None if cards is None else [cards[pid] for pid in ids]
+
+    async def top_many(self, db: AsyncSession, views: List[tuple], limit: int = 50) -> Optional[List[List[Dict]]]:
+        """
+        Top de varias vistas (tipo, género, categoría): los ZREVRANGE van en
+        un pipeline y los perfiles en una sola lectura de tarjetas. Mismo
+        criterio que top().
+        """
+        if limit <= 0 or not await self.is_ready():
+            return None
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for view in views:
+                pipe.zrevrange(self.key(ranking_service.namespace(*view)), 0, limit - 1)
+            ranked = [[int(pid) for pid in view_ids] for view_ids in await pipe.execute()]
+        except Exception as e:
+            logger.error(f"Redis error in leaderboard top_many: {e}")
+            return None
+        cards = await self._cards(db, list(dict.fromkeys(pid for view_ids in ranked for pid in view_ids)))
+        if cards is None:
+            return None
+        return [[cards[pid] for pid in view_ids] for view_ids in ranked]
+
+    async def rebuild(self, db: AsyncSession, chunk_size: int = 5000) -> int:
+        """
+        Carga masiva desde la BD por bloques (paginación por id).
+        Devuelve el número de perfiles cargados.
+        """
+        if not self.redis:
+            return 0
+        if not await self.redis.set(self.REBUILD_LOCK_KEY, "1", nx=True, ex=600):
+            logger.info("leaderboard.rebuild already running")
+            return 0
+        try:
+            await self.redis.delete(self.READY_KEY)
+            stale = [k async for k in self.redis.scan_iter(f"{self.PREFIX}:*")]
+            stale = [k for k in stale if k != self.REBUILD_LOCK_KEY]
+            if stale:
+                await self.redis.delete(*stale)
+
+            loaded = 0
+            last_id = 0
+            while True:
+                # Solo lo que necesitan los sorted sets; los perfiles están en las tarjetas
+                result = await db.execute(
+                    select(Profile.id, Profile.type, Profile.gender, Profile.category_id,
+                           rating_service.elo_score().label("elo_score"))
+                    .filter(Profile.is_active == True, Profile.is_approved == True, Profile.id > last_id)
+                    .order_by(Profile.id)
+                    .limit(chunk_size)
+                )
+                chunk = result.all()
+                if not chunk:
+                    break
+                pipe = self.redis.pipeline(transaction=False)
+                for p in chunk:
+                    self._add_to_pipe(pipe, p)
+                await pipe.execute()
+                loaded += len(chunk)
+                last_id = chunk[-1].id
+
+            await self.redis.set(self.READY_KEY, "1")
+            logger.info(f"leaderboard.rebuild loaded={loaded}")
+            return loaded
+        finally:
+            await self.redis.delete(self.REBUILD_LOCK_KEY)
+
+leaderboard_service = LeaderboardService()
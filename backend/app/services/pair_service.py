@@ -0,0 +1,1002 @@
+import bisect
+import enum
+import json
+import logging
+import math
+import random
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+import redis
+from sqlalchemy import and_, func, literal, or_, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import redis_client as redis_module
+from app.core.config import settings
+from app.core.rating_index import RatingIndex
+from app.core.weighted_sampler import WeightedSampler
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.vote import Vote, canonical_pair
+from app.services.leaderboard_service import leaderboard_service
+from app.services.ranking_service import ranking_service
+from app.services.rating_service import rating_service
+
+logger = logging.getLogger(__name__)
+
+
+class NoMorePairs(Exception):
+    """El usuario ya votó todos los emparejamientos posibles del pool."""
+
+
+class PairMode(str, enum.Enum):
+    RANDOM = "random"  # Dos candidatos uniformes
+    CLOSE = "close"    # Rival dentro de una ventana de ELO alrededor de un ancla
+    EXPLORE = "explore"  # Ponderado hacia los perfiles con menos votos
+
+
+def exposure_weight(voted_count: int) -> float:
+    """Peso de exploración: decrece con los votos recibidos en la temporada."""
+    return 1.0 / (1 + max(voted_count or 0, 0)) ** settings.PAIR_EXPLORE_ALPHA
+
+
+def window_rank(anchor: int, lo: int, hi: int) -> int:
+    """
+    Posición aleatoria en [lo, hi) distinta de la del ancla (que está dentro).
+    Si la ventana solo contiene al ancla, devuelve su vecino más cercano.
+    """
+    if hi - lo < 2:
+        return anchor - 1 if anchor > 0 else anchor + 1
+    r = random.randrange(lo, hi - 1)
+    return r + 1 if r >= anchor else r
+
+
+class CandidatePool:
+    """
+    Candidatos de una vista. Respaldado por un SET de Redis (solo se mueven
+    los ids muestreados, con SRANDMEMBER) o por la lista de ids de la BD.
+
+    En modo CLOSE el rival se busca por posición en un índice ordenado por
+    ELO: el sorted set del leaderboard (ZCOUNT + ZRANGE, O(log n)) o, sin
+    Redis, el RatingIndex del proceso con bisect.
+    En modo EXPLORE se extrae con un WeightedSampler (O(log n) por par).
+    """
+
+    def __init__(self, size: int, redis=None, key: Optional[str] = None, ids: Optional[Sequence[int]] = None,
+                 mode: PairMode = PairMode.RANDOM, rating_key: Optional[str] = None,
+                 scores: Optional[Sequence[int]] = None, window: int = 0,
+                 sampler: Optional[WeightedSampler] = None, namespace: Optional[str] = None,
+                 index: Optional[RatingIndex] = None):
+        self.size = size
+        self.namespace = namespace
+        self.redis = redis
+        self.key = key
+        self.index = index
+        # El índice se comparte sin copiarlo: construir el pool no es O(n)
+        if index is not None:
+            ids, scores = index.ids, index.scores
+        self.ids = ids if index is not None else list(ids) if ids is not None else None
+        self.mode = mode
+        self.rating_key = rating_key
+        self.scores = scores if index is not None else list(scores) if scores is not None else None
+        self.window = window
+        self.sampler = sampler
+
+    def __len__(self) -> int:
+        return self.size
+
+    async def sample(self, count: int) -> List[List[int]]:
+        """`count` pares de dos candidatos distintos (los pares pueden repetirse)."""
+        if self.size < 2:
+            return []
+        if self.mode == PairMode.CLOSE:
+            return await self._sample_close(count)
+        if self.sampler is not None:
+            return [self.sampler.sample_pair() for _ in range(count)]
+        if self.ids is not None:
+            return [random.sample(self.ids, 2) for _ in range(count)]
+        pipe = self.redis.pipeline(transaction=False)
+        for _ in range(count):
+            pipe.srandmember(self.key, 2)
+        return [[int(x) for x in pair] for pair in await pipe.execute() if len(pair) == 2]
+
+    async def _sample_close(self, count: int) -> List[List[int]]:
+        if self.scores is not None:
+            if len(self.scores) < 2:
+                return []
+            pairs = []
+            for _ in range(count):
+                anchor = random.randrange(len(self.scores))
+                score = self.scores[anchor]
+                lo = bisect.bisect_left(self.scores, score - self.window)
+                hi = bisect.bisect_right(self.scores, score + self.window)
+                pairs.append([self.ids[anchor], self.ids[window_rank(anchor, lo, hi)]])
+            return pairs
+
+        # Cuatro viajes a Redis para todo el lote, O(log n) por par
+        anchors = [int(x) for x in await self.redis.srandmember(self.key, -count)]
+        pipe = self.redis.pipeline(transaction=False)
+        for pid in anchors:
+            pipe.zscore(self.rating_key, pid)
+            pipe.zrank(self.rating_key, pid)
+        found = await pipe.execute()
+        ranked = [
+            (pid, score, rank)
+            for pid, score, rank in zip(anchors, found[::2], found[1::2])
+            if score is not None and rank is not None
+        ]
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zcard(self.rating_key)
+        for _, score, _ in ranked:
+            pipe.zcount(self.rating_key, "-inf", f"({score - self.window}")
+            pipe.zcount(self.rating_key, "-inf", score + self.window)
+        total, *bounds = await pipe.execute()
+        if total < 2:
+            return []
+        pipe = self.redis.pipeline(transaction=False)
+        for (_, _, rank), lo, hi in zip(ranked, bounds[::2], bounds[1::2]):
+            r = window_rank(rank, lo, hi)
+            pipe.zrange(self.rating_key, r, r)
+        opponents = await pipe.execute()
+        return [[pid, int(opp[0])] for (pid, _, _), opp in zip(ranked, opponents) if opp]
+
+    async def draw(self, db: AsyncSession, count: int) -> List[List[int]]:
+        """Como sample; las subclases que leen de la BD lo sobrescriben."""
+        return await self.sample(count)
+
+    async def contains(self, db: AsyncSession, ids: Sequence[int]) -> List[bool]:
+        if not ids:
+            return []
+        if self.sampler is not None:
+            return [i in self.sampler for i in ids]
+        if self.index is not None:
+            return [i in self.index for i in ids]
+        if self.ids is not None:
+            members = set(self.ids)
+            return [i in members for i in ids]
+        return [bool(m) for m in await self.redis.smismember(self.key, list(ids))]
+
+    async def members(self, db: AsyncSession) -> List[int]:
+        """Todos los ids; solo para la búsqueda exhaustiva."""
+        if self.sampler is not None:
+            return self.sampler.keys()
+        if self.ids is not None:
+            return self.ids
+        return [int(x) for x in await self.redis.smembers(self.key)]
+
+
+class DatabaseSampledPool(CandidatePool):
+    """
+    Pool demasiado grande para traer sus ids: cada extracción lee en una
+    consulta dos ventanas de `count` filas consecutivas por random_key a
+    partir de dos puntos aleatorios (índice ix_profile_pool_random, con
+    vuelta al principio) y empareja una ventana con la otra.
+    Funciona igual en Postgres y en SQLite.
+    """
+
+    def __init__(self, size: int, filters: Sequence, namespace: Optional[str] = None):
+        super().__init__(size, namespace=namespace)
+        self.filters = list(filters)
+
+    def _arm(self, arm: int, count: int, condition):
+        return (
+            select(Profile.id.label("id"), Profile.random_key.label("random_key"), literal(arm).label("arm"))
+            .filter(*self.filters, condition)
+            .order_by(Profile.random_key)
+            .limit(count)
+            .subquery()
+        )
+
+    async def draw(self, db: AsyncSession, count: int) -> List[List[int]]:
+        if self.size < 2:
+            return []
+        starts = (random.random(), random.random())
+        arms = []
+        for w, start in enumerate(starts):
+            arms.append(self._arm(2 * w, count, Profile.random_key >= start))
+            arms.append(self._arm(2 * w + 1, count, Profile.random_key < start))
+        rows = (await db.execute(union_all(*(select(arm) for arm in arms)))).all()
+        windows = []
+        for w in range(2):
+            after = sorted((r.random_key, r.id) for r in rows if r.arm == 2 * w)
+            wrapped = sorted((r.random_key, r.id) for r in rows if r.arm == 2 * w + 1)
+            windows.append([pid for _, pid in (after + wrapped)[:count]])
+        first, second = windows
+        random.shuffle(second)
+        return [[a, b] for a, b in zip(first, second) if a != b]
+
+    async def contains(self, db: AsyncSession, ids: Sequence[int]) -> List[bool]:
+        if not ids:
+            return []
+        result = await db.execute(select(Profile.id).filter(Profile.id.in_(set(ids)), *self.filters))
+        found = set(result.scalars().all())
+        return [i in found for i in ids]
+
+    async def members(self, db: AsyncSession) -> List[int]:
+        return (await db.execute(select(Profile.id).filter(*self.filters))).scalars().all()
+
+    async def windows(self, db: AsyncSession, size: int):
+        """
+        Recorre el pool en páginas de `size` ids por (random_key, id) desde un
+        punto aleatorio, con vuelta al principio. Nunca tiene más de una
+        página en memoria.
+        """
+        start = random.random()
+        for condition in (Profile.random_key >= start, Profile.random_key < start):
+            last = None
+            while True:
+                query = select(Profile.id, Profile.random_key).filter(*self.filters, condition)
+                if last is not None:
+                    query = query.filter(or_(
+                        Profile.random_key > last[0],
+                        and_(Profile.random_key == last[0], Profile.id > last[1]),
+                    ))
+                rows = (await db.execute(query.order_by(Profile.random_key, Profile.id).limit(size))).all()
+                if not rows:
+                    break
+                yield [r.id for r in rows]
+                if len(rows) < size:
+                    break
+                last = (rows[-1].random_key, rows[-1].id)
+
+
+class PairService:
+    """
+    Selección de emparejamientos para votar.
+
+    Los pares ya votados por cada usuario se guardan en un SET de Redis
+    (voted_pairs:{user_id}) con la clave canónica "menor:mayor", así la
+    comprobación es O(1) por par y no se lee el historial de votos en cada
+    petición. El set se reconstruye desde Vote cuando falta o caduca; el
+    miembro centinela "*" indica que está completo.
+
+    Los candidatos de cada vista (pair_pool:{tipo}:{género}:{categoría})
+    también son SETs, mantenidos al aprobar, rechazar, abandonar o borrar
+    un perfil y reconstruidos en bloque con rebuild_pools (marca
+    pair_pool:ready); mientras no estén listos se consulta la BD.
+
+    Por usuario y pool se lleva la cobertura: los pares del pool ya votados
+    en su propio SET (voted_pairs:{user_id}:{pool}), cuyo SCARD es el
+    contador, sellado con un miembro "#{versión}:{tamaño}" del pool. Así
+    "ya los has visto todos" es una comparación O(1), y con
+    cobertura alta los pares se enumeran con un cursor sobre una permutación
+    fija en lugar de muestrear a ciegas.
+    """
+    MAX_ATTEMPTS = 60
+    POOL_PREFIX = "pair_pool"
+    POOLS_READY_KEY = "pair_pool:ready"
+    POOLS_LOCK_KEY = "pair_pool:rebuild:lock"
+    POOL_VERSION_PREFIX = "pair_pool_version"
+    LARGE_POOL_TTL = 60
+    ENUMERATE_BATCH = 256
+    VOTED_TTL = 60 * 60 * 24 * 7
+    SENTINEL = "*"
+
+    def __init__(self):
+        self.session_factory = None  # Sesión propia para el rellenado en segundo plano
+        self.refills_total = 0
+        self.stale_dropped_total = 0
+        # Samplers de exploración por pool, propios de cada proceso: {pool_key: (cargado_en, sampler)}
+        self._samplers: Dict[str, Tuple[float, WeightedSampler]] = {}
+        # Índices por ELO del modo CLOSE sin Redis, igual: {pool_key: (cargado_en, índice)}
+        self._rating_indexes: Dict[str, Tuple[float, RatingIndex]] = {}
+        # Pools que superan PAIR_DB_SAMPLE_THRESHOLD: {namespace: (medido_en, tamaño)}
+        self._large_pools: Dict[str, Tuple[float, int]] = {}
+
+    @property
+    def redis(self):
+        return redis_module.async_redis
+
+    # --- Pares ya votados -------------------------------------------------
+
+    @staticmethod
+    def voted_key(user_id: int) -> str:
+        return f"voted_pairs:{user_id}"
+
+    @staticmethod
+    def pair_member(a: int, b: int) -> str:
+        lo, hi = canonical_pair(a, b)
+        return f"{lo}:{hi}"
+
+    async def record_votes(self, votes: Iterable[Tuple[int, Profile, Profile]]):
+        """
+        Añade (voter_id, ganador, perdedor) tras el commit, también a la
+        cobertura de los pools que comparten ambos perfiles. Si el set del
+        usuario aún no está construido, la reconstrucción lo sobrescribe con
+        lo que hay en la BD, que ya incluye este voto.
+        """
+        if not self.redis:
+            return
+        votes = [(voter_id, w, l) for voter_id, w, l in votes if voter_id]
+        if not votes:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=True)
+            for voter_id, winner, loser in votes:
+                key = self.voted_key(voter_id)
+                pipe.sadd(key, self.pair_member(winner.id, loser.id))
+                pipe.expire(key, self.VOTED_TTL)
+                # Cobertura de los pools que comparten ambos perfiles
+                for ns in set(self.pool_namespaces(winner)) & set(self.pool_namespaces(loser)):
+                    covered = self.pool_voted_key(voter_id, ns)
+                    pipe.sadd(covered, self.pair_member(winner.id, loser.id))
+                    pipe.expire(covered, self.VOTED_TTL)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis error recording voted pairs: {e}")
+
+    async def rebuild_voted(self, db: AsyncSession, user_id: int) -> int:
+        """Reconstruye el set de un usuario desde la tabla de votos."""
+        result = await db.execute(
+            select(Vote.pair_lo, Vote.pair_hi).filter(Vote.voter_id == user_id)
+        )
+        members = [f"{lo}:{hi}" for lo, hi in result.all()]
+        key = self.voted_key(user_id)
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.delete(key)
+        for i in range(0, len(members), 5000):
+            pipe.sadd(key, *members[i:i + 5000])
+        pipe.sadd(key, self.SENTINEL)
+        pipe.expire(key, self.VOTED_TTL)
+        await pipe.execute()
+        return len(members)
+
+    async def voted_mask(self, db: AsyncSession, user_id: int, pairs: Sequence[Tuple[int, int]]) -> List[bool]:
+        """Para cada par, si el usuario ya lo votó (en cualquier sentido)."""
+        if not pairs:
+            return []
+        members = [self.pair_member(a, b) for a, b in pairs]
+        if self.redis:
+            try:
+                key = self.voted_key(user_id)
+                built, *mask = await self.redis.smismember(key, [self.SENTINEL] + members)
+                if not built:
+                    await self.rebuild_voted(db, user_id)
+                    mask = await self.redis.smismember(key, members)
+                return [bool(m) for m in mask]
+            except Exception as e:
+                logger.error(f"Redis error checking voted pairs: {e}")
+        canonical = [canonical_pair(a, b) for a, b in pairs]
+        result = await db.execute(
+            select(Vote.pair_lo, Vote.pair_hi).filter(
+                Vote.voter_id == user_id,
+                tuple_(Vote.pair_lo, Vote.pair_hi).in_(canonical),
+            )
+        )
+        seen = {tuple(row) for row in result.all()}
+        return [pair in seen for pair in canonical]
+
+    async def voted_total(self, user_id: int) -> Optional[int]:
+        """Pares votados por el usuario en total, si su set está construido."""
+        if not self.redis:
+            return None
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.sismember(self.voted_key(user_id), self.SENTINEL)
+            pipe.scard(self.voted_key(user_id))
+            built, size = await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis error counting voted pairs: {e}")
+            return None
+        return size - 1 if built else None
+
+    async def has_voted(self, db: AsyncSession, user_id: int, a: int, b: int) -> bool:
+        return (await self.voted_mask(db, user_id, [(a, b)]))[0]
+
+    async def voted_pairs_within(self, db: AsyncSession, user_id: int,
+                                 id_set: Optional[Set[int]]) -> Set[Tuple[int, int]]:
+        """
+        Conteo exacto de los pares votados dentro de un pool (solo si el
+        muestreo falla). Con id_set None se devuelven todos.
+        """
+        if self.redis:
+            try:
+                key = self.voted_key(user_id)
+                if not await self.redis.sismember(key, self.SENTINEL):
+                    await self.rebuild_voted(db, user_id)
+                pairs = set()
+                async for member in self.redis.sscan_iter(key, count=1000):
+                    if member == self.SENTINEL:
+                        continue
+                    lo, hi = (int(x) for x in member.split(":"))
+                    if id_set is None or (lo in id_set and hi in id_set):
+                        pairs.add((lo, hi))
+                return pairs
+            except Exception as e:
+                logger.error(f"Redis error loading voted pairs: {e}")
+        result = await db.execute(
+            select(Vote.pair_lo, Vote.pair_hi).filter(Vote.voter_id == user_id)
+        )
+        return {
+            (lo, hi) for lo, hi in result.all()
+            if lo != hi and (id_set is None or (lo in id_set and hi in id_set))
+        }
+
+    async def voted_pairs_in_pool(self, db: AsyncSession, user_id: int, pool: CandidatePool) -> Set[Tuple[int, int]]:
+        """
+        Pares votados dentro de un pool. Un pool muestreado en la BD no se
+        trae entero: solo se comprueba la pertenencia de los perfiles que
+        aparecen en los votos del usuario, así que el coste lo acota su
+        historial y no el tamaño del pool.
+        """
+        if not isinstance(pool, DatabaseSampledPool):
+            return await self.voted_pairs_within(db, user_id, set(await pool.members(db)))
+        voted = await self.voted_pairs_within(db, user_id, None)
+        ids = sorted({pid for pair in voted for pid in pair})
+        inside = set()
+        for i in range(0, len(ids), 1000):
+            chunk = ids[i:i + 1000]
+            inside.update(pid for pid, ok in zip(chunk, await pool.contains(db, chunk)) if ok)
+        return {(lo, hi) for lo, hi in voted if lo in inside and hi in inside}
+
+    # --- Pools de candidatos ---------------------------------------------
+
+    @staticmethod
+    def pool_key(type: ProfileType, gender: Gender, category_id: Optional[int]) -> str:
+        return f"{PairService.POOL_PREFIX}:{ranking_service.namespace(type, gender, category_id)}"
+
+    @staticmethod
+    def pool_namespaces(profile) -> List[str]:
+        """Pools en los que entra un perfil: el de su categoría y el de todas."""
+        namespaces = [ranking_service.namespace(profile.type, profile.gender, profile.category_id)]
+        if profile.category_id:
+            namespaces.append(ranking_service.namespace(profile.type, profile.gender, None))
+        return namespaces
+
+    def _pool_keys_for(self, profile) -> List[str]:
+        return [f"{self.POOL_PREFIX}:{ns}" for ns in self.pool_namespaces(profile)]
+
+    def pool_version_key(self, namespace: str) -> str:
+        return f"{self.POOL_VERSION_PREFIX}:{namespace}"
+
+    def _bump_versions(self, pipe, namespaces: Iterable[str]):
+        """Cambió la composición del pool: las coberturas selladas dejan de valer."""
+        for ns in namespaces:
+            pipe.incr(self.pool_version_key(ns))
+
+    async def pools_ready(self) -> bool:
+        if not self.redis:
+            return False
+        try:
+            return bool(await self.redis.exists(self.POOLS_READY_KEY))
+        except Exception as e:
+            logger.error(f"Redis error in pair pools_ready: {e}")
+            return False
+
+    async def sync_pools(self, *profiles):
+        """
+        Refleja en los pools el estado de los perfiles (SADD si están activos
+        y aprobados, SREM si no). Se llama después del commit.
+        """
+        self.update_exposure(*profiles)
+        if not self.redis or not profiles:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for p in profiles:
+                for key in self._pool_keys_for(p):
+                    if p.is_active and p.is_approved:
+                        pipe.sadd(key, p.id)
+                    else:
+                        pipe.srem(key, p.id)
+                self._bump_versions(pipe, self.pool_namespaces(p))
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis error in pair pool sync: {e}")
+
+    async def remove_from_pools(self, *profiles):
+        for p in profiles:
+            for key in self._pool_keys_for(p):
+                if key in self._samplers:
+                    self._samplers[key][1].remove(p.id)
+                if key in self._rating_indexes:
+                    self._rating_indexes[key][1].set(p.id, None)
+        if not self.redis or not profiles:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            for p in profiles:
+                for key in self._pool_keys_for(p):
+                    pipe.srem(key, p.id)
+                self._bump_versions(pipe, self.pool_namespaces(p))
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis error in pair pool remove: {e}")
+
+    async def rebuild_pools(self, db: AsyncSession, chunk_size: int = 5000) -> int:
+        """
+        Carga masiva de los pools desde la BD (paginación por id).
+        Devuelve el número de perfiles cargados.
+        """
+        if not self.redis:
+            return 0
+        if not await self.redis.set(self.POOLS_LOCK_KEY, "1", nx=True, ex=600):
+            logger.info("pair_pools.rebuild already running")
+            return 0
+        try:
+            await self.redis.delete(self.POOLS_READY_KEY)
+            stale = [k async for k in self.redis.scan_iter(f"{self.POOL_PREFIX}:*") if k != self.POOLS_LOCK_KEY]
+            if stale:
+                await self.redis.delete(*stale)
+
+            loaded = 0
+            last_id = 0
+            namespaces = set()
+            while True:
+                result = await db.execute(
+                    select(Profile.id, Profile.type, Profile.gender, Profile.category_id)
+                    .filter(Profile.is_active == True, Profile.is_approved == True, Profile.id > last_id)
+                    .order_by(Profile.id)
+                    .limit(chunk_size)
+                )
+                chunk = result.all()
+                if not chunk:
+                    break
+                members: Dict[str, List[int]] = {}
+                for row in chunk:
+                    for ns in self.pool_namespaces(row):
+                        members.setdefault(f"{self.POOL_PREFIX}:{ns}", []).append(row.id)
+                        namespaces.add(ns)
+                pipe = self.redis.pipeline(transaction=False)
+                for key, ids in members.items():
+                    pipe.sadd(key, *ids)
+                await pipe.execute()
+                loaded += len(chunk)
+                last_id = chunk[-1].id
+
+            pipe = self.redis.pipeline(transaction=False)
+            self._bump_versions(pipe, namespaces)
+            pipe.set(self.POOLS_READY_KEY, "1")
+            await pipe.execute()
+            logger.info(f"pair_pools.rebuild loaded={loaded}")
+            return loaded
+        finally:
+            await self.redis.delete(self.POOLS_LOCK_KEY)
+
+    @staticmethod
+    def pool_filters(type: ProfileType, gender: Gender, category_id: Optional[int]) -> List:
+        filters = [
+            Profile.type == type,
+            Profile.gender == gender,
+            Profile.is_active == True,
+            Profile.is_approved == True,
+        ]
+        if category_id:
+            filters.append(Profile.category_id == category_id)
+        return filters
+
+    # --- Exploración ponderada ---------------------------------------------
+
+    def update_exposure(self, *profiles):
+        """
+        Ajusta el peso y el ELO de los perfiles en los samplers e índices ya
+        cargados de este proceso (tras un voto, o al entrar o salir del pool).
+        Los votos de otros procesos se recogen al recargar.
+        """
+        for p in profiles:
+            eligible = p.is_active and p.is_approved
+            for key in self._pool_keys_for(p):
+                entry = self._samplers.get(key)
+                if entry:
+                    entry[1].set(p.id, exposure_weight(p.voted_count) if eligible else 0)
+                entry = self._rating_indexes.get(key)
+                if entry:
+                    entry[1].set(p.id, p.elo_score if eligible else None)
+
+    async def exposure_sampler(self, db: AsyncSession, type: ProfileType, gender: Gender,
+                               category_id: Optional[int]) -> WeightedSampler:
+        """Sampler del pool; se reconstruye desde la BD cada PAIR_EXPLORE_REFRESH segundos."""
+        key = self.pool_key(type, gender, category_id)
+        entry = self._samplers.get(key)
+        if entry and time.monotonic() - entry[0] < settings.PAIR_EXPLORE_REFRESH:
+            return entry[1]
+        query = select(Profile.id, Profile.voted_count).filter(*self.pool_filters(type, gender, category_id))
+        rows = (await db.execute(query)).all()
+        sampler = WeightedSampler((r.id, exposure_weight(r.voted_count)) for r in rows)
+        self._samplers[key] = (time.monotonic(), sampler)
+        return sampler
+
+    async def rating_index(self, db: AsyncSession, type: ProfileType, gender: Gender,
+                           category_id: Optional[int]) -> RatingIndex:
+        """Índice por ELO del pool; se reconstruye desde la BD cada PAIR_CLOSE_REFRESH segundos."""
+        key = self.pool_key(type, gender, category_id)
+        entry = self._rating_indexes.get(key)
+        if entry and time.monotonic() - entry[0] < settings.PAIR_CLOSE_REFRESH:
+            return entry[1]
+        query = select(Profile.id, rating_service.elo_score().label("elo_score")).filter(
+            *self.pool_filters(type, gender, category_id)
+        )
+        rows = (await db.execute(query)).all()
+        index = RatingIndex((r.id, r.elo_score) for r in rows)
+        self._rating_indexes[key] = (time.monotonic(), index)
+        return index
+
+    async def candidate_pool(self, db: AsyncSession, type: ProfileType, gender: Gender,
+                             category_id: Optional[int], mode: PairMode = PairMode.RANDOM) -> CandidatePool:
+        """
+        Pool de una vista. Con los pools de Redis cargados solo se lee su
+        tamaño (SCARD); si no, se consultan los ids en la BD, salvo que el
+        pool pase de PAIR_DB_SAMPLE_THRESHOLD: entonces se muestrea dentro de
+        la BD (DatabaseSampledPool). El modo CLOSE necesita además el
+        leaderboard de Redis, o el índice por ELO del proceso; el modo EXPLORE usa el
+        sampler ponderado del proceso.
+        """
+        namespace = ranking_service.namespace(type, gender, category_id)
+        if mode == PairMode.EXPLORE:
+            sampler = await self.exposure_sampler(db, type, gender, category_id)
+            return CandidatePool(len(sampler), mode=mode, sampler=sampler, namespace=namespace)
+        window = settings.PAIR_CLOSE_WINDOW
+        close = mode == PairMode.CLOSE
+        if await self.pools_ready() and (not close or await leaderboard_service.is_ready()):
+            key = self.pool_key(type, gender, category_id)
+            rating_key = leaderboard_service.key(namespace)
+            try:
+                return CandidatePool(await self.redis.scard(key), redis=self.redis, key=key,
+                                     mode=mode, rating_key=rating_key, window=window, namespace=namespace)
+            except Exception as e:
+                logger.error(f"Redis error reading pair pool: {e}")
+        filters = self.pool_filters(type, gender, category_id)
+        if close:
+            index = await self.rating_index(db, type, gender, category_id)
+            return CandidatePool(len(index), mode=mode, index=index, window=window, namespace=namespace)
+
+        large = self._large_pools.get(namespace)
+        if large and time.monotonic() - large[0] < self.LARGE_POOL_TTL:
+            return DatabaseSampledPool(large[1], filters, namespace=namespace)
+        # Se leen como mucho umbral + 1 ids para decidir la estrategia
+        threshold = settings.PAIR_DB_SAMPLE_THRESHOLD
+        ids = (await db.execute(select(Profile.id).filter(*filters).limit(threshold + 1))).scalars().all()
+        if len(ids) <= threshold:
+            self._large_pools.pop(namespace, None)
+            return CandidatePool(len(ids), ids=ids, namespace=namespace)
+        size = (await db.execute(select(func.count(Profile.id)).filter(*filters))).scalar()
+        self._large_pools[namespace] = (time.monotonic(), size)
+        return DatabaseSampledPool(size, filters, namespace=namespace)
+
+    # --- Cobertura y enumeración de pares sin votar -------------------------
+
+    @staticmethod
+    def pool_voted_key(user_id: int, namespace: str) -> str:
+        return f"voted_pairs:{user_id}:{namespace}"
+
+    @staticmethod
+    def cursor_key(user_id: int, namespace: str) -> str:
+        return f"pair_cursor:{user_id}:{namespace}"
+
+    @staticmethod
+    def _pool_stamp(version, pool: CandidatePool) -> str:
+        return f"#{version or 0}:{len(pool)}"
+
+    async def coverage(self, db: AsyncSession, user_id: int, pool: CandidatePool) -> Optional[int]:
+        """
+        Pares del pool que el usuario ya votó, en O(1). Si el pool cambió
+        desde el último recuento (otra versión u otro tamaño) se recuenta.
+        None si no se puede saber (sin Redis o pool sin vista).
+        """
+        if not self.redis or not pool.namespace:
+            return None
+        ns = pool.namespace
+        key = self.pool_voted_key(user_id, ns)
+        try:
+            version = await self.redis.get(self.pool_version_key(ns))
+            current = self._pool_stamp(version, pool)
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.sismember(self.voted_key(user_id), self.SENTINEL)
+            pipe.sismember(key, current)
+            pipe.scard(key)
+            built, sealed, size = await pipe.execute()
+            if built and sealed:
+                return size - 1
+            if not built:
+                await self.rebuild_voted(db, user_id)
+            return await self._recount_coverage(db, user_id, pool, current)
+        except Exception as e:
+            logger.error(f"Redis error reading pair coverage: {e}")
+            return None
+
+    async def _recount_coverage(self, db: AsyncSession, user_id: int, pool: CandidatePool, stamp: str) -> Optional[int]:
+        """Rehace el set de cobertura; WATCH sobre los votados evita perder un voto concurrente."""
+        key = self.pool_voted_key(user_id, pool.namespace)
+        for _ in range(3):
+            async with self.redis.pipeline(transaction=True) as pipe:
+                try:
+                    await pipe.watch(self.voted_key(user_id))
+                    pairs = [f"{lo}:{hi}" for lo, hi in await self.voted_pairs_in_pool(db, user_id, pool)]
+                    pipe.multi()
+                    pipe.delete(key)
+                    for i in range(0, len(pairs), 5000):
+                        pipe.sadd(key, *pairs[i:i + 5000])
+                    pipe.sadd(key, stamp)
+                    pipe.expire(key, self.VOTED_TTL)
+                    await pipe.execute()
+                    return len(pairs)
+                except redis.WatchError:
+                    continue
+        return None
+
+    @staticmethod
+    def _pair_at(members: Sequence[int], index: int) -> List[int]:
+        """Par número `index` de los n(n-1)/2 del pool: (i, j) con i < j, index = j(j-1)/2 + i."""
+        j = (1 + math.isqrt(1 + 8 * index)) // 2
+        return [members[index - j * (j - 1) // 2], members[j]]
+
+    async def unseen_pairs(self, db: AsyncSession, user_id: int, pool: CandidatePool, count: int,
+                           exclude: Optional[Set[Tuple[int, int]]] = None) -> List[List[int]]:
+        """
+        Enumerador determinista: recorre los pares del pool en el orden de una
+        permutación afín fija por usuario (k -> a*k + b mod total), guardando
+        el cursor en Redis, y devuelve los primeros `count` sin votar.
+        Solo se usa con cobertura alta, cuando el pool es pequeño respecto a
+        los votos del usuario. Lanza NoMorePairs si una vuelta completa no
+        encuentra ninguno. Los pools muestreados en la BD no se enumeran:
+        van a la búsqueda por ventanas.
+        """
+        if isinstance(pool, DatabaseSampledPool):
+            return await self._search_windows(db, user_id, pool, count, exclude)
+        members = sorted(await pool.members(db))
+        total = len(members) * (len(members) - 1) // 2
+        if total == 0:
+            raise NoMorePairs()
+        exclude = exclude or set()
+        key = self.cursor_key(user_id, pool.namespace)
+        version = await self.redis.get(self.pool_version_key(pool.namespace))
+        stamp = self._pool_stamp(version, pool)
+        raw = await self.redis.get(key)
+        state = json.loads(raw) if raw else None
+        if not state or state["stamp"] != stamp:
+            a = random.randrange(1, total) if total > 1 else 1
+            while math.gcd(a, total) != 1:
+                a = random.randrange(1, total)
+            state = {"stamp": stamp, "a": a, "b": random.randrange(total), "k": 0}
+
+        pairs: List[List[int]] = []
+        scanned = 0
+        unvoted = False
+        while scanned < total and len(pairs) < count:
+            size = min(self.ENUMERATE_BATCH, total - scanned)
+            batch = [
+                self._pair_at(members, (state["a"] * ((state["k"] + t) % total) + state["b"]) % total)
+                for t in range(size)
+            ]
+            mask = await self.voted_mask(db, user_id, batch)
+            consumed = size
+            for t, (pair, voted) in enumerate(zip(batch, mask)):
+                if voted:
+                    continue
+                unvoted = True
+                if canonical_pair(*pair) in exclude:
+                    continue
+                pairs.append(pair)
+                if len(pairs) == count:
+                    consumed = t + 1
+                    break
+            state["k"] = (state["k"] + consumed) % total
+            scanned += consumed
+        await self.redis.set(key, json.dumps(state), ex=self.VOTED_TTL)
+        if not unvoted:
+            raise NoMorePairs()
+        return pairs
+
+    async def _search_windows(self, db: AsyncSession, user_id: int, pool: DatabaseSampledPool, count: int,
+                              exclude: Optional[Set[Tuple[int, int]]] = None) -> List[List[int]]:
+        """
+        Pares sin votar de un pool muestreado en la BD sin traerlo entero:
+        se recorre por ventanas de random_key emparejando cada id nuevo con
+        los ya vistos hasta reunir `count`. Con lo votado en el pool (acotado
+        por el historial) y el tamaño del COUNT se sabe si quedan pares.
+        """
+        voted = await self.voted_pairs_in_pool(db, user_id, pool)
+        n = len(pool)
+        if len(voted) >= n * (n - 1) // 2:
+            raise NoMorePairs()
+        blocked = voted | set(exclude or ())
+        pairs: List[List[int]] = []
+        seen: List[int] = []
+        async for window in pool.windows(db, self.ENUMERATE_BATCH):
+            for b in window:
+                for a in seen:
+                    key = canonical_pair(a, b)
+                    if key not in blocked:
+                        blocked.add(key)
+                        pairs.append([a, b])
+                        break
+                if len(pairs) == count:
+                    return pairs
+                seen.append(b)
+        if not pairs:
+            raise NoMorePairs()
+        return pairs
+
+    async def _dense_pairs(self, db: AsyncSession, user_id: int, pool: CandidatePool, count: int,
+                           exclude: Optional[Set[Tuple[int, int]]] = None) -> Optional[List[List[int]]]:
+        """
+        Atajo por cobertura: NoMorePairs si ya votó todos los pares del pool,
+        el enumerador si votó más de PAIR_COVERAGE_ENUMERATE de ellos y None
+        (muestreo normal) en otro caso.
+        """
+        total = len(pool) * (len(pool) - 1) // 2
+        # Cota sin recuento: no puede tener cubiertos más pares de los que ha votado
+        voted = await self.voted_total(user_id)
+        if voted is not None and voted < total * settings.PAIR_COVERAGE_ENUMERATE:
+            return None
+        covered = await self.coverage(db, user_id, pool)
+        if covered is None:
+            return None
+        if covered >= total:
+            raise NoMorePairs()
+        if covered < total * settings.PAIR_COVERAGE_ENUMERATE:
+            return None
+        return await self.unseen_pairs(db, user_id, pool, count, exclude)
+
+    # --- Selección --------------------------------------------------------
+
+    @staticmethod
+    def _as_pool(candidates: Union[CandidatePool, Sequence[int]]) -> CandidatePool:
+        if isinstance(candidates, CandidatePool):
+            return candidates
+        return CandidatePool(len(candidates), ids=candidates)
+
+    async def pick_pair(self, db: AsyncSession, candidates: Union[CandidatePool, Sequence[int]],
+                        user_id: Optional[int] = None) -> List[int]:
+        """
+        Elige dos candidatos que el usuario no haya votado juntos.
+        Lanza NoMorePairs si ya los votó todos.
+        """
+        pool = self._as_pool(candidates)
+        if not user_id:
+            return (await pool.draw(db, 1))[0]
+        dense = await self._dense_pairs(db, user_id, pool, 1)
+        if dense is not None:
+            return dense[0]
+
+        # Todos los intentos del muestreo se comprueban en un solo viaje a Redis
+        attempts = await pool.draw(db, self.MAX_ATTEMPTS)
+        mask = await self.voted_mask(db, user_id, attempts)
+        for pair, voted in zip(attempts, mask):
+            if not voted:
+                return pair
+
+        # Muestreo fallido: con la vista conocida el enumerador da la respuesta exacta
+        if isinstance(pool, DatabaseSampledPool) or (self.redis and pool.namespace):
+            return (await self.unseen_pairs(db, user_id, pool, 1))[0]
+        # Sin Redis (pool pequeño) se leen el pool completo y lo votado en él
+        members = await pool.members(db)
+        n = len(members)
+        voted_in_pool = await self.voted_pairs_within(db, user_id, set(members))
+        if len(voted_in_pool) >= n * (n - 1) // 2:
+            raise NoMorePairs()
+        # Quedan pares sin votar: se busca uno de forma exhaustiva
+        shuffled = random.sample(members, n)
+        for i, a in enumerate(shuffled):
+            for b in shuffled[i + 1:]:
+                if canonical_pair(a, b) not in voted_in_pool:
+                    return [a, b]
+        raise NoMorePairs()
+
+    async def sample_pairs(
+        self,
+        db: AsyncSession,
+        candidates: Union[CandidatePool, Sequence[int]],
+        user_id: Optional[int],
+        count: int,
+        exclude: Optional[Set[Tuple[int, int]]] = None,
+    ) -> List[List[int]]:
+        """
+        Hasta `count` pares distintos sin votar (y fuera de `exclude`),
+        comprobados en un solo viaje a Redis. Lanza NoMorePairs si no queda ninguno.
+        """
+        pool = self._as_pool(candidates)
+        seen = set(exclude or ())
+        if user_id:
+            dense = await self._dense_pairs(db, user_id, pool, count, seen)
+            if dense is not None:
+                return dense
+        attempts = await pool.draw(db, max(self.MAX_ATTEMPTS, count * 4))
+        mask = await self.voted_mask(db, user_id, attempts) if user_id else [False] * len(attempts)
+        pairs = []
+        for pair, voted in zip(attempts, mask):
+            key = canonical_pair(*pair)
+            if voted or key in seen:
+                continue
+            seen.add(key)
+            pairs.append(pair)
+            if len(pairs) == count:
+                break
+        if not pairs:
+            pair = await self.pick_pair(db, pool, user_id)
+            if canonical_pair(*pair) in seen:
+                return []
+            pairs.append(pair)
+        return pairs
+
+    # --- Cola de pares pregenerados por usuario ---------------------------
+
+    @staticmethod
+    def queue_key(user_id: int, type: ProfileType, gender: Gender, category_id: Optional[int],
+                  mode: PairMode = PairMode.RANDOM) -> str:
+        return f"pair_queue:{user_id}:{type}:{gender}:{category_id or 'none'}:{PairMode(mode).value}"
+
+    async def refill(self, db: AsyncSession, user_id: int, type: ProfileType, gender: Gender,
+                     category_id: Optional[int], target: Optional[int] = None,
+                     mode: PairMode = PairMode.RANDOM) -> int:
+        """Completa la cola del usuario hasta `target` pares sin votar. Devuelve cuántos añadió."""
+        if not self.redis:
+            return 0
+        target = target or settings.PAIR_PREFETCH_SIZE
+        key = self.queue_key(user_id, type, gender, category_id, mode)
+        queued = await self.redis.lrange(key, 0, -1)
+        need = target - len(queued)
+        if need <= 0:
+            return 0
+        pool = await self.candidate_pool(db, type, gender, category_id, mode)
+        if len(pool) < 2:
+            return 0
+        exclude = {canonical_pair(*(int(x) for x in item.split(":"))) for item in queued}
+        try:
+            pairs = await self.sample_pairs(db, pool, user_id, need, exclude)
+        except NoMorePairs:
+            return 0
+        if pairs:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.rpush(key, *[f"{a}:{b}" for a, b in pairs])
+            pipe.expire(key, settings.PAIR_QUEUE_TTL)
+            await pipe.execute()
+            self.refills_total += 1
+        return len(pairs)
+
+    async def refill_in_background(self, user_id: int, type: ProfileType, gender: Gender, category_id: Optional[int],
+                                   mode: PairMode = PairMode.RANDOM):
+        """Tarea posterior a la respuesta: usa su propia sesión de BD."""
+        session_factory = self.session_factory
+        if session_factory is None:
+            from app.db.session import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        if session_factory is None:
+            return
+        try:
+            async with session_factory() as db:
+                await self.refill(db, user_id, type, gender, category_id, mode=mode)
+        except Exception as e:
+            logger.error(f"pair_queue.refill.error user_id={user_id}: {e}")
+
+    async def next_pairs(self, db: AsyncSession, user_id: Optional[int], type: ProfileType, gender: Gender,
+                         category_id: Optional[int], count: int,
+                         mode: PairMode = PairMode.RANDOM) -> Tuple[List[List[int]], Optional[int]]:
+        """
+        Saca hasta `count` pares de la cola del usuario descartando los que
+        ya no son válidos (votados o perfiles fuera del pool) y completa lo
+        que falte muestreando en el momento. Devuelve los pares y cuántos
+        quedan en la cola (None si no hay cola).
+        """
+        pool = await self.candidate_pool(db, type, gender, category_id, mode)
+        if len(pool) < 2:
+            raise NoMorePairs()
+
+        pairs: List[List[int]] = []
+        remaining = None
+        if user_id and self.redis:
+            key = self.queue_key(user_id, type, gender, category_id, mode)
+            try:
+                popped = await self.redis.lpop(key, count) or []
+                remaining = await self.redis.llen(key)
+            except Exception as e:
+                logger.error(f"Redis error popping pair queue: {e}")
+                popped = []
+            queued = [[int(x) for x in item.split(":")] for item in popped]
+            in_pool = await pool.contains(db, [pid for pair in queued for pid in pair])
+            queued = [p for i, p in enumerate(queued) if in_pool[2 * i] and in_pool[2 * i + 1]]
+            mask = await self.voted_mask(db, user_id, queued)
+            valid = [p for p, voted in zip(queued, mask) if not voted]
+            self.stale_dropped_total += len(popped) - len(valid)
+            pairs = valid
+
+        if len(pairs) < count:
+            exclude = {canonical_pair(*p) for p in pairs}
+            try:
+                pairs += await self.sample_pairs(db, pool, user_id, count - len(pairs), exclude)
+            except NoMorePairs:
+                if not pairs:
+                    raise
+        return pairs, remaining
+
+pair_service = PairService()
@@ -0,0 +1,177 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import orjson
+import redis
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app import schemas
+from app.core import redis_client as redis_module
+from app.core.config import settings
+from app.models.profile import Profile
+from app.services.rating_service import rating_service
+
+logger = logging.getLogger(__name__)
+
+
+# Columnas de schemas.Profile: las tarjetas se cargan como filas planas, sin
+# hidratar entidades en la sesión. El rating es el de la temporada activa.
+CARD_COLUMNS = (
+    Profile.id, Profile.type, Profile.gender, Profile.image_url,
+    *rating_service.columns(),
+    Profile.user_id, Profile.category_id, Profile.is_active, Profile.is_approved,
+    Profile.created_at, Profile.updated_at,
+)
+
+_cards_adapter = TypeAdapter(List[schemas.Profile])
+
+
+def serialize_cards(rows) -> List[dict]:
+    """Perfiles públicos (schemas.Profile) de muchas filas (mappings) como dicts listos para JSON."""
+    return _cards_adapter.dump_python(_cards_adapter.validate_python(rows), mode="json")
+
+
+class ProfileCardService:
+    """
+    Tarjetas de perfil (id -> perfil público serializado) con lectura en
+    cascada: LRU con TTL en el proceso, hash de Redis compartido entre
+    workers y, para los fallos, una única consulta a la BD.
+
+    Las escrituras (aprobación, baja, voto, borrado) no reescriben el hash
+    desde objetos en memoria: invalidan la tarjeta (HDEL y nueva generación
+    en profile_cards:gen:{id}) y la siguiente lectura la rellena desde la BD.
+    El relleno solo se guarda si ninguna de sus generaciones cambió mientras
+    se consultaba la BD (WATCH), así una lectura lenta no deja una tarjeta
+    vieja en el hash, que no caduca. La caché local de otros workers puede
+    ir hasta PROFILE_CARD_LOCAL_TTL segundos por detrás.
+    """
+    KEY = "profile_cards"
+    GEN_PREFIX = "profile_cards:gen"
+    GEN_TTL = 60 * 60 * 24
+
+    def __init__(self):
+        self._local: "OrderedDict[int, Tuple[float, dict]]" = OrderedDict()
+
+    @property
+    def redis(self):
+        return redis_module.async_redis
+
+    def _get_local(self, profile_id: int) -> Optional[dict]:
+        entry = self._local.get(profile_id)
+        if entry is None:
+            return None
+        expires, card = entry
+        if expires < time.monotonic():
+            del self._local[profile_id]
+            return None
+        self._local.move_to_end(profile_id)
+        return card
+
+    def _set_local(self, cards: Dict[int, dict]):
+        expires = time.monotonic() + settings.PROFILE_CARD_LOCAL_TTL
+        for pid, card in cards.items():
+            self._local[pid] = (expires, card)
+            self._local.move_to_end(pid)
+        while len(self._local) > settings.PROFILE_CARD_LOCAL_MAX:
+            self._local.popitem(last=False)
+
+    def gen_key(self, profile_id: int) -> str:
+        return f"{self.GEN_PREFIX}:{profile_id}"
+
+    async def _fill(self, cards: Dict[int, dict], gens: Optional[Dict[int, Optional[str]]]):
+        """Guarda tarjetas leídas de la BD salvo si alguna se invalidó mientras tanto."""
+        if not self.redis:
+            self._set_local(cards)
+            return
+        if not cards or gens is None:
+            return
+        keys = [self.gen_key(pid) for pid in cards]
+        try:
+            async with self.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(*keys)
+                current = await pipe.mget(keys)
+                if any(gen != gens.get(pid) for pid, gen in zip(cards, current)):
+                    return
+                pipe.multi()
+                pipe.hset(self.KEY, mapping={pid: orjson.dumps(card) for pid, card in cards.items()})
+                await pipe.execute()
+        except redis.WatchError:
+            # Invalidada a la vez: la siguiente lectura la rellena de nuevo
+            return
+        except Exception as e:
+            logger.error(f"Redis error in profile card store: {e}")
+            return
+        self._set_local(cards)
+
+    async def get_many(self, db: AsyncSession, ids: Iterable[int]) -> Dict[int, dict]:
+        """
+        Tarjetas de los ids pedidos que existen (activos o no: el filtro
+        lo decide quien llama).
+        """
+        cards: Dict[int, dict] = {}
+        missing: List[int] = []
+        for pid in dict.fromkeys(ids):
+            card = self._get_local(pid)
+            if card is None:
+                missing.append(pid)
+            else:
+                cards[pid] = card
+
+        gens = None
+        if missing and self.redis:
+            try:
+                # Tarjetas y generaciones en un viaje; las generaciones protegen el relleno
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.hmget(self.KEY, missing)
+                pipe.mget([self.gen_key(pid) for pid in missing])
+                cached, current = await pipe.execute()
+                gens = dict(zip(missing, current))
+                found = {pid: orjson.loads(raw) for pid, raw in zip(missing, cached) if raw}
+                self._set_local(found)
+                cards.update(found)
+                missing = [pid for pid in missing if pid not in found]
+            except Exception as e:
+                logger.error(f"Redis error in profile card get: {e}")
+
+        if missing:
+            result = await db.execute(select(*CARD_COLUMNS).filter(Profile.id.in_(missing)))
+            loaded = {card["id"]: card for card in serialize_cards(result.mappings().all())}
+            await self._fill(loaded, gens)
+            cards.update(loaded)
+        return cards
+
+    async def get(self, db: AsyncSession, profile_id: int) -> Optional[dict]:
+        return (await self.get_many(db, [profile_id])).get(profile_id)
+
+    async def invalidate(self, *profile_ids: int):
+        """Descarta las tarjetas tras un cambio ya confirmado en la BD."""
+        for pid in profile_ids:
+            self._local.pop(pid, None)
+        if not self.redis or not profile_ids:
+            return
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.hdel(self.KEY, *profile_ids)
+            for pid in profile_ids:
+                pipe.incr(self.gen_key(pid))
+                pipe.expire(self.gen_key(pid), self.GEN_TTL)
+            await pipe.execute()
+        except Exception as e:
+            logger.error(f"Redis error in profile card invalidate: {e}")
+
+    async def clear(self):
+        """Descarta todas las tarjetas (p. ej. tras reiniciar la temporada)."""
+        self._local.clear()
+        if not self.redis:
+            return
+        try:
+            await self.redis.delete(self.KEY)
+        except Exception as e:
+            logger.error(f"Redis error in profile card clear: {e}")
+
+
+profile_card_service = ProfileCardService()
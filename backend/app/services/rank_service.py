@@ -0,0 +1,92 @@
+import logging
+from typing import Dict, Iterable, Optional
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm import aliased
+
+from app.models.profile import Profile
+from app.services.leaderboard_service import leaderboard_service
+from app.services.rating_service import rating_service
+
+logger = logging.getLogger(__name__)
+
+
+class RankService:
+    """
+    Posición y percentil de perfiles en el ranking global (activos y
+    aprobados), con la misma semántica que rank() OVER (ORDER BY elo DESC):
+    posición = 1 + perfiles con ELO estrictamente mayor.
+    Con el leaderboard cargado cada consulta es O(log n) (ZSCORE + ZCOUNT);
+    si no, se calcula en la BD solo para los perfiles pedidos.
+    """
+
+    @staticmethod
+    def _entry(profile_id: int, rank: int, total: int) -> Dict:
+        return {
+            "profile_id": profile_id,
+            "rank": rank,
+            "total": total,
+            # Porcentaje de perfiles que quedan por debajo
+            "percentile": round((total - rank) / total * 100, 2) if total else None,
+        }
+
+    async def ranks_from_leaderboard(self, profile_ids) -> Optional[Dict[int, Dict]]:
+        """Solo Redis, sin BD (p.ej. tras un voto). None si Redis falla."""
+        redis = leaderboard_service.redis
+        key = leaderboard_service.GLOBAL_KEY
+        try:
+            pipe = redis.pipeline(transaction=False)
+            for pid in profile_ids:
+                pipe.zscore(key, pid)
+            pipe.zcard(key)
+            *scores, total = await pipe.execute()
+
+            found = [(pid, score) for pid, score in zip(profile_ids, scores) if score is not None]
+            pipe = redis.pipeline(transaction=False)
+            for _, score in found:
+                pipe.zcount(key, f"({score}", "+inf")
+            above = await pipe.execute() if found else []
+        except Exception as e:
+            logger.error(f"Redis error in rank lookup: {e}")
+            return None
+        return {pid: self._entry(pid, count + 1, total) for (pid, _), count in zip(found, above)}
+
+    async def _ranks_from_db(self, db: AsyncSession, profile_ids) -> Dict[int, Dict]:
+        ranked = (Profile.is_active == True, Profile.is_approved == True)
+        other = aliased(Profile)
+        above = (
+            select(func.count(other.id))
+            .filter(other.is_active == True, other.is_approved == True,
+                    await rating_service.elo_order(db, other) > rating_service.elo_score())
+            .correlate(Profile)
+            .scalar_subquery()
+        )
+        result = await db.execute(
+            select(Profile.id, above.label("above")).filter(Profile.id.in_(profile_ids), *ranked)
+        )
+        rows = result.all()
+        if not rows:
+            return {}
+        total = (await db.execute(select(func.count(Profile.id)).filter(*ranked))).scalar()
+        return {row.id: self._entry(row.id, row.above + 1, total) for row in rows}
+
+    async def get_ranks(self, db: AsyncSession, profile_ids: Iterable[int]) -> Dict[int, Dict]:
+        """
+        Variante por lotes. Los perfiles que no están en el ranking
+        (inactivos, pendientes o inexistentes) no aparecen en el resultado.
+        """
+        profile_ids = list(dict.fromkeys(profile_ids))
+        if not profile_ids:
+            return {}
+        if await leaderboard_service.is_ready():
+            ranks = await self.ranks_from_leaderboard(profile_ids)
+            if ranks is not None:
+                return ranks
+        return await self._ranks_from_db(db, profile_ids)
+
+    async def get_rank(self, db: AsyncSession, profile_id: int) -> Optional[Dict]:
+        return (await self.get_ranks(db, [profile_id])).get(profile_id)
+
+rank_service = RankService()
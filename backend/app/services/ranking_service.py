@@ -1,21 +1,88 @@
-from typing import Tuple, List, Optional
-import json
-from app.core.redis_client import redis_client
+from typing import Tuple, List, Optional, Iterable, Dict
+import logging
+from app.core.cache import CacheNamespace, key_part
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Top N por vista; la versión de cada vista sube al cambiar sus perfiles (cada
+# voto), así que mientras uno recalcula el resto recibe la copia anterior
+ranking_cache = CacheNamespace(
+    "ranking", ttl=60, local_ttl=settings.RANKING_CACHE_LOCAL_TTL,
+    versioned=True, stale_ttl=settings.RANKING_CACHE_STALE_TTL, encodings=("br", "gzip"),
+)
 
 class RankingService:
     K_FACTOR = 32
-    CACHE_KEY = "ranking_cache"
-    CACHE_TTL = 60 * 5 # 5 minutes
 
     @staticmethod
-    def invalidate_ranking_cache():
-        if not redis_client:
-            return
-        try:
-            for key in redis_client.scan_iter("ranking:*"):
-                redis_client.delete(key)
-        except Exception:
-            pass
+    def namespace(type, gender=None, category_id=None) -> str:
+        """Espacio de nombres de una vista de ranking (tipo/género/categoría)."""
+        return f"{key_part(type)}:{key_part(gender)}:{key_part(category_id or None)}"
+
+    @staticmethod
+    def profile_namespaces(type, gender, category_id=None) -> List[str]:
+        """
+        Vistas de ranking en las que aparece un perfil: la suya exacta y las
+        que no filtran por género y/o categoría.
+        """
+        namespaces = [
+            RankingService.namespace(type, gender, category_id),
+            RankingService.namespace(type, None, category_id),
+        ]
+        if category_id:
+            namespaces += [
+                RankingService.namespace(type, gender, None),
+                RankingService.namespace(type, None, None),
+            ]
+        return namespaces
+
+    @staticmethod
+    async def ranking_cache_key(type, gender, category_id, limit: int) -> str:
+        """
+        Clave versionada: incluye la generación del namespace y la global,
+        así invalidar es un INCR y las claves viejas caducan por TTL.
+        """
+        return (await RankingService.ranking_cache_keys([(type, gender, category_id)], limit))[0]
+
+    @staticmethod
+    async def ranking_cache_keys(views: List[Tuple], limit: int) -> List[str]:
+        """
+        Claves versionadas de varias vistas (tipo, género, categoría) con un
+        solo MGET de versiones.
+        """
+        namespaces = [RankingService.namespace(*view) for view in views]
+        return await ranking_cache.keys([((ns, limit), [ns]) for ns in namespaces])
+
+    @staticmethod
+    async def ranking_body(type, gender, category_id, limit: int, accept_encoding: Optional[str] = None):
+        """
+        (clave versionada, bytes cacheados o None) de una vista: versiones y
+        cuerpo precomprimido en un solo viaje (ver CacheNamespace.lookup_body).
+        """
+        namespace = RankingService.namespace(type, gender, category_id)
+        return await ranking_cache.lookup_body((namespace, limit), [namespace], accept_encoding)
+
+    @staticmethod
+    def ranking_stale_keys(views: List[Tuple], limit: int) -> List[str]:
+        return [ranking_cache.stale_key(RankingService.namespace(*view), limit) for view in views]
+
+    @staticmethod
+    async def invalidate_namespaces(namespaces: Iterable[str]):
+        await ranking_cache.invalidate(*namespaces)
+
+    @staticmethod
+    async def invalidate_profiles(*profiles):
+        """Invalida solo las vistas de ranking que contienen a estos perfiles."""
+        namespaces = []
+        for p in profiles:
+            namespaces += RankingService.profile_namespaces(p.type, p.gender, p.category_id)
+        await RankingService.invalidate_namespaces(namespaces)
+
+    @staticmethod
+    async def invalidate_ranking_cache():
+        """Invalida todas las vistas de ranking (p.ej. al reiniciar temporada)."""
+        await ranking_cache.invalidate_all()
 
     @staticmethod
     def calculate_elo(winner_rating: int, loser_rating: int) -> Tuple[int, int]:
@@ -28,26 +95,10 @@ class RankingService:
         new_winner_rating = round(winner_rating + RankingService.K_FACTOR * (1 - expected_winner))
         new_loser_rating = round(loser_rating + RankingService.K_FACTOR * (0 - expected_loser))
 
-        RankingService.invalidate_ranking_cache()
-
         return new_winner_rating, new_loser_rating
 
     @staticmethod
-    def get_cached_ranking(key: str) -> Optional[str]:
-        if not redis_client:
-            return None
-        try:
-            return redis_client.get(key)
-        except Exception:
-            return None
-
-    @staticmethod
-    def set_cached_ranking(key: str, data: str, ttl: int = 300):
-        if not redis_client:
-            return
-        try:
-            redis_client.setex(key, ttl, data)
-        except Exception:
-            pass
+    def cache_stats() -> Dict:
+        return ranking_cache.snapshot()
 
 ranking_service = RankingService()
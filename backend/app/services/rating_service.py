@@ -0,0 +1,268 @@
+import json
+import logging
+import time
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import case, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.core import redis_client as redis_module
+from app.db.dialect import dialect_insert
+from app.models.badge import Season
+from app.models.profile import DEFAULT_ELO, Profile, active_season_id
+from app.models.profile_season_rating import ProfileSeasonRating
+
+logger = logging.getLogger(__name__)
+
+
+class RatingService:
+    """
+    Acceso único a los ratings por temporada.
+
+    El perfil guarda en columnas normales los valores de una temporada
+    (rating_season_id). Abrir una temporada solo cambia la activa: las
+    filas de temporadas pasadas se leen como iniciales (current en Python,
+    elo_score()/columns() en SQL) hasta que reset_stale, un trabajo en
+    segundo plano reanudable, las archiva y reinicia por bloques. Si un voto
+    llega antes, el propio voto archiva la fila y parte de los iniciales.
+    """
+    FIELDS = ("elo_score", "voted_count", "win_count")
+    INITIAL = {"elo_score": DEFAULT_ELO, "voted_count": 0, "win_count": 0}
+    RESET_CHUNK = 1000
+    CHECKPOINT_PREFIX = "ratings:reset"
+
+    @property
+    def redis(self):
+        return redis_module.async_redis
+
+    @classmethod
+    def current(cls, profile, season_id: Optional[int]) -> Dict[str, int]:
+        """Rating vigente de un perfil cargado: los iniciales si aún no se reinició."""
+        if cls.is_stale(profile, season_id):
+            return dict(cls.INITIAL)
+        return {field: getattr(profile, field) for field in cls.FIELDS}
+
+    @staticmethod
+    def is_stale(profile, season_id: Optional[int]) -> bool:
+        """Los valores guardados pertenecen a una temporada que ya no es la activa."""
+        return profile.rating_season_id is not None and profile.rating_season_id != season_id
+
+    @staticmethod
+    def _stale_clause(entity=Profile):
+        # Como is_stale, contra la temporada activa leída en la misma consulta.
+        # Las temporadas se abren en orden de id, así que basta con "<" (y usa
+        # el índice de rating_season_id)
+        return entity.rating_season_id < active_season_id()
+
+    @classmethod
+    def column(cls, field: str, entity=Profile):
+        """Valor vigente de un campo en SQL: el inicial si la fila es de otra temporada."""
+        return case((cls._stale_clause(entity), cls.INITIAL[field]), else_=getattr(entity, field))
+
+    @classmethod
+    def elo_score(cls, entity=Profile):
+        """ELO vigente para ordenar y comparar en los rankings."""
+        return cls.column("elo_score", entity)
+
+    @classmethod
+    def columns(cls, entity=Profile):
+        """elo_score, voted_count y win_count vigentes, con sus nombres."""
+        return tuple(cls.column(field, entity).label(field) for field in cls.FIELDS)
+
+    async def elo_order(self, db: AsyncSession, entity=Profile):
+        """
+        ELO por el que ordenar un ranking en la BD: la columna indexada si no
+        queda ninguna fila de temporadas pasadas (lo normal una vez acabado
+        reset_stale), si no elo_score().
+        """
+        stale = await db.execute(select(Profile.id).filter(self._stale_clause()).limit(1))
+        return self.elo_score(entity) if stale.first() else entity.elo_score
+
+    async def archive_stale(self, db: AsyncSession, profiles: Iterable, season_id: Optional[int]) -> int:
+        """
+        Copia al histórico los valores de temporadas pasadas antes de
+        sobrescribirlos. No hace commit.
+        """
+        rows = [
+            {
+                "season_id": p.rating_season_id,
+                "profile_id": p.id,
+                "elo_score": p.elo_score,
+                "voted_count": p.voted_count,
+                "win_count": p.win_count,
+            }
+            for p in profiles
+            if self.is_stale(p, season_id)
+        ]
+        if rows:
+            await db.execute(
+                dialect_insert(db, ProfileSeasonRating)
+                .values(rows)
+                .on_conflict_do_nothing(index_elements=["season_id", "profile_id"])
+            )
+        return len(rows)
+
+    @staticmethod
+    def set_current(profile, season_id: Optional[int], elo_score: int, voted_count: int, win_count: int):
+        """Refleja en el objeto los valores escritos sin marcarlo como modificado."""
+        values = {"elo_score": elo_score, "voted_count": voted_count, "win_count": win_count}
+        set_committed_value(profile, "rating_season_id", season_id)
+        for field, value in values.items():
+            set_committed_value(profile, field, value)
+
+    @staticmethod
+    def _stale_chunk(season_id: int, after_id: int, limit: int):
+        # Paginación por id: cada bloque empieza donde acabó el anterior
+        return (
+            select(Profile.id, Profile.rating_season_id, Profile.elo_score, Profile.voted_count, Profile.win_count)
+            .filter(Profile.id > after_id)
+            .filter(Profile.rating_season_id.is_not(None), Profile.rating_season_id != season_id)
+            .order_by(Profile.id)
+            .limit(limit)
+        )
+
+    @staticmethod
+    def _archive_rows(db, rows):
+        return (
+            dialect_insert(db, ProfileSeasonRating)
+            .values([
+                {
+                    "season_id": r.rating_season_id,
+                    "profile_id": r.id,
+                    "elo_score": r.elo_score,
+                    "voted_count": r.voted_count,
+                    "win_count": r.win_count,
+                }
+                for r in rows
+            ])
+            .on_conflict_do_nothing(index_elements=["season_id", "profile_id"])
+        )
+
+    @classmethod
+    def _reset_rows(cls, rows, season_id: int):
+        # Un voto concurrente puede haberlo reiniciado ya: solo los que siguen atrasados
+        return (
+            update(Profile)
+            .where(Profile.id.in_([r.id for r in rows]), Profile.rating_season_id != season_id)
+            .values(rating_season_id=season_id, **cls.INITIAL)
+            .execution_options(synchronize_session=False)
+        )
+
+    def checkpoint_key(self, season_id: int) -> str:
+        return f"{self.CHECKPOINT_PREFIX}:{season_id}"
+
+    async def _load_checkpoint(self, key: str) -> Optional[Dict]:
+        if not self.redis:
+            return None
+        try:
+            raw = await self.redis.get(key)
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            logger.error(f"Redis error loading rating reset checkpoint: {e}")
+            return None
+
+    async def _save_checkpoint(self, key: str, state: Dict):
+        if not self.redis:
+            return
+        try:
+            await self.redis.set(key, json.dumps(state))
+        except Exception as e:
+            logger.error(f"Redis error saving rating reset checkpoint: {e}")
+
+    async def _clear_checkpoint(self, key: str):
+        if not self.redis:
+            return
+        try:
+            await self.redis.delete(key)
+        except Exception:
+            pass
+
+    async def reset_stale(self, db: AsyncSession, season_id: int, chunk_size: Optional[int] = None,
+                          restart: bool = False, max_chunks: Optional[int] = None) -> Dict:
+        """
+        Archiva y reinicia los perfiles de temporadas pasadas, un bloque por
+        transacción. Tras cada bloque guarda en Redis el último id, así una
+        ejecución interrumpida (o cortada con max_chunks) sigue donde iba.
+        """
+        t0 = time.perf_counter()
+        chunk_size = chunk_size or self.RESET_CHUNK
+        key = self.checkpoint_key(season_id)
+        if restart:
+            await self._clear_checkpoint(key)
+        state = await self._load_checkpoint(key)
+        resumed = state is not None
+        if not state:
+            state = {"last_id": 0, "rows": 0}
+        rows_at_start = state["rows"]
+        completed = False
+        chunks = 0
+
+        while max_chunks is None or chunks < max_chunks:
+            rows = (await db.execute(self._stale_chunk(season_id, state["last_id"], chunk_size))).all()
+            if not rows:
+                completed = True
+                break
+            chunks += 1
+            await db.execute(self._archive_rows(db, rows))
+            await db.execute(self._reset_rows(rows, season_id))
+            await db.commit()
+            state["last_id"] = rows[-1].id
+            state["rows"] += len(rows)
+            await self._save_checkpoint(key, state)
+
+        if completed:
+            await self._clear_checkpoint(key)
+        elapsed = time.perf_counter() - t0
+        stats = {
+            "season_id": season_id,
+            "resumed": resumed,
+            "completed": completed,
+            "chunks": chunks,
+            "rows": state["rows"] - rows_at_start,
+            "last_id": state["last_id"],
+            "elapsed_s": round(elapsed, 3),
+        }
+        logger.info(f"ratings.reset_stale {stats}")
+        return stats
+
+    async def history(self, db: AsyncSession, profile_id: int) -> List[Dict]:
+        """Ratings del perfil por temporada, de la más reciente a la más antigua."""
+        archived = await db.execute(
+            select(
+                ProfileSeasonRating.season_id,
+                Season.name,
+                ProfileSeasonRating.elo_score,
+                ProfileSeasonRating.voted_count,
+                ProfileSeasonRating.win_count,
+            )
+            .join(Season, Season.id == ProfileSeasonRating.season_id)
+            .filter(ProfileSeasonRating.profile_id == profile_id)
+        )
+        current = await db.execute(
+            select(
+                Profile.rating_season_id.label("season_id"),
+                Season.name,
+                Profile.elo_score,
+                Profile.voted_count,
+                Profile.win_count,
+            )
+            .join(Season, Season.id == Profile.rating_season_id)
+            .filter(Profile.id == profile_id)
+        )
+        rows = {row.season_id: row for row in archived.all()}
+        for row in current.all():
+            rows[row.season_id] = row
+        return [
+            {
+                "season_id": row.season_id,
+                "season_name": row.name,
+                "elo_score": row.elo_score,
+                "voted_count": row.voted_count,
+                "win_count": row.win_count,
+            }
+            for row in sorted(rows.values(), key=lambda r: r.season_id, reverse=True)
+        ]
+
+rating_service = RatingService()
@@ -1,3 +1,4 @@
+import logging
 from datetime import datetime
 from typing import Optional
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -7,8 +8,25 @@ from sqlalchemy import func, update
 from app.models.profile import Profile
 from app.models.badge import Season, Badge, UserBadge
 from app.models.user import User
+from app.services.leaderboard_service import leaderboard_service
+from app.services.rating_service import rating_service
+
+logger = logging.getLogger(__name__)
 
 class SeasonService:
+    def __init__(self):
+        # Los tests inyectan su fábrica de sesiones; si no, AsyncSessionLocal
+        self.session_factory = None
+
+    @staticmethod
+    def _adopt_unseasoned_ratings(season_id: int):
+        return (
+            update(Profile)
+            .where(Profile.rating_season_id.is_(None))
+            .values(rating_season_id=season_id)
+            .execution_options(synchronize_session=False)
+        )
+
     async def get_active_season(self, db: AsyncSession) -> Season:
         result = await db.execute(select(Season).filter(Season.is_active == True))
         return result.scalars().first()
@@ -25,8 +43,14 @@ class SeasonService:
 
         new_season = Season(name=name, is_active=True)
         db.add(new_season)
+        await db.flush()
+        if not active_season:
+            # Primera temporada: adopta los ratings creados sin temporada
+            await db.execute(self._adopt_unseasoned_ratings(new_season.id))
         await db.commit()
         await db.refresh(new_season)
+        # Solo cambia la temporada activa: los ratings viejos se leen como
+        # iniciales y RatingService.reset_stale los archiva en segundo plano
         return new_season
 
     def start_new_season_sync(self, db: Session, name: str):
@@ -38,13 +62,37 @@ class SeasonService:
 
         new_season = Season(name=name, is_active=True)
         db.add(new_season)
+        db.flush()
+        if not active_season:
+            db.execute(self._adopt_unseasoned_ratings(new_season.id))
         db.commit()
         db.refresh(new_season)
         return new_season
 
+    async def finish_rollover(self, season_id: int, rebuild_leaderboard: bool = False):
+        """
+        Tarea posterior al cambio de temporada, con su propia sesión de BD:
+        recarga el leaderboard con los ratings vigentes y archiva y reinicia
+        los de temporadas pasadas (reanudable, ver RatingService.reset_stale).
+        """
+        session_factory = self.session_factory
+        if session_factory is None:
+            from app.db.session import AsyncSessionLocal
+            session_factory = AsyncSessionLocal
+        if session_factory is None:
+            return
+        try:
+            async with session_factory() as db:
+                if rebuild_leaderboard:
+                    await leaderboard_service.rebuild(db)
+                await rating_service.reset_stale(db, season_id)
+        except Exception as e:
+            logger.error(f"season.rollover.error season_id={season_id}: {e}")
+
     def reset_rankings_and_award_badges(self, db, season_name: str):
         """
-        Otorga insignias al top 5 y reinicia a todos a 1200.
+        Otorga insignias al top 5 y abre una nueva temporada: todos se leen
+        como 1200 desde ese momento (ver RatingService.reset_stale).
         Versión síncrona para tests (Session).
         """
         current_season = self.get_active_season_sync(db)
@@ -54,7 +102,7 @@ class SeasonService:
         top_profiles = (
             db.query(Profile)
             .filter(Profile.is_active == True, Profile.is_approved == True)
-            .order_by(Profile.elo_score.desc())
+            .order_by(rating_service.elo_score().desc())
             .limit(5)
             .all()
         )
@@ -74,7 +122,6 @@ class SeasonService:
                 )
                 db.add(user_badge)
 
-        db.execute(update(Profile).values(elo_score=1200))
         next_season_name = f"Season_{datetime.now().strftime('%Y_%m')}_{int(datetime.now().timestamp())}"
         self.start_new_season_sync(db, next_season_name)
         db.commit()
@@ -91,7 +138,7 @@ class SeasonService:
         result_top = await db.execute(
             select(Profile)
             .filter(Profile.is_active == True, Profile.is_approved == True)
-            .order_by(Profile.elo_score.desc())
+            .order_by((await rating_service.elo_order(db)).desc())
             .limit(5)
         )
         top_profiles = result_top.scalars().all()
@@ -111,7 +158,6 @@ class SeasonService:
                 )
                 db.add(user_badge)
 
-        await db.execute(update(Profile).values(elo_score=1200))
         next_season_name = f"Season_{datetime.now().strftime('%Y_%m')}_{int(datetime.now().timestamp())}"
         await self.start_new_season(db, next_season_name)
         await db.commit()
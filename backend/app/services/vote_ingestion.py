@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.streams import RedisStreamQueue
+from app.db.dialect import dialect_insert
+from app.db.retry import is_transient_error, run_with_retry
+from app.models.profile import Profile, active_season_id
+from app.models.vote import Vote, canonical_pair
+from app.services.pair_service import pair_service
+from app.services.ranking_service import ranking_service
+from app.services.rating_service import rating_service
+from app.services.voting_service import voting_service
+
+logger = logging.getLogger(__name__)
+
+
+class VoteIngestionService:
+    """
+    Ingesta write-behind: el endpoint valida y encola el voto; un worker lo
+    aplica después en micro-lotes (una transacción por lote, inserción masiva
+    de votos y un UPDATE agrupado por perfil). Un voto que falla por sí
+    solo VOTE_QUEUE_MAX_DELIVERIES veces se aparta al stream de descartes.
+    """
+
+    def __init__(self):
+        self.queue = RedisStreamQueue(settings.VOTE_QUEUE_STREAM, "vote-workers")
+        self.batch_size = settings.VOTE_QUEUE_BATCH_SIZE
+        self.flush_interval = settings.VOTE_QUEUE_FLUSH_INTERVAL_MS / 1000
+        self.applied_total = 0
+        self.skipped_total = 0
+        self.dead_lettered_total = 0
+        self.batches_total = 0
+        self.last_batch_size = 0
+        self.last_batch_ms = None
+        self.last_applied_lag_ms = None
+
+    @property
+    def enabled(self) -> bool:
+        return settings.VOTE_INGESTION_MODE == "queue"
+
+    async def enqueue(self, db: AsyncSession, winner_id: int, loser_id: int, voter_id: int) -> str:
+        """
+        Valida el voto con lecturas baratas y lo añade a la cola.
+        Lanza ValueError con los mismos mensajes que el camino síncrono.
+        """
+        if winner_id == loser_id:
+            raise ValueError("Perfil no encontrado")
+        result = await db.execute(
+            select(Profile.id, Profile.is_active, Profile.is_approved)
+            .filter(Profile.id.in_([winner_id, loser_id]))
+        )
+        rows = {row.id: row for row in result.all()}
+        winner = rows.get(winner_id)
+        loser = rows.get(loser_id)
+        if not winner or not loser:
+            raise ValueError("Perfil no encontrado")
+        if not winner.is_active or not winner.is_approved:
+            raise ValueError("El perfil ganador no está disponible para votar")
+        if not loser.is_active or not loser.is_approved:
+            raise ValueError("El perfil perdedor no está disponible para votar")
+
+        if voter_id and await pair_service.has_voted(db, voter_id, winner_id, loser_id):
+            raise ValueError("Ya has votado en este emparejamiento")
+
+        return await self.queue.add({
+            "winner_id": winner_id,
+            "loser_id": loser_id,
+            "voter_id": voter_id,
+        })
+
+    @staticmethod
+    def _pair_key(voter_id: Optional[int], a: int, b: int) -> Tuple[Optional[int], int, int]:
+        return (voter_id,) + canonical_pair(a, b)
+
+    async def _voted_pairs(self, db: AsyncSession, voter_ids: Set[int], profile_ids: Set[int]) -> Set[Tuple[int, int, int]]:
+        result = await db.execute(
+            select(Vote.voter_id, Vote.pair_lo, Vote.pair_hi).filter(
+                Vote.voter_id.in_(voter_ids),
+                Vote.pair_lo.in_(profile_ids),
+                Vote.pair_hi.in_(profile_ids),
+            )
+        )
+        return {tuple(row) for row in result.all()}
+
+    async def _apply_batch(self, db: AsyncSession, votes: List[Dict]) -> Tuple[List[Tuple], int]:
+        """
+        Aplica los votos en una transacción que termina en el commit (se
+        reintenta completa). Devuelve los aplicados como (voter_id, ganador,
+        perdedor) para los efectos en Redis, y cuántos se descartaron.
+        """
+        profile_ids = {v["winner_id"] for v in votes} | {v["loser_id"] for v in votes}
+        result = await db.execute(
+            select(Profile, active_season_id().label("active_season_id"))
+            .filter(Profile.id.in_(profile_ids))
+            .order_by(Profile.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        rows = result.all()
+        season_id = rows[0].active_season_id if rows else None
+        profiles = {row.Profile.id: row.Profile for row in rows}
+        states = {
+            p.id: {
+                "id": p.id,
+                **rating_service.current(p, season_id),
+                "available": bool(p.is_active and p.is_approved),
+            }
+            for p in profiles.values()
+        }
+
+        voter_ids = {v["voter_id"] for v in votes if v.get("voter_id")}
+        seen = await self._voted_pairs(db, voter_ids, profile_ids) if voter_ids else set()
+
+        vote_rows = []
+        skipped = 0
+        for v in votes:
+            winner = states.get(v["winner_id"])
+            loser = states.get(v["loser_id"])
+            if not winner or not loser or not winner["available"] or not loser["available"] or winner is loser:
+                skipped += 1
+                continue
+            voter_id = v.get("voter_id")
+            if voter_id:
+                key = self._pair_key(voter_id, winner["id"], loser["id"])
+                if key in seen:
+                    skipped += 1
+                    continue
+                seen.add(key)
+            pair_lo, pair_hi = canonical_pair(winner["id"], loser["id"])
+            vote_rows.append({
+                "winner_id": winner["id"],
+                "loser_id": loser["id"],
+                "voter_id": voter_id,
+                "pair_lo": pair_lo,
+                "pair_hi": pair_hi,
+            })
+
+        inserted = set()
+        if vote_rows:
+            # El índice único sigue protegiendo frente a otro escritor concurrente:
+            # RETURNING dice qué votos entraron de verdad
+            result = await db.execute(
+                dialect_insert(db, Vote)
+                .on_conflict_do_nothing(index_elements=["voter_id", "pair_lo", "pair_hi"])
+                .returning(Vote.voter_id, Vote.pair_lo, Vote.pair_hi),
+                vote_rows,
+            )
+            inserted = {tuple(row) for row in result.all()}
+
+        applied = []
+        touched = set()
+        # Orden de llegada: el ELO de cada voto depende de los anteriores del lote
+        for row in vote_rows:
+            # Los anónimos nunca chocan con el índice (voter_id NULL)
+            if row["voter_id"] and (row["voter_id"], row["pair_lo"], row["pair_hi"]) not in inserted:
+                skipped += 1
+                continue
+            winner = states[row["winner_id"]]
+            loser = states[row["loser_id"]]
+            new_winner, new_loser = ranking_service.calculate_elo(winner["elo_score"], loser["elo_score"])
+            winner["elo_score"] = new_winner
+            winner["win_count"] += 1
+            winner["voted_count"] += 1
+            loser["elo_score"] = new_loser
+            loser["voted_count"] += 1
+            touched.update((winner["id"], loser["id"]))
+            applied.append((row["voter_id"], profiles[winner["id"]], profiles[loser["id"]]))
+
+        if touched:
+            await rating_service.archive_stale(db, (profiles[pid] for pid in sorted(touched)), season_id)
+            # UPDATE agrupado por clave primaria: una fila por perfil tocado
+            await db.execute(
+                update(Profile),
+                [
+                    {
+                        **{k: states[pid][k] for k in ("id", "elo_score", "voted_count", "win_count")},
+                        "rating_season_id": season_id,
+                    }
+                    for pid in sorted(touched)
+                ],
+            )
+        await db.commit()
+        for pid in touched:
+            rating_service.set_current(
+                profiles[pid], season_id, *(states[pid][k] for k in rating_service.FIELDS)
+            )
+        return applied, skipped
+
+    async def _apply_one_by_one(self, db: AsyncSession, entries: List[Tuple[str, Dict]]) -> Tuple[List[Tuple], int]:
+        """
+        Tras fallar un lote por sus datos: cada voto en su propia transacción,
+        confirmado en la cola nada más hacer commit. Los que fallan solos
+        quedan pendientes hasta agotar sus entregas y entonces se apartan.
+        """
+        applied, skipped = [], 0
+        deliveries = await self.queue.delivery_counts([entry_id for entry_id, _ in entries])
+        for entry_id, data in entries:
+            try:
+                one_applied, one_skipped = await run_with_retry(db, lambda data=data: self._apply_batch(db, [data]))
+            except Exception as e:
+                await db.rollback()
+                if is_transient_error(e):
+                    # No es culpa del voto: el resto se reintenta en la siguiente lectura
+                    logger.error(f"vote_worker.error: {e}")
+                    break
+                if deliveries.get(entry_id, 1) >= settings.VOTE_QUEUE_MAX_DELIVERIES:
+                    await self.queue.dead_letter([(entry_id, data)], repr(e))
+                    self.dead_lettered_total += 1
+                    logger.error(f"vote_worker.dead_letter entry_id={entry_id} error={e!r}")
+                else:
+                    logger.error(f"vote_worker.entry_failed entry_id={entry_id} error={e!r}")
+                continue
+            await self.queue.ack([entry_id])
+            # Antes del siguiente voto: un rollback posterior expiraría los perfiles
+            await voting_service.after_commit(one_applied)
+            applied += one_applied
+            skipped += one_skipped
+        return applied, skipped
+
+    async def process_batch(self, db: AsyncSession) -> int:
+        """
+        Aplica un micro-lote de la cola. Devuelve cuántas entradas se consumieron.
+        """
+        entries = await self.queue.read(self.batch_size)
+        if not entries:
+            return 0
+        t0 = time.perf_counter()
+        votes = [data for _, data in entries]
+        try:
+            applied, skipped = await run_with_retry(db, lambda: self._apply_batch(db, votes))
+        except Exception as e:
+            if is_transient_error(e):
+                raise
+            await db.rollback()
+            logger.error(f"vote_worker.batch_failed size={len(entries)} error={e!r}")
+            applied, skipped = await self._apply_one_by_one(db, entries)
+        else:
+            # Ya confirmado en la BD: se saca de la cola antes de tocar Redis para
+            # que un fallo de los efectos no vuelva a entregar (y aplicar) el lote
+            await self.queue.ack([entry_id for entry_id, _ in entries])
+            await voting_service.after_commit(applied)
+
+        newest_ms = int(entries[-1][0].split("-", 1)[0])
+        self.last_applied_lag_ms = max(0, int(time.time() * 1000) - newest_ms)
+        self.last_batch_ms = round((time.perf_counter() - t0) * 1000, 2)
+        self.last_batch_size = len(entries)
+        self.applied_total += len(applied)
+        self.skipped_total += skipped
+        self.batches_total += 1
+        return len(entries)
+
+    async def run(self, session_factory, stop_event: Optional[asyncio.Event] = None):
+        """
+        Bucle del worker: vacía lotes llenos seguidos y, cuando la cola no
+        llena un lote, espera el intervalo de flush.
+        """
+        logger.info(f"vote_worker.start batch_size={self.batch_size} flush_interval_ms={int(self.flush_interval * 1000)}")
+        while not (stop_event and stop_event.is_set()):
+            consumed = 0
+            try:
+                async with session_factory() as db:
+                    consumed = await self.process_batch(db)
+            except Exception as e:
+                logger.error(f"vote_worker.error: {e}")
+            if consumed < self.batch_size:
+                await asyncio.sleep(self.flush_interval)
+        logger.info("vote_worker.stop")
+
+    async def metrics(self) -> Dict:
+        return {
+            "mode": settings.VOTE_INGESTION_MODE,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": int(self.flush_interval * 1000),
+            "queue": await self.queue.lag(),
+            "applied_total": self.applied_total,
+            "skipped_total": self.skipped_total,
+            "dead_lettered_total": self.dead_lettered_total,
+            "batches_total": self.batches_total,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_ms": self.last_batch_ms,
+            "last_applied_lag_ms": self.last_applied_lag_ms,
+        }
+
+vote_ingestion_service = VoteIngestionService()
@@ -1,66 +1,160 @@
+import logging
+from typing import Iterable, Optional, Tuple
+
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import or_
-from app.models.profile import Profile
-from app.models.vote import Vote
+from sqlalchemy import update, case
+from app.models.profile import Profile, active_season_id
+from app.models.vote import Vote, canonical_pair
 from app.services.ranking_service import ranking_service
+from app.services.rating_service import rating_service
+from app.services.leaderboard_service import leaderboard_service
+from app.services.badge_events import badge_event_service
+from app.services.pair_service import pair_service
+from app.services.profile_card_service import profile_card_service
+from app.db.dialect import dialect_insert
+from app.db.retry import run_with_retry
+
+logger = logging.getLogger(__name__)
 
 class VotingService:
+    MAX_ATTEMPTS = 5
+
     @staticmethod
     async def record_vote(db: AsyncSession, winner_id: int, loser_id: int, voter_id: int = None):
-        # Fetch both profiles in a single query
-        result = await db.execute(select(Profile).filter(Profile.id.in_([winner_id, loser_id])))
-        profiles = result.scalars().all()
-        
-        winner = next((p for p in profiles if p.id == winner_id), None)
-        loser = next((p for p in profiles if p.id == loser_id), None)
+        """
+        Registra un voto y actualiza el ELO de ambos perfiles en una sola transacción.
+        Se reintenta completa ante deadlocks o fallos de serialización; lo que
+        vive en Redis se actualiza después, fuera de los reintentos.
+        """
+        vote, winner, loser = await run_with_retry(
+            db,
+            lambda: VotingService._record_vote_once(db, winner_id, loser_id, voter_id),
+            attempts=VotingService.MAX_ATTEMPTS,
+        )
+        await VotingService.after_commit([(voter_id, winner, loser)])
+        return vote
+
+    @staticmethod
+    async def after_commit(votes: Iterable[Tuple[Optional[int], Profile, Profile]]):
+        """
+        Efectos en Redis de votos ya confirmados (voter_id, ganador, perdedor):
+        vistas de ranking, leaderboard, fichas, pares votados y badges.
+        Cada paso es best-effort: un fallo se registra, no convierte en error
+        un voto guardado ni impide los pasos siguientes.
+        """
+        votes = list(votes)
+        profiles = list({p.id: p for _, winner, loser in votes for p in (winner, loser)}.values())
+        # Solo el ganador puede subir de posición y cruzar un umbral de badge
+        winners = list({winner.id: winner for _, winner, _ in votes}.values())
+        # Solo se invalidan las vistas de ranking que contienen a estos perfiles
+        namespaces = [
+            ns for p in profiles for ns in ranking_service.profile_namespaces(p.type, p.gender, p.category_id)
+        ]
+
+        async def exposure():
+            pair_service.update_exposure(*profiles)
+
+        steps = (
+            ("ranking_cache", lambda: ranking_service.invalidate_namespaces(namespaces)),
+            ("leaderboard", lambda: leaderboard_service.sync_profiles(*profiles)),
+            ("profile_cards", lambda: profile_card_service.invalidate(*(p.id for p in profiles))),
+            ("pair_votes", lambda: pair_service.record_votes(votes)),
+            ("badge_events", lambda: badge_event_service.detect(*winners)),
+            ("exposure", exposure),
+        )
+        for name, step in steps:
+            try:
+                await step()
+            except Exception as e:
+                logger.error(f"vote.after_commit.{name} error: {e}")
+
+    @staticmethod
+    async def _lock_profiles(db: AsyncSession, profile_ids):
+        # Bloqueo de filas siempre en orden de id para que dos votos
+        # concurrentes sobre el mismo par no se bloqueen mutuamente (deadlock).
+        # La temporada activa viaja en la misma consulta.
+        result = await db.execute(
+            select(Profile, active_season_id().label("active_season_id"))
+            .filter(Profile.id.in_(profile_ids))
+            .order_by(Profile.id)
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        rows = result.all()
+        season_id = rows[0].active_season_id if rows else None
+        return {row.Profile.id: row.Profile for row in rows}, season_id
+
+    @staticmethod
+    async def _apply_rating(db: AsyncSession, profile, season_id, new_rating: int, won: bool):
+        # Contadores de otra temporada cuentan como cero (ya archivados)
+        in_season = Profile.rating_season_id.is_not_distinct_from(season_id)
+        values = {
+            "elo_score": new_rating,
+            "voted_count": case((in_season, Profile.voted_count), else_=0) + 1,
+            "win_count": case((in_season, Profile.win_count), else_=0) + (1 if won else 0),
+            "rating_season_id": season_id,
+        }
+        result = await db.execute(
+            update(Profile)
+            .where(Profile.id == profile.id)
+            .values(**values)
+            .returning(Profile.id, Profile.elo_score, Profile.voted_count, Profile.win_count)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.one()
+        rating_service.set_current(profile, season_id, row.elo_score, row.voted_count, row.win_count)
+        return row
+
+    @staticmethod
+    async def _record_vote_once(db: AsyncSession, winner_id: int, loser_id: int, voter_id: int = None):
+        profiles, season_id = await VotingService._lock_profiles(db, [winner_id, loser_id])
+        winner = profiles.get(winner_id)
+        loser = profiles.get(loser_id)
 
         if not winner or not loser:
+            await db.rollback()
             raise ValueError("Perfil no encontrado")
 
         # Verificar que ambos perfiles estén activos y aprobados
         if not winner.is_active or not winner.is_approved:
+            await db.rollback()
             raise ValueError(f"El perfil ganador no está disponible para votar")
         if not loser.is_active or not loser.is_approved:
+            await db.rollback()
             raise ValueError(f"El perfil perdedor no está disponible para votar")
 
-        # Verificar si el usuario ya votó por este par (en cualquier dirección)
+        # El índice único (voter_id, pair_lo, pair_hi) detecta el voto repetido
+        # en cualquier dirección: si no se inserta fila, ya había votado.
+        pair_lo, pair_hi = canonical_pair(winner_id, loser_id)
+        stmt = dialect_insert(db, Vote).values(
+            winner_id=winner_id,
+            loser_id=loser_id,
+            voter_id=voter_id,
+            pair_lo=pair_lo,
+            pair_hi=pair_hi,
+        )
         if voter_id:
-            result_vote = await db.execute(select(Vote).filter(
-                Vote.voter_id == voter_id,
-                or_(
-                    (Vote.winner_id == winner_id) & (Vote.loser_id == loser_id),
-                    (Vote.winner_id == loser_id) & (Vote.loser_id == winner_id)
-                )
-            ))
-            existing_vote = result_vote.scalars().first()
-            
-            if existing_vote:
-                raise ValueError("Ya has votado en este emparejamiento")
-
-        # Calcular nuevos puntajes ELO
+            stmt = stmt.on_conflict_do_nothing(index_elements=["voter_id", "pair_lo", "pair_hi"])
+        result = await db.execute(stmt.returning(Vote))
+        vote = result.scalars().first()
+        if vote is None:
+            await db.rollback()
+            raise ValueError("Ya has votado en este emparejamiento")
+
+        # Calcular nuevos puntajes ELO sobre las filas bloqueadas
         new_winner_rating, new_loser_rating = ranking_service.calculate_elo(
-            winner.elo_score, loser.elo_score
+            rating_service.current(winner, season_id)["elo_score"],
+            rating_service.current(loser, season_id)["elo_score"],
         )
 
-        # Actualizar perfiles
-        winner.elo_score = new_winner_rating
-        winner.win_count += 1
-        winner.voted_count += 1
-        
-        loser.elo_score = new_loser_rating
-        loser.voted_count += 1
+        # Primer voto de la temporada: el rating anterior pasa al histórico
+        await rating_service.archive_stale(db, [winner, loser], season_id)
 
-        # Registrar voto
-        vote = Vote(
-            winner_id=winner_id,
-            loser_id=loser_id,
-            voter_id=voter_id
-        )
-        db.add(vote)
+        # UPDATE ... RETURNING: los contadores se incrementan en la BD, no en Python
+        await VotingService._apply_rating(db, winner, season_id, new_winner_rating, won=True)
+        await VotingService._apply_rating(db, loser, season_id, new_loser_rating, won=False)
         await db.commit()
-        await db.refresh(vote)
-        return vote
+        return vote, winner, loser
 
 voting_service = VotingService()
-
@@ -7,6 +7,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import NullPool
+import fakeredis
 from httpx import AsyncClient, ASGITransport
 
 PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
@@ -16,6 +17,12 @@ if PROJECT_ROOT not in sys.path:
 from app.db.base import Base
 from app.api.deps import get_async_db, get_db
 from app.main import app
+from app.core import redis_client as redis_module
+from app.core.cache import namespaces as cache_namespaces
+from app.services.badge_events import badge_event_service
+from app.services.pair_service import pair_service
+from app.services.profile_card_service import profile_card_service
+from app.services.season_service import season_service
 
 # URLs de conexión a la base de datos de prueba
 # Por defecto usa SQLite para que pytest funcione sin Postgres/asyncpg.
@@ -30,6 +37,25 @@ sync_connect_args = {"check_same_thread": False} if is_sqlite_sync else {}
 engine_sync = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=sync_connect_args)
 TestingSessionLocalSync = sessionmaker(autocommit=False, autoflush=False, bind=engine_sync)
 
+@pytest.fixture(scope="session", autouse=True)
+async def async_redis():
+    """
+    Cliente async compartido en memoria. ASGITransport no lanza el evento de
+    arranque, así que se instala aquí en lugar de init_async_redis.
+    """
+    redis_module.async_redis = fakeredis.FakeAsyncRedis(decode_responses=True)
+    yield redis_module.async_redis
+    await redis_module.close_async_redis()
+
+
+@pytest.fixture(autouse=True)
+def clear_local_caches():
+    """Los niveles locales de caché viven en el proceso: cada test empieza vacío."""
+    for ns in cache_namespaces.values():
+        ns.clear_local()
+    profile_card_service._local.clear()
+
+
 @pytest.fixture(scope="session")
 async def db_engine():
     """
@@ -87,7 +113,7 @@ def db_sync() -> Generator[Session, None, None]:
         session.close()
 
 @pytest.fixture
-async def client(db: AsyncSession, db_sync: Session) -> AsyncGenerator[AsyncClient, None]:
+async def client(db: AsyncSession, db_sync: Session, db_session_factory) -> AsyncGenerator[AsyncClient, None]:
     """
     Proporciona un cliente HTTP asíncrono con las dependencias de base de datos (síncrona y asíncrona) sobrescritas.
     """
@@ -99,9 +125,17 @@ async def client(db: AsyncSession, db_sync: Session) -> AsyncGenerator[AsyncClie
     
     app.dependency_overrides[get_async_db] = override_get_async_db
     app.dependency_overrides[get_db] = override_get_db
+    # Las tareas en segundo plano abren su propia sesión contra la BD de pruebas
+    pair_service.session_factory = db_session_factory
+    badge_event_service.session_factory = db_session_factory
+    season_service.session_factory = db_session_factory
+    badge_event_service._thresholds = None
     
     # Usar ASGITransport para conectar directamente a la app FastAPI
     async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as c:
         yield c
     
     app.dependency_overrides.clear()
+    pair_service.session_factory = None
+    badge_event_service.session_factory = None
+    season_service.session_factory = None
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.badge import UserBadge
+from app.models.notification import Notification
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.services.badge_service import badge_service
+
+
+@pytest.mark.asyncio
+async def test_bulk_award_single_commit_and_idempotent(db: AsyncSession, monkeypatch):
+    await badge_service.init_default_badges(db)
+    user = User(email="bulkbadges@example.com", hashed_password="x", full_name="Bulk Badges", is_active=True)
+    db.add(user)
+    await db.commit()
+    user_id = user.id
+    profile = Profile(user_id=user_id, type=ProfileType.REAL, gender=Gender.FEMALE, image_url="http://example.com/bulk.jpg",
+                      elo_score=50000, is_active=True, is_approved=True)
+    db.add(profile)
+    await db.commit()
+
+    commits = []
+    original_commit = db.commit
+
+    async def counting_commit():
+        commits.append(1)
+        await original_commit()
+
+    monkeypatch.setattr(db, "commit", counting_commit)
+
+    # Top 1: gana todas las badges de ranking por posición de una vez
+    awarded = await badge_service.check_and_award_badges(db, user_id)
+    assert len(awarded) == 10
+    assert len(commits) == 1
+    assert {a["profile_id"] for a in awarded} == {profile.id}
+
+    badges = await db.execute(select(func.count(UserBadge.id)).filter(UserBadge.user_id == user_id))
+    notifications = await db.execute(
+        select(func.count(Notification.id)).filter(Notification.user_id == user_id, Notification.type == "badge_awarded")
+    )
+    assert badges.scalar() == 10
+    assert notifications.scalar() == 10
+
+    # Segunda pasada: nada nuevo, ninguna escritura
+    assert await badge_service.check_and_award_badges(db, user_id) == []
+    assert len(commits) == 1
+
+    profile.is_active = False
+    await original_commit()
@@ -0,0 +1,128 @@
+import asyncio
+import time
+
+import fakeredis
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.badge import Badge
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.services.badge_events import BadgeEventService, badge_event_service
+from app.services.badge_service import badge_service
+from app.services.leaderboard_service import leaderboard_service
+from app.services.voting_service import voting_service
+
+
+def test_threshold_for_rank():
+    thresholds = (1, 3, 5, 10, 25, 50, 100, 250, 500, 1000)
+    assert BadgeEventService.threshold_for(1, thresholds) == 1
+    assert BadgeEventService.threshold_for(4, thresholds) == 5
+    assert BadgeEventService.threshold_for(1000, thresholds) == 1000
+    assert BadgeEventService.threshold_for(1001, thresholds) is None
+    assert BadgeEventService.threshold_for(1, ()) is None
+
+
+@pytest.mark.asyncio
+async def test_vote_crossing_awards_badges_within_bounded_delay(
+    client: AsyncClient, db: AsyncSession, db_session_factory, monkeypatch
+):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+    monkeypatch.setattr(badge_event_service, "flush_interval", 0.02)
+
+    await badge_service.init_default_badges(db)
+    email = "badgeevents@example.com"
+    await client.post(f"{settings.API_V1_STR}/auth/register", json={"email": email, "password": "pass123", "full_name": "Events"})
+    resp = await client.post(f"{settings.API_V1_STR}/auth/login/access-token", data={"username": email, "password": "pass123"})
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
+
+    climber = Profile(user_id=user.id, type=ProfileType.REAL, gender=Gender.MALE, image_url="http://example.com/ev1.jpg",
+                      elo_score=90000, is_active=True, is_approved=True)
+    leader = Profile(user_id=None, type=ProfileType.AI, gender=Gender.MALE, image_url="http://example.com/ev2.jpg",
+                     elo_score=90010, is_active=True, is_approved=True)
+    db.add_all([climber, leader])
+    await db.commit()
+    await leaderboard_service.rebuild(db)
+
+    # La lectura no evalúa badges y queda cacheada vacía
+    resp = await client.get(f"{settings.API_V1_STR}/badges/me", headers=headers)
+    assert resp.json() == []
+
+    await voting_service.record_vote(db, climber.id, leader.id)
+    assert (await badge_event_service.metrics())["backlog"]["length"] == 1
+
+    stop = asyncio.Event()
+    worker = asyncio.create_task(badge_event_service.run(db_session_factory, stop))
+    try:
+        deadline = time.monotonic() + 5
+        awarded = []
+        while time.monotonic() < deadline:
+            resp = await client.get(f"{settings.API_V1_STR}/badges/me", headers=headers)
+            awarded = resp.json()
+            if awarded:
+                break
+            await asyncio.sleep(0.05)
+    finally:
+        stop.set()
+        await worker
+
+    assert {b["badge"]["slug"] for b in awarded} >= {"top-1", "top-1000"}
+    assert (await badge_event_service.metrics())["backlog"]["length"] == 0
+
+    # Ya en el top 1: otro voto no vuelve a emitir el mismo cruce
+    await voting_service.record_vote(db, climber.id, leader.id)
+    assert (await badge_event_service.metrics())["backlog"]["length"] == 0
+
+    climber.is_active = False
+    leader.is_active = False
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_thresholds_follow_the_active_ranking_badges(client: AsyncClient, db: AsyncSession):
+    await badge_service.init_default_badges(db)
+    custom = Badge(name="Top 7 Evento", slug="top-7-evento", description="Top 7", icon="7",
+                   category="ranking", min_position=7, is_active=True)
+    db.add(custom)
+    await db.commit()
+    try:
+        assert 7 in await badge_event_service.thresholds()
+        assert BadgeEventService.threshold_for(6, await badge_event_service.thresholds()) == 7
+    finally:
+        await db.delete(custom)
+        await db.commit()
+        badge_event_service._thresholds = None
+
+
+@pytest.mark.asyncio
+async def test_failing_user_is_parked_without_blocking_the_batch(db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+    checked = []
+
+    async def check(db, user_id):
+        if user_id == 1:
+            raise ValueError("datos corruptos")
+        checked.append(user_id)
+        return []
+
+    monkeypatch.setattr(badge_service, "check_and_award_badges", check)
+    for user_id in (1, 2):
+        await badge_event_service.queue.add({"user_id": user_id, "profile_id": user_id, "rank": 1, "threshold": 1})
+
+    # El usuario sano se confirma en la primera pasada; el otro se reintenta
+    await badge_event_service.process_batch(db)
+    assert checked == [2]
+    assert (await badge_event_service.metrics())["backlog"]["length"] == 1
+
+    for _ in range(settings.VOTE_QUEUE_MAX_DELIVERIES - 1):
+        await badge_event_service.process_batch(db)
+    assert (await badge_event_service.metrics())["backlog"]["length"] == 0
+    dead = await r.xrange(badge_event_service.queue.dead_stream)
+    assert len(dead) == 1 and "datos corruptos" in dead[0][1]["error"]
+    assert await badge_event_service.process_batch(db) == 0
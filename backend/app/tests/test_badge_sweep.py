@@ -0,0 +1,59 @@
+import fakeredis
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.badge import Badge, UserBadge
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.services.badge_service import badge_service
+from app.services.badge_sweep import badge_sweep_service
+
+
+async def _slugs(db: AsyncSession, user_id: int):
+    result = await db.execute(
+        select(Badge.slug).join(UserBadge, UserBadge.badge_id == Badge.id).filter(UserBadge.user_id == user_id)
+    )
+    return set(result.scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_sweep_is_resumable_and_uses_rank_semantics(db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+    await badge_service.init_default_badges(db)
+
+    users = [User(email=f"sweep{i}@example.com", hashed_password="x", full_name=f"Sweep {i}", is_active=True) for i in range(3)]
+    db.add_all(users)
+    await db.commit()
+    leader, tied_a, tied_b = users
+    profiles = [
+        Profile(user_id=u.id, type=ProfileType.REAL, gender=Gender.FEMALE, image_url=f"http://example.com/sw{i}.jpg",
+                elo_score=elo, is_active=True, is_approved=True)
+        for i, (u, elo) in enumerate([(leader, 200020), (tied_a, 200010), (tied_b, 200010), (leader, 200000)])
+    ]
+    db.add_all(profiles)
+    await db.commit()
+
+    first = await badge_sweep_service.sweep(db, chunk_size=1, restart=True, max_chunks=2)
+    assert first["completed"] is False
+    assert first["rows"] == 2
+
+    second = await badge_sweep_service.sweep(db, chunk_size=50)
+    assert second["resumed"] is True
+    assert second["completed"] is True
+    assert second["rows_per_sec"] is not None
+
+    assert "top-1" in await _slugs(db, leader.id)
+    # Empatados en la posición 2: top-3 sí, top-1 no, aunque uno quedara en otro bloque
+    for user in (tied_a, tied_b):
+        slugs = await _slugs(db, user.id)
+        assert "top-3" in slugs and "top-1" not in slugs
+
+    # Idempotente: una segunda pasada completa no otorga nada nuevo
+    again = await badge_sweep_service.sweep(db, chunk_size=50)
+    assert again["awarded"] == 0
+
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
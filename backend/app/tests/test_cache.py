@@ -0,0 +1,238 @@
+import asyncio
+import gzip
+import json
+
+import fakeredis
+import pytest
+
+from app.core.cache import MISSING, CacheNamespace, cached, namespaces
+
+
+@pytest.fixture
+def r(monkeypatch):
+    client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", client)
+    return client
+
+
+@pytest.fixture
+def make_namespace():
+    created = []
+
+    def make(name, **kwargs):
+        ns = CacheNamespace(name, **kwargs)
+        created.append(name)
+        return ns
+
+    yield make
+    for name in created:
+        namespaces.pop(name, None)
+
+
+@pytest.mark.asyncio
+async def test_cached_function_two_tiers_and_metrics(r, make_namespace):
+    ns = make_namespace("test:tiers", ttl=60, local_ttl=30)
+    calls = []
+
+    @cached(ns, key=lambda db, user_id: (user_id,))
+    async def load(db, user_id: int):
+        calls.append(user_id)
+        return {"user_id": user_id}
+
+    assert await load(None, 7) == {"user_id": 7}
+    assert await load(None, 7) == {"user_id": 7}
+    assert calls == [7]
+    assert await r.ttl("test:tiers:7") > 0
+
+    # Otro worker (nivel local vacío) lee de Redis
+    ns._local.clear()
+    assert await load(None, 7) == {"user_id": 7}
+    assert calls == [7]
+
+    await ns.delete(ns.key(7))
+    assert await load(None, 7) == {"user_id": 7}
+    assert calls == [7, 7]
+
+    stats = ns.snapshot()
+    assert (stats["local_hits"], stats["redis_hits"], stats["misses"], stats["loads"]) == (1, 1, 2, 2)
+    assert stats["hit_ratio"] == 0.5
+    assert stats["avg_load_ms"] is not None
+
+
+@pytest.mark.asyncio
+async def test_negative_caching(r, make_namespace):
+    with_negative = make_namespace("test:negative", ttl=60, negative_ttl=5)
+    without = make_namespace("test:positive", ttl=60)
+    calls = []
+
+    async def missing_row(db, pid):
+        calls.append(pid)
+        return None
+
+    load_negative = cached(with_negative, key=lambda db, pid: (pid,))(missing_row)
+    load_plain = cached(without, key=lambda db, pid: (pid,))(missing_row)
+
+    assert await load_negative(None, 1) is None
+    assert await load_negative(None, 1) is None
+    assert calls == [1]
+    assert 0 < await r.ttl("test:negative:1") <= 5
+    assert with_negative.snapshot()["negative_hits"] == 1
+
+    assert await load_plain(None, 1) is None
+    assert await load_plain(None, 1) is None
+    assert calls == [1, 1, 1]
+    assert not await r.exists("test:positive:1")
+
+
+@pytest.mark.asyncio
+async def test_versioned_namespace_scopes(r, make_namespace):
+    ns = make_namespace("test:versioned", ttl=60, local_ttl=30, versioned=True)
+    calls = []
+
+    @cached(ns, key=lambda db, view: (view,), scopes=lambda db, view: [view])
+    async def load(db, view: str):
+        calls.append(view)
+        return [view, len(calls)]
+
+    first_a = await load(None, "a")
+    first_b = await load(None, "b")
+    assert await load(None, "a") == first_a
+
+    # Subir la versión de "a" no toca "b", ni siquiera en el nivel local
+    await ns.invalidate("a")
+    assert await load(None, "a") != first_a
+    assert await load(None, "b") == first_b
+
+    await ns.invalidate_all()
+    assert await load(None, "b") != first_b
+    assert calls == ["a", "b", "a", "b"]
+    assert all(k.startswith("cachever:") or k.startswith("test:versioned:") for k in await r.keys("*"))
+
+    # Lectura por lotes: "a" quedó obsoleta con la versión global, "b" ya se recargó
+    keys = await ns.keys([(("a",), ["a"]), (("b",), ["b"])])
+    stale_a, fresh_b = await ns.get_many(keys)
+    assert stale_a is MISSING and fresh_b == ["b", 4]
+
+
+@pytest.mark.asyncio
+async def test_without_redis_only_local_tier(monkeypatch, make_namespace):
+    monkeypatch.setattr("app.core.redis_client.async_redis", None)
+    ns = make_namespace("test:local", ttl=60, local_ttl=30, local_max=2)
+    for i in range(3):
+        await ns.set(ns.key(i), i)
+    # LRU: la entrada más antigua sale al superar local_max
+    assert await ns.get(ns.key(0)) is MISSING
+    assert [await ns.get(ns.key(i)) for i in (1, 2)] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_misses(r, make_namespace):
+    ns = make_namespace("test:flight", ttl=60)
+    calls = []
+
+    @cached(ns, key=lambda db, view: (view,))
+    async def load(db, view: str):
+        calls.append(view)
+        await asyncio.sleep(0.05)
+        return [view]
+
+    results = await asyncio.gather(*(load(None, "hot") for _ in range(20)))
+    assert results == [["hot"]] * 20
+    assert calls == ["hot"]
+    assert ns.snapshot()["coalesced"] == 19
+    assert not await r.keys(f"{CacheNamespace.LOCK_PREFIX}:*")
+
+
+@pytest.mark.asyncio
+async def test_lock_held_elsewhere_serves_stale_or_waits(r, make_namespace, monkeypatch):
+    ns = make_namespace("test:swr", ttl=60, versioned=True, stale_ttl=300)
+    monkeypatch.setattr(ns, "LOCK_POLL_INTERVAL", 0.01)
+    calls = []
+
+    @cached(ns, key=lambda db, view: (view,), scopes=lambda db, view: [view])
+    async def load(db, view: str):
+        calls.append(view)
+        return [view, len(calls)]
+
+    assert await load(None, "a") == ["a", 1]
+    await ns.invalidate("a")
+
+    # Otro worker tiene el lock de la clave nueva: se sirve la copia anterior
+    fresh_key = (await ns.keys([(("a",), ["a"])]))[0]
+    await r.set(f"{CacheNamespace.LOCK_PREFIX}:{fresh_key}", "other", ex=5)
+    assert await load(None, "a") == ["a", 1]
+    assert calls == ["a"]
+    assert ns.snapshot()["stale_hits"] == 1
+
+    # Sin copia anterior se espera a que el otro worker escriba la clave
+    other_key = (await ns.keys([(("b",), ["b"])]))[0]
+    await r.set(f"{CacheNamespace.LOCK_PREFIX}:{other_key}", "other", ex=5)
+
+    async def other_worker():
+        await asyncio.sleep(0.03)
+        await r.set(other_key, '["b", "other"]')
+
+    result, _ = await asyncio.gather(load(None, "b"), other_worker())
+    assert result == ["b", "other"]
+    assert calls == ["a"]
+    assert ns.snapshot()["lock_waits"] == 1
+
+
+async def test_ttls_are_jittered(r, make_namespace):
+    ns = make_namespace("test:jitter", ttl=1000)
+    for i in range(20):
+        await ns.set(ns.key(i), i)
+    ttls = {await r.ttl(ns.key(i)) for i in range(20)}
+    assert all(995 <= t <= 1100 for t in ttls)
+    assert len(ttls) > 1
+
+
+async def test_precompressed_bodies(r, make_namespace):
+    ns = make_namespace("test:bodies", ttl=60, local_ttl=30, encodings=("gzip",))
+    value = [{"id": i, "name": "x" * 50} for i in range(20)]
+    await ns.set(ns.key("top"), value)
+
+    body, encoding = await ns.get_body(ns.key("top"), "br;q=1.0, gzip;q=0.8")
+    assert encoding == "gzip"
+    assert json.loads(gzip.decompress(body)) == value
+    assert await r.exists("test:bodies:top:gzip")
+
+    # Otro worker: un solo GET de la variante pedida
+    ns.clear_local()
+    body, encoding = await ns.get_body(ns.key("top"), "identity, gzip;q=0")
+    assert encoding is None
+    assert json.loads(body) == value
+
+    await ns.delete(ns.key("top"))
+    assert await ns.get_body(ns.key("top"), "gzip") is None
+    assert not await r.exists("test:bodies:top:gzip")
+
+
+async def test_versioned_body_lookup_is_one_round_trip(r, make_namespace):
+    ns = make_namespace("test:vbodies", ttl=60, versioned=True, encodings=("gzip",))
+    value = [{"id": i} for i in range(20)]
+    key, hit = await ns.lookup_body(("top",), ["a"], "gzip")
+    assert hit is None
+    await ns.set(key, value)
+    ns.clear_local()
+
+    # Versiones y cuerpo en un único pipeline, sin GET/MGET sueltos
+    calls = []
+    pipeline = r.pipeline
+    r.pipeline = lambda *a, **kw: calls.append(1) or pipeline(*a, **kw)
+    r.mget = r.get = None
+    try:
+        same_key, (body, encoding) = await ns.lookup_body(("top",), ["a"], "gzip")
+    finally:
+        del r.pipeline, r.mget, r.get
+    assert same_key == key and encoding == "gzip" and len(calls) == 1
+    assert json.loads(gzip.decompress(body)) == value
+
+    # Tras invalidar, el cuerpo guardado es de otra generación: fallo con la clave nueva
+    await ns.invalidate("a")
+    new_key, hit = await ns.lookup_body(("top",), ["a"], "gzip")
+    assert hit is None and new_key != key
+    await ns.set(new_key, value[:1])
+    ns.clear_local()
+    _, (body, encoding) = await ns.lookup_body(("top",), ["a"], "identity")
+    assert encoding is None and json.loads(body) == value[:1]
@@ -75,6 +75,15 @@ async def test_follow_and_unfollow_flow(client: AsyncClient):
     followers = followers_response.json()
     assert len(followers) == 1
     assert followers[0]["id"] == user_a["id"]
+    assert followers[0]["following_count"] == 1
+    assert followers[0]["follower_count"] == 0
+    assert followers[0]["votes_cast_count"] == 0
+
+    following_response = await client.get(f"/api/v1/users/{user_a['id']}/following")
+    assert following_response.status_code == 200
+    following = following_response.json()
+    assert [u["id"] for u in following] == [user_b["id"]]
+    assert following[0]["follower_count"] == 1
 
     unfollow_response = await client.delete(
         f"/api/v1/users/{user_b['id']}/follow",
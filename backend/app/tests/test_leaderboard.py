@@ -0,0 +1,62 @@
+import fakeredis
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.category import Category
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.services.leaderboard_service import leaderboard_service
+from app.services.ranking_service import ranking_cache, ranking_service
+from app.services.voting_service import voting_service
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_rebuild_and_incremental_updates(client: AsyncClient, db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    owner = User(email="lbowner@example.com", hashed_password="x", full_name="LB Owner", is_active=True)
+    category = Category(name="Leaderboard test", slug="leaderboard-test")
+    db.add_all([owner, category])
+    await db.commit()
+    profiles = [
+        Profile(user_id=owner.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                image_url=f"http://example.com/lb{i}.jpg", elo_score=1200 + i * 10, is_active=True, is_approved=True)
+        for i in range(3)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    low, mid, high = [p.id for p in profiles]
+
+    url = f"{settings.API_V1_STR}/profiles/ranking?category_id={category.id}"
+    assert await leaderboard_service.top(db, ProfileType.REAL, None, category.id) is None
+
+    await leaderboard_service.rebuild(db)
+    assert await leaderboard_service.is_ready()
+    resp = await client.get(url)
+    assert [p["id"] for p in resp.json()] == [high, mid, low]
+
+    # Lo que carga el leaderboard queda en la caché de bytes y se sirve ya comprimido
+    ranking_cache.clear_local()
+    hit = await client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert hit.headers["content-encoding"] == "gzip"
+    assert hit.json() == resp.json()
+
+    # Un voto reordena el sorted set sin tocar la BD en la lectura
+    for _ in range(3):
+        await voting_service.record_vote(db, low, high)
+    resp = await client.get(url)
+    ids = [p["id"] for p in resp.json()]
+    assert ids[0] == low
+    assert resp.json()[0]["voted_count"] == 3
+
+    # Baja del juego: desaparece de todas sus vistas
+    profiles[0].is_active = False
+    await db.commit()
+    await ranking_service.invalidate_profiles(profiles[0])
+    await leaderboard_service.sync_profiles(profiles[0])
+    resp = await client.get(url)
+    assert low not in [p["id"] for p in resp.json()]
+    assert await r.zscore(leaderboard_service.GLOBAL_KEY, low) is None
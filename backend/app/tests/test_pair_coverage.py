@@ -0,0 +1,82 @@
+import fakeredis
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.category import Category
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.models.vote import canonical_pair
+from app.services.pair_service import NoMorePairs, pair_service
+from app.services.voting_service import voting_service
+
+
+def test_pair_index_enumerates_every_pair_once():
+    members = [3, 8, 11, 20, 21, 40, 57]
+    pairs = [tuple(pair_service._pair_at(members, i)) for i in range(len(members) * (len(members) - 1) // 2)]
+    assert len(set(pairs)) == len(pairs) == 21
+    assert all(a < b for a, b in pairs)
+
+
+@pytest.mark.asyncio
+async def test_coverage_counter_answers_exhaustion_exactly(db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    voter = User(email="coverage@example.com", hashed_password="x", full_name="Coverage", is_active=True)
+    category = Category(name="Coverage", slug="coverage")
+    db.add_all([voter, category])
+    await db.commit()
+    profiles = [
+        Profile(user_id=voter.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                image_url=f"http://example.com/cov{i}.jpg", is_active=True, is_approved=True)
+        for i in range(4)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    voter_id = voter.id
+    a, b, c, d = [p.id for p in profiles]
+
+    async def pool():
+        return await pair_service.candidate_pool(db, ProfileType.REAL, Gender.FEMALE, category.id)
+
+    for winner, loser in [(a, b), (a, c), (a, d), (b, c)]:
+        await voting_service.record_vote(db, winner, loser, voter_id)
+    assert await pair_service.coverage(db, voter_id, await pool()) == 4
+
+    # Ya recontado: cada voto suma en el set del pool y la lectura no toca la BD
+    await voting_service.record_vote(db, b, d, voter_id)
+    current = await pool()
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        assert await pair_service.coverage(db, voter_id, current) == 5
+        # Cobertura alta: el enumerador da el único par que queda, siempre
+        for _ in range(3):
+            assert canonical_pair(*await pair_service.pick_pair(db, current, voter_id)) == canonical_pair(c, d)
+        assert await pair_service.sample_pairs(db, current, voter_id, 3, {canonical_pair(c, d)}) == []
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+    assert not [s for s in statements if "FROM vote" in s]
+
+    await voting_service.record_vote(db, d, c, voter_id)
+    with pytest.raises(NoMorePairs):
+        await pair_service.pick_pair(db, await pool(), voter_id)
+
+    # Un perfil sale del pool: cambia la versión y se recuenta (3 de 3 pares)
+    profiles[0].is_active = False
+    await db.commit()
+    await pair_service.sync_pools(profiles[0])
+    remaining = await pool()
+    assert await pair_service.coverage(db, voter_id, remaining) == 3
+    with pytest.raises(NoMorePairs):
+        await pair_service.sample_pairs(db, remaining, voter_id, 2)
+
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
@@ -0,0 +1,123 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.category import Category
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.models.vote import Vote, canonical_pair
+from app.services.pair_service import CandidatePool, DatabaseSampledPool, NoMorePairs, pair_service
+
+
+@pytest.mark.asyncio
+async def test_large_pools_are_sampled_inside_the_database(db: AsyncSession, monkeypatch):
+    monkeypatch.setattr(settings, "PAIR_DB_SAMPLE_THRESHOLD", 5)
+
+    owner = User(email="dbsampling@example.com", hashed_password="x", full_name="DB Sampling", is_active=True)
+    small = Category(name="DB sampling small", slug="db-sampling-small")
+    large = Category(name="DB sampling large", slug="db-sampling-large")
+    db.add_all([owner, small, large])
+    await db.commit()
+    profiles = [
+        Profile(user_id=owner.id, category_id=(large.id if i < 12 else small.id), type=ProfileType.REAL,
+                gender=Gender.FEMALE, image_url=f"http://example.com/dbs{i}.jpg", is_active=True, is_approved=True)
+        for i in range(15)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    large_ids = {p.id for p in profiles[:12]}
+
+    pool = await pair_service.candidate_pool(db, ProfileType.REAL, Gender.FEMALE, small.id)
+    assert type(pool) is CandidatePool and len(pool) == 3
+
+    pool = await pair_service.candidate_pool(db, ProfileType.REAL, Gender.FEMALE, large.id)
+    assert isinstance(pool, DatabaseSampledPool) and len(pool) == 12
+
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        pairs = await pool.draw(db, 10)
+        # El tamaño medido se reutiliza: no se vuelven a leer ni contar los ids
+        again = await pair_service.candidate_pool(db, ProfileType.REAL, Gender.FEMALE, large.id)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+    assert len(statements) == 1 and "random_key" in statements[0]
+    assert isinstance(again, DatabaseSampledPool)
+    assert pairs and all(a != b and {a, b} <= large_ids for a, b in pairs)
+
+    # Muchas extracciones alcanzan a todo el pool
+    seen = set()
+    for _ in range(30):
+        seen.update(pid for pair in await pool.draw(db, 4) for pid in pair)
+    assert seen == large_ids
+
+    outsider = profiles[-1].id
+    assert await pool.contains(db, [profiles[0].id, outsider]) == [True, False]
+
+    pair = await pair_service.pick_pair(db, pool, owner.id)
+    assert set(pair) <= large_ids
+
+    pair_service._large_pools.clear()
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_exhausting_a_database_sampled_pool_never_loads_it_whole(db: AsyncSession, monkeypatch):
+    monkeypatch.setattr(settings, "PAIR_DB_SAMPLE_THRESHOLD", 3)
+
+    async def no_members(self, db):
+        raise AssertionError("members() loads the whole pool")
+
+    monkeypatch.setattr(DatabaseSampledPool, "members", no_members)
+
+    owner = User(email="dbexhaust@example.com", hashed_password="x", full_name="DB Exhaust", is_active=True)
+    voter = User(email="dbexhaust-voter@example.com", hashed_password="x", full_name="Voter", is_active=True)
+    inside = Category(name="DB exhaust", slug="db-exhaust")
+    other = Category(name="DB exhaust other", slug="db-exhaust-other")
+    db.add_all([owner, voter, inside, other])
+    await db.commit()
+    profiles = [
+        Profile(user_id=owner.id, category_id=(inside.id if i < 6 else other.id), type=ProfileType.REAL,
+                gender=Gender.MALE, image_url=f"http://example.com/dbx{i}.jpg", is_active=True, is_approved=True)
+        for i in range(7)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    ids = [p.id for p in profiles[:6]]
+    outsider = profiles[-1].id
+    voter_id = voter.id
+
+    pool = await pair_service.candidate_pool(db, ProfileType.REAL, Gender.MALE, inside.id)
+    assert isinstance(pool, DatabaseSampledPool) and len(pool) == 6
+
+    # Todos los pares del pool menos uno, y un voto que sale del pool
+    all_pairs = [(a, b) for i, a in enumerate(ids) for b in ids[i + 1:]]
+    last = all_pairs[-1]
+    db.add_all([Vote(winner_id=a, loser_id=b, voter_id=voter_id) for a, b in all_pairs[:-1]])
+    db.add(Vote(winner_id=ids[0], loser_id=outsider, voter_id=voter_id))
+    await db.commit()
+
+    assert await pair_service.coverage(db, voter_id, pool) == len(all_pairs) - 1
+    assert canonical_pair(*await pair_service.pick_pair(db, pool, voter_id)) == canonical_pair(*last)
+    assert [canonical_pair(*p) for p in await pair_service.sample_pairs(db, pool, voter_id, 3)] == [
+        canonical_pair(*last)
+    ]
+
+    db.add(Vote(winner_id=last[0], loser_id=last[1], voter_id=voter_id))
+    await db.commit()
+    await pair_service.rebuild_voted(db, voter_id)
+    with pytest.raises(NoMorePairs):
+        await pair_service.pick_pair(db, pool, voter_id)
+
+    pair_service._large_pools.clear()
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
@@ -0,0 +1,87 @@
+import fakeredis
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.category import Category
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.services.leaderboard_service import leaderboard_service
+from app.services.pair_service import PairMode, pair_service, window_rank
+
+
+def test_window_rank_never_returns_anchor():
+    for _ in range(200):
+        assert window_rank(3, 2, 6) in {2, 4, 5}
+    assert window_rank(0, 0, 1) == 1
+    assert window_rank(4, 4, 5) == 3
+
+
+@pytest.mark.asyncio
+async def test_close_mode_pairs_stay_within_rating_window(client: AsyncClient, db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    owner = User(email="matchmaking@example.com", hashed_password="x", full_name="Matchmaking", is_active=True)
+    category = Category(name="Matchmaking", slug="matchmaking")
+    db.add_all([owner, category])
+    await db.commit()
+    # Dos grupos separados por mucho más que la ventana
+    elos = [1000, 1010, 1030, 1050, 2000, 2020, 2040, 2060]
+    profiles = [
+        Profile(user_id=owner.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                image_url=f"http://example.com/mm{i}.jpg", elo_score=elo, is_active=True, is_approved=True)
+        for i, elo in enumerate(elos)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    elo_by_id = {p.id: p.elo_score for p in profiles}
+
+    def assert_close(pairs):
+        assert pairs
+        for a, b in pairs:
+            assert a != b
+            assert abs(elo_by_id[a] - elo_by_id[b]) <= settings.PAIR_CLOSE_WINDOW
+
+    # Sin Redis listo: índice ordenado de la BD con bisect
+    pool = await pair_service.candidate_pool(db, ProfileType.REAL, Gender.FEMALE, category.id, PairMode.CLOSE)
+    assert pool.scores is not None
+    assert_close(await pool.sample(50))
+
+    # El índice queda cargado en el proceso: la siguiente petición no lee la BD
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        again = await pair_service.candidate_pool(db, ProfileType.REAL, Gender.FEMALE, category.id, PairMode.CLOSE)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+    assert statements == [] and again.index is pool.index
+
+    # Un voto mueve al perfil dentro del índice sin recargarlo
+    moved = profiles[0]
+    moved.elo_score = elo_by_id[moved.id] = 2030
+    pair_service.update_exposure(moved)
+    assert again.scores == sorted(again.scores) and again.scores[again.ids.index(moved.id)] == 2030
+    assert_close(await again.sample(50))
+
+    # Con pools y leaderboard: rangos del sorted set
+    await pair_service.rebuild_pools(db)
+    await leaderboard_service.rebuild(db)
+    pool = await pair_service.candidate_pool(db, ProfileType.REAL, Gender.FEMALE, category.id, PairMode.CLOSE)
+    assert pool.scores is None and pool.rating_key
+    assert_close(await pool.sample(50))
+
+    resp = await client.get(f"{settings.API_V1_STR}/profiles/pairs?category_id={category.id}&mode=close&count=5")
+    assert resp.status_code == 200, resp.text
+    assert_close([[a["id"], b["id"]] for a, b in resp.json()])
+
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
@@ -0,0 +1,66 @@
+import fakeredis
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.category import Category
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.services.pair_service import pair_service
+
+
+@pytest.mark.asyncio
+async def test_candidate_pools_are_maintained_in_place(db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    owner = User(email="pairpools@example.com", hashed_password="x", full_name="Pools", is_active=True)
+    category = Category(name="Pair pools", slug="pair-pools")
+    db.add_all([owner, category])
+    await db.commit()
+    profiles = [
+        Profile(user_id=owner.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                image_url=f"http://example.com/pp{i}.jpg", is_active=True, is_approved=True)
+        for i in range(4)
+    ]
+    pending = Profile(user_id=owner.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                      image_url="http://example.com/pp-pending.jpg", is_active=True, is_approved=False)
+    db.add_all(profiles + [pending])
+    await db.commit()
+    ids = {p.id for p in profiles}
+    key = pair_service.pool_key(ProfileType.REAL, Gender.FEMALE, category.id)
+
+    assert not await pair_service.pools_ready()
+    await pair_service.rebuild_pools(db)
+    assert await pair_service.pools_ready()
+    assert {int(x) for x in await r.smembers(key)} == ids
+    assert {int(x) for x in await r.smembers(pair_service.pool_key(ProfileType.REAL, Gender.FEMALE, None))} >= ids
+
+    # Con el pool listo, elegir pares no consulta perfiles en la BD
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        pool = await pair_service.candidate_pool(db, ProfileType.REAL, Gender.FEMALE, category.id)
+        assert len(pool) == 4
+        for a, b in await pair_service.sample_pairs(db, pool, None, 5):
+            assert a != b and {a, b} <= ids
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+    assert not [s for s in statements if "FROM profile" in s]
+
+    # Aprobación, abandono y borrado se reflejan sin reconstruir
+    pending.is_approved = True
+    profiles[0].is_active = False
+    await db.commit()
+    await pair_service.sync_pools(pending, profiles[0])
+    await pair_service.remove_from_pools(profiles[1])
+    assert {int(x) for x in await r.smembers(key)} == (ids - {profiles[0].id, profiles[1].id}) | {pending.id}
+
+    for p in profiles + [pending]:
+        p.is_active = False
+    await db.commit()
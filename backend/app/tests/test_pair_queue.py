@@ -0,0 +1,91 @@
+import fakeredis
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.category import Category
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.models.vote import canonical_pair
+from app.services.pair_service import pair_service
+
+
+@pytest.mark.asyncio
+async def test_pairs_batch_uses_prefetch_queue_and_drops_stale(client: AsyncClient, db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    email = "pairqueue@example.com"
+    await client.post(f"{settings.API_V1_STR}/auth/register", json={"email": email, "password": "pass123", "full_name": "Queue"})
+    resp = await client.post(f"{settings.API_V1_STR}/auth/login/access-token", data={"username": email, "password": "pass123"})
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
+
+    category = Category(name="Pair queue", slug="pair-queue")
+    db.add(category)
+    await db.commit()
+    profiles = [
+        Profile(user_id=user.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                image_url=f"http://example.com/pq{i}.jpg", is_active=True, is_approved=True)
+        for i in range(8)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    url = f"{settings.API_V1_STR}/profiles/pairs?category_id={category.id}"
+    key = pair_service.queue_key(user.id, ProfileType.REAL, Gender.FEMALE, category.id)
+
+    # Primera petición: cola vacía, se muestrea en el momento y se rellena al terminar
+    resp = await client.get(f"{url}&count=3", headers=headers)
+    assert resp.status_code == 200, resp.text
+    batch = resp.json()
+    assert len(batch) == 3
+    assert len({canonical_pair(a["id"], b["id"]) for a, b in batch}) == 3
+    assert await r.llen(key) == settings.PAIR_PREFETCH_SIZE
+
+    # Un perfil sale del juego: sus pares en cola se descartan al sacarlos
+    gone = profiles[0]
+    gone.is_active = False
+    await db.commit()
+    resp = await client.get(f"{url}&count=10", headers=headers)
+    assert resp.status_code == 200
+    assert all(gone.id not in (a["id"], b["id"]) for a, b in resp.json())
+
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_pairs_retry_when_every_pair_is_dropped_on_load(client: AsyncClient, db: AsyncSession, monkeypatch):
+    owner = User(email="pairdropped@example.com", hashed_password="x", full_name="Dropped", is_active=True)
+    category = Category(name="Pair dropped", slug="pair-dropped")
+    db.add_all([owner, category])
+    await db.commit()
+    profiles = [
+        Profile(user_id=owner.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                image_url=f"http://example.com/pd{i}.jpg", is_active=True, is_approved=(i > 0))
+        for i in range(4)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    pending, a, b = profiles[0].id, profiles[1].id, profiles[2].id
+
+    # La primera tanda solo trae un perfil que ya no está aprobado (p. ej. un pool desfasado)
+    rounds = [[[pending, a]], [[a, b]]]
+    calls = []
+
+    async def next_pairs(db, user_id, type, gender, category_id, count, mode):
+        calls.append(count)
+        return rounds[len(calls) - 1], None
+
+    monkeypatch.setattr(pair_service, "next_pairs", next_pairs)
+    resp = await client.get(f"{settings.API_V1_STR}/profiles/pairs?category_id={category.id}&count=1")
+    assert resp.status_code == 200, resp.text
+    assert [[p["id"] for p in pair] for pair in resp.json()] == [[a, b]]
+    assert len(calls) == 2
+
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
@@ -0,0 +1,59 @@
+import fakeredis
+import pytest
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.category import Category
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.services.pair_service import NoMorePairs, pair_service
+from app.services.voting_service import voting_service
+
+
+@pytest.mark.asyncio
+async def test_voted_pair_index_replaces_history_scan(db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    voter = User(email="pairindex@example.com", hashed_password="x", full_name="Pair Index", is_active=True)
+    category = Category(name="Pair index", slug="pair-index")
+    db.add_all([voter, category])
+    await db.commit()
+    a, b, c = [
+        Profile(user_id=voter.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                image_url=f"http://example.com/pi{i}.jpg", is_active=True, is_approved=True)
+        for i in range(3)
+    ]
+    db.add_all([a, b, c])
+    await db.commit()
+    voter_id, ids = voter.id, [a.id, b.id, c.id]
+
+    # Votos anteriores al índice: se reconstruye desde Vote la primera vez
+    await voting_service.record_vote(db, a.id, b.id, voter_id)
+    await r.delete(pair_service.voted_key(voter_id))
+    assert await pair_service.voted_mask(db, voter_id, [(b.id, a.id), (a.id, c.id)]) == [True, False]
+
+    await voting_service.record_vote(db, c.id, a.id, voter_id)
+    assert await pair_service.has_voted(db, voter_id, a.id, c.id)
+
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        for _ in range(5):
+            assert sorted(await pair_service.pick_pair(db, ids, voter_id)) == sorted([b.id, c.id])
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+    assert not [s for s in statements if "FROM vote" in s]
+
+    await voting_service.record_vote(db, b.id, c.id, voter_id)
+    with pytest.raises(NoMorePairs):
+        await pair_service.pick_pair(db, ids, voter_id)
+
+    for p in (a, b, c):
+        p.is_active = False
+    await db.commit()
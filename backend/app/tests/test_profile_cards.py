@@ -0,0 +1,185 @@
+import fakeredis
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.category import Category
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.services.profile_card_service import profile_card_service
+
+
+class _Statements:
+    def __init__(self, db: AsyncSession):
+        self.engine = db.bind.sync_engine
+        self.seen = []
+
+    def _capture(self, conn, cursor, statement, *args):
+        self.seen.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._capture)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._capture)
+
+    def profile_rows(self):
+        return [s for s in self.seen if "FROM profile" in s and "profile.image_url" in s]
+
+
+@pytest.mark.asyncio
+async def test_profile_cards_read_through_and_invalidation(client: AsyncClient, db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    email = "cards@example.com"
+    await client.post(f"{settings.API_V1_STR}/auth/register", json={"email": email, "password": "pass123", "full_name": "Cards"})
+    resp = await client.post(f"{settings.API_V1_STR}/auth/login/access-token", data={"username": email, "password": "pass123"})
+    headers = {"Authorization": f"Bearer {resp.json()['access_token']}"}
+    user = (await db.execute(select(User).filter(User.email == email))).scalars().first()
+
+    category = Category(name="Profile cards", slug="profile-cards")
+    db.add(category)
+    await db.commit()
+    profiles = [
+        Profile(user_id=user.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                image_url=f"http://example.com/card{i}.jpg", is_active=True, is_approved=True)
+        for i in range(3)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    ids = [p.id for p in profiles]
+
+    # Primera lectura: una consulta para todos los fallos y escritura en ambos niveles
+    with _Statements(db) as stmts:
+        cards = await profile_card_service.get_many(db, ids)
+    assert set(cards) == set(ids)
+    assert len(stmts.profile_rows()) == 1
+    assert set(int(k) for k in await r.hkeys(profile_card_service.KEY)) >= set(ids)
+
+    # Caché local caliente, y después solo Redis: ninguna consulta de perfiles
+    with _Statements(db) as stmts:
+        await profile_card_service.get_many(db, ids)
+        profile_card_service._local.clear()
+        cards = await profile_card_service.get_many(db, ids)
+        resp = await client.get(f"{settings.API_V1_STR}/profiles/{ids[0]}/comments")
+    assert resp.status_code == 200
+    assert cards[ids[0]]["image_url"] == "http://example.com/card0.jpg"
+    assert not stmts.profile_rows()
+
+    # Un voto invalida las tarjetas; la siguiente lectura trae el nuevo rating de la BD
+    resp = await client.post(
+        f"{settings.API_V1_STR}/votes/",
+        json={"winner_id": ids[0], "loser_id": ids[1]},
+        headers=headers,
+    )
+    assert resp.status_code == 200, resp.text
+    assert await r.hmget(profile_card_service.KEY, ids[:2]) == [None, None]
+    profile_card_service._local.clear()
+    cards = await profile_card_service.get_many(db, ids[:2])
+    assert cards[ids[0]]["elo_score"] > cards[ids[1]]["elo_score"]
+    assert cards[ids[0]]["win_count"] == 1
+
+    # Abandonar el juego: la tarjeta lo refleja y los comentarios dan 404
+    resp = await client.post(f"{settings.API_V1_STR}/profiles/{ids[2]}/leave", headers=headers)
+    assert resp.status_code == 200
+    assert (await profile_card_service.get(db, ids[2]))["is_active"] is False
+    resp = await client.get(f"{settings.API_V1_STR}/profiles/{ids[2]}/comments")
+    assert resp.status_code == 404
+
+    # Borrado: desaparece de Redis y de la caché local
+    resp = await client.delete(f"{settings.API_V1_STR}/profiles/{ids[2]}", headers=headers)
+    assert resp.status_code == 200
+    assert await r.hget(profile_card_service.KEY, ids[2]) is None
+    assert await profile_card_service.get(db, ids[2]) is None
+
+    for p in profiles[:2]:
+        p.is_active = False
+    await db.commit()
+    await profile_card_service.invalidate(*ids)
+
+
+@pytest.mark.asyncio
+async def test_fill_racing_an_invalidation_is_not_stored(db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    owner = User(email="cardsrace@example.com", hashed_password="x", full_name="Race", is_active=True)
+    db.add(owner)
+    await db.commit()
+    profile = Profile(user_id=owner.id, type=ProfileType.REAL, gender=Gender.MALE,
+                      image_url="http://example.com/race.jpg", is_active=True, is_approved=True)
+    db.add(profile)
+    await db.commit()
+    pid = profile.id
+
+    # La lectura sale de la BD con el rating viejo y, antes de guardarla, un voto confirma e invalida
+    fill = profile_card_service._fill
+
+    async def slow_fill(cards, gens):
+        await db.execute(Profile.__table__.update().where(Profile.id == pid).values(elo_score=1300))
+        await db.commit()
+        await profile_card_service.invalidate(pid)
+        await fill(cards, gens)
+
+    monkeypatch.setattr(profile_card_service, "_fill", slow_fill)
+    stale = await profile_card_service.get(db, pid)
+    assert stale["elo_score"] == 1200
+    assert await r.hget(profile_card_service.KEY, pid) is None
+
+    monkeypatch.setattr(profile_card_service, "_fill", fill)
+    profile_card_service._local.clear()
+    assert (await profile_card_service.get(db, pid))["elo_score"] == 1300
+    assert await r.hget(profile_card_service.KEY, pid) is not None
+
+
+@pytest.mark.asyncio
+async def test_profiles_batch_lookup(client: AsyncClient, db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    owner = User(email="cardsbatch@example.com", hashed_password="x", full_name="Batch", is_active=True)
+    db.add(owner)
+    await db.commit()
+    profiles = [
+        Profile(user_id=owner.id, type=ProfileType.REAL, gender=Gender.MALE,
+                image_url=f"http://example.com/batch{i}.jpg", is_active=True, is_approved=i != 2)
+        for i in range(3)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    a, b, pending = (p.id for p in profiles)
+    unknown = pending + 1000
+
+    url = f"{settings.API_V1_STR}/profiles/"
+    resp = await client.get(url, params={"ids": f"{b},{unknown},{a},{pending}"})
+    assert resp.status_code == 200, resp.text
+    body = resp.json()
+    assert [item["id"] for item in body["items"]] == [b, unknown, a, pending]
+    assert [item["found"] for item in body["items"]] == [True, False, True, False]
+    assert body["items"][0]["profile"]["image_url"] == "http://example.com/batch1.jpg"
+    assert body["items"][1]["profile"] is None
+    assert body["missing"] == [unknown, pending]
+
+    # Segunda lectura: todo sale de las tarjetas
+    with _Statements(db) as stmts:
+        resp = await client.get(url, params={"ids": f"{a},{b}"})
+    assert resp.status_code == 200
+    assert not stmts.profile_rows()
+
+    assert (await client.get(url, params={"ids": "1,x"})).status_code == 400
+    too_many = ",".join(str(i) for i in range(settings.PROFILE_BATCH_MAX + 1))
+    assert (await client.get(url, params={"ids": too_many})).status_code == 400
+
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
+    await profile_card_service.invalidate(a, b, pending)
+
+    # Desactivados: dejan de ser públicos
+    resp = await client.get(url, params={"ids": f"{a},{b}"})
+    assert resp.json()["missing"] == [a, b]
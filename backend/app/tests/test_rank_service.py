@@ -0,0 +1,43 @@
+import fakeredis
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.services.leaderboard_service import leaderboard_service
+from app.services.rank_service import rank_service
+
+
+@pytest.mark.asyncio
+async def test_rank_lookup_matches_sql_rank_semantics(db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    owner = User(email="rankowner@example.com", hashed_password="x", full_name="Rank Owner", is_active=True)
+    db.add(owner)
+    await db.commit()
+    profiles = [
+        Profile(user_id=owner.id, type=ProfileType.REAL, gender=Gender.MALE, image_url=f"http://example.com/rk{i}.jpg",
+                elo_score=elo, is_active=True, is_approved=approved)
+        for i, (elo, approved) in enumerate([(7000, True), (7000, True), (6900, True), (8000, False)])
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    ids = [p.id for p in profiles]
+
+    # Sin leaderboard: cálculo en la BD
+    from_db = await rank_service.get_ranks(db, ids)
+    assert ids[3] not in from_db
+    assert from_db[ids[0]]["rank"] == from_db[ids[1]]["rank"]
+    assert from_db[ids[2]]["rank"] == from_db[ids[0]]["rank"] + 2
+
+    # Con leaderboard: ZSCORE + ZCOUNT devuelven lo mismo
+    await leaderboard_service.rebuild(db)
+    from_redis = await rank_service.get_ranks(db, ids)
+    assert from_redis == from_db
+    assert 0 <= from_redis[ids[0]]["percentile"] <= 100
+    assert await rank_service.get_rank(db, ids[3]) is None
+
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
@@ -0,0 +1,46 @@
+import fakeredis
+
+from app.core.cache import MISSING
+
+from app.models.profile import ProfileType, Gender
+from app.services.ranking_service import RankingService, ranking_cache
+
+
+class DummyProfile:
+    def __init__(self, type, gender, category_id):
+        self.type = type
+        self.gender = gender
+        self.category_id = category_id
+
+
+async def test_vote_invalidates_only_touched_namespaces(monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    female_cat = await RankingService.ranking_cache_key(ProfileType.REAL, Gender.FEMALE, 7, 50)
+    all_genders = await RankingService.ranking_cache_key(ProfileType.REAL, None, None, 50)
+    male = await RankingService.ranking_cache_key(ProfileType.REAL, Gender.MALE, None, 50)
+
+    await RankingService.invalidate_profiles(DummyProfile(ProfileType.REAL, Gender.FEMALE, 7))
+
+    assert await RankingService.ranking_cache_key(ProfileType.REAL, Gender.FEMALE, 7, 50) != female_cat
+    assert await RankingService.ranking_cache_key(ProfileType.REAL, None, None, 50) != all_genders
+    assert await RankingService.ranking_cache_key(ProfileType.REAL, Gender.MALE, None, 50) == male
+    # Sin SCAN ni DELETE: solo contadores de generación
+    assert all(k.startswith("cachever:") for k in await r.keys("*"))
+
+
+async def test_global_invalidation_and_hit_ratio(monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+    ranking_cache.reset_stats()
+    monkeypatch.setattr(ranking_cache, "local_ttl", 0)
+
+    key = await RankingService.ranking_cache_key(ProfileType.REAL, Gender.MALE, None, 10)
+    assert await ranking_cache.get(key) is MISSING
+    await ranking_cache.set(key, [], ttl=60)
+    assert await ranking_cache.get(key) == []
+    assert RankingService.cache_stats()["hit_ratio"] == 0.5
+
+    await RankingService.invalidate_ranking_cache()
+    assert await RankingService.ranking_cache_key(ProfileType.REAL, Gender.MALE, None, 10) != key
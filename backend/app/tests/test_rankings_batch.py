@@ -0,0 +1,170 @@
+import asyncio
+
+import fakeredis
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.category import Category
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.services.leaderboard_service import leaderboard_service
+from app.services.profile_card_service import profile_card_service
+from app.services.ranking_service import ranking_cache, ranking_service
+
+
+@pytest.mark.asyncio
+async def test_rankings_batch_matches_single_views(client: AsyncClient, db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    owner = User(email="rankbatch@example.com", hashed_password="x", full_name="Rankings", is_active=True)
+    categories = [Category(name=f"Rankings batch {i}", slug=f"rankings-batch-{i}") for i in range(2)]
+    db.add_all([owner] + categories)
+    await db.commit()
+    profiles = [
+        Profile(user_id=owner.id, category_id=c.id, type=ProfileType.REAL, gender=g,
+                image_url=f"http://example.com/rb{c.id}-{g.value}-{i}.jpg", elo_score=1200 + i * 10 + j,
+                is_active=True, is_approved=True)
+        for j, c in enumerate(categories)
+        for g in (Gender.FEMALE, Gender.MALE)
+        for i in range(3)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+
+    category_ids = ",".join(str(c.id) for c in categories)
+    url = f"{settings.API_V1_STR}/profiles/rankings?category_ids={category_ids}&genders=female,male&limit=2"
+    resp = await client.get(url)
+    assert resp.status_code == 200, resp.text
+    views = resp.json()
+    assert [(v["category_id"], v["gender"]) for v in views] == [
+        (c.id, g) for c in categories for g in ("female", "male")
+    ]
+
+    # Cada vista coincide con GET /profiles/ranking de esa categoría y género
+    for view in views:
+        single = await client.get(
+            f"{settings.API_V1_STR}/profiles/ranking",
+            params={"category_id": view["category_id"], "gender": view["gender"], "limit": 2},
+        )
+        assert [p["id"] for p in view["profiles"]] == [p["id"] for p in single.json()]
+        assert len(view["profiles"]) == 2
+
+    # Sin filtrar por género: una vista por categoría con ambos géneros
+    resp = await client.get(f"{settings.API_V1_STR}/profiles/rankings?category_ids={category_ids}&limit=4")
+    assert [len(v["profiles"]) for v in resp.json()] == [4, 4]
+    assert all(v["gender"] is None for v in resp.json())
+
+    # Segunda petición: todo sale de la caché de rankings
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        cached = await client.get(url)
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+    assert cached.json() == views
+    assert not [s for s in statements if "FROM profile" in s]
+
+    # Con el leaderboard cargado la respuesta es la misma
+    await leaderboard_service.rebuild(db)
+    resp = await client.get(url)
+    assert [[p["id"] for p in v["profiles"]] for v in resp.json()] == [[p["id"] for p in v["profiles"]] for v in views]
+
+    assert (await client.get(f"{settings.API_V1_STR}/profiles/rankings?genders=nope")).status_code == 400
+
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
+    await profile_card_service.invalidate(*(p.id for p in profiles))
+
+
+@pytest.mark.asyncio
+async def test_ranking_stampede_runs_one_query_per_expiry(client: AsyncClient, db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    owner = User(email="stampede@example.com", hashed_password="x", full_name="Stampede", is_active=True)
+    category = Category(name="Stampede", slug="stampede")
+    db.add_all([owner, category])
+    await db.commit()
+    profiles = [
+        Profile(user_id=owner.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                image_url=f"http://example.com/st{i}.jpg", elo_score=1200 + i, is_active=True, is_approved=True)
+        for i in range(5)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    url = f"{settings.API_V1_STR}/profiles/ranking?category_id={category.id}&gender=female"
+
+    statements = []
+
+    def capture(conn, cursor, statement, *args):
+        # La consulta del ranking (no la comprobación de filas de otra temporada)
+        if statement.startswith("SELECT profile.id \nFROM profile") and "profile.is_active" in statement:
+            statements.append(statement)
+
+    sync_engine = db.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        # Caché fría y, después, tras invalidar la vista (como hace cada voto)
+        for _ in range(2):
+            statements.clear()
+            responses = await asyncio.gather(*(client.get(url) for _ in range(25)))
+            assert all(resp.status_code == 200 for resp in responses)
+            assert len({tuple(p["id"] for p in resp.json()) for resp in responses}) == 1
+            assert len(statements) == 1
+            await ranking_service.invalidate_profiles(profiles[0])
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
+    await profile_card_service.invalidate(*(p.id for p in profiles))
+
+
+@pytest.mark.asyncio
+async def test_ranking_cache_hit_returns_stored_bytes(client: AsyncClient, db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    owner = User(email="rankbytes@example.com", hashed_password="x", full_name="Bytes", is_active=True)
+    category = Category(name="Ranking bytes", slug="ranking-bytes")
+    db.add_all([owner, category])
+    await db.commit()
+    profiles = [
+        Profile(user_id=owner.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.MALE,
+                image_url=f"http://example.com/bytes{i}.jpg", elo_score=1200 + i, is_active=True, is_approved=True)
+        for i in range(30)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    url = f"{settings.API_V1_STR}/profiles/ranking?category_id={category.id}"
+
+    first = await client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+
+    # Acierto: la variante gzip guardada, sin pasar por el GZipMiddleware
+    ranking_cache.clear_local()
+    hit = await client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert hit.headers["content-encoding"] == "gzip"
+    assert "accept-encoding" in hit.headers["vary"].lower()
+    assert hit.json() == first.json()
+    assert ranking_cache.snapshot()["redis_hits"] >= 1
+
+    plain = await client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == first.json()
+
+    for p in profiles:
+        p.is_active = False
+    await db.commit()
+    await profile_card_service.invalidate(*(p.id for p in profiles))
@@ -25,32 +25,30 @@ class DummyRequest:
 
 
 @pytest.mark.asyncio
-async def test_ratelimiter_blocks_after_limit(monkeypatch):
-    r = fakeredis.FakeRedis(decode_responses=True)
-    monkeypatch.setattr("app.core.ratelimit.redis_client", r)
+async def test_ratelimiter_blocks_after_limit():
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
 
     limiter = RateLimiter(times=2, seconds=60)
     req = DummyRequest("/api/v1/votes/")
 
-    await limiter(req)
-    await limiter(req)
+    await limiter(req, r)
+    await limiter(req, r)
 
     with pytest.raises(Exception) as exc:
-        await limiter(req)
+        await limiter(req, r)
 
     assert getattr(exc.value, "status_code", None) == 429
 
 
 @pytest.mark.asyncio
-async def test_ratelimiter_uses_user_id_when_bearer_token_present(monkeypatch):
-    r = fakeredis.FakeRedis(decode_responses=True)
-    monkeypatch.setattr("app.core.ratelimit.redis_client", r)
+async def test_ratelimiter_uses_user_id_when_bearer_token_present():
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
 
     token = jwt.encode({"sub": "99"}, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     limiter = RateLimiter(times=1, seconds=60)
     req = DummyRequest("/api/v1/votes/", headers={"Authorization": f"Bearer {token}"})
 
-    await limiter(req)
+    await limiter(req, r)
 
-    keys = list(r.scan_iter("rate_limit:*"))
+    keys = [k async for k in r.scan_iter("rate_limit:*")]
     assert any("user:99" in k for k in keys)
@@ -0,0 +1,22 @@
+import fakeredis
+import pytest
+
+from app.core import redis_client as redis_module
+from app.core.config import settings
+
+
+@pytest.mark.asyncio
+async def test_async_client_lifecycle_falls_back_to_memory(monkeypatch):
+    monkeypatch.setattr(redis_module, "async_redis", None)
+    # Puerto sin Redis: el arranque no falla, usa el cliente en memoria
+    monkeypatch.setattr(settings, "REDIS_PORT", 1)
+
+    client = await redis_module.init_async_redis()
+    assert isinstance(client, fakeredis.FakeAsyncRedis)
+    assert await redis_module.init_async_redis() is client
+    assert await redis_module.get_redis() is client
+    assert await client.ping()
+
+    await redis_module.close_async_redis()
+    assert redis_module.async_redis is None
+    assert await redis_module.get_redis() is None
@@ -0,0 +1,114 @@
+import fakeredis
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.category import Category
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.profile_season_rating import ProfileSeasonRating
+from app.models.user import User
+from app.services.ranking_service import ranking_service
+from app.services.rating_service import rating_service
+from app.services.season_service import season_service
+from app.services.voting_service import voting_service
+
+
+class _Statements:
+    def __init__(self, db: AsyncSession):
+        self.engine = db.bind.sync_engine
+        self.seen = []
+
+    def _capture(self, conn, cursor, statement, *args):
+        self.seen.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, "before_cursor_execute", self._capture)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, "before_cursor_execute", self._capture)
+
+
+@pytest.mark.asyncio
+async def test_rollover_only_flips_the_season_and_resets_in_background(client: AsyncClient, db: AsyncSession, monkeypatch):
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr("app.core.redis_client.async_redis", r)
+
+    first_id = (await season_service.start_new_season(db, "Ratings S1")).id
+    owner = User(email="seasonratings@example.com", hashed_password="x", full_name="Ratings", is_active=True)
+    category = Category(name="Season ratings", slug="season-ratings")
+    db.add_all([owner, category])
+    await db.commit()
+    a, b, idle, idle2 = [
+        Profile(user_id=owner.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.OTHER,
+                image_url=f"http://example.com/sr{i}.jpg", elo_score=elo, is_active=True, is_approved=True)
+        for i, elo in enumerate([1300, 1100, 1250, 1240])
+    ]
+    db.add_all([a, b, idle, idle2])
+    await db.commit()
+    ids = a_id, b_id, idle_id, idle2_id = a.id, b.id, idle.id, idle2.id
+    url = f"{settings.API_V1_STR}/profiles/ranking?category_id={category.id}"
+
+    # El rating es una columna normal: cargar un perfil no calcula nada por fila
+    assert "CASE" not in str(select(Profile).compile())
+
+    await voting_service.record_vote(db, a_id, b_id)
+    s1_elo = a.elo_score
+    assert a.voted_count == 1 and a.win_count == 1
+
+    # Cambiar de temporada no reescribe ninguna fila
+    with _Statements(db) as stmts:
+        second_id = (await season_service.start_new_season(db, "Ratings S2")).id
+    assert not [s for s in stmts.seen if s.lstrip().upper().startswith(("UPDATE PROFILE", "INSERT INTO PROFILE_SEASON_RATING"))]
+    db.expire_all()
+    rows = (await db.execute(select(Profile).filter(Profile.id.in_(ids)))).scalars().all()
+    by_id = {p.id: p for p in rows}
+    assert all(p.rating_season_id == first_id for p in rows)
+    assert by_id[idle_id].elo_score == 1250
+
+    # ...pero los lectores ya los ven con los valores iniciales
+    ranking = (await client.get(url)).json()
+    assert {(p["elo_score"], p["voted_count"], p["win_count"]) for p in ranking} == {(1200, 0, 0)}
+
+    await voting_service.record_vote(db, b_id, a_id)
+    assert (by_id[a_id].voted_count, by_id[a_id].win_count) == (1, 0)
+    await ranking_service.invalidate_profiles(by_id[a_id])
+    ranking = (await client.get(url)).json()
+    # idle cuenta como 1200, no con los 1250 de la temporada pasada
+    assert [p["id"] for p in ranking][:2] == [b_id, idle_id] and ranking[-1]["id"] == a_id
+
+    # Trabajo en segundo plano: bloques de una fila, cortado y reanudado desde el checkpoint
+    stats = await rating_service.reset_stale(db, second_id, chunk_size=1, max_chunks=1)
+    assert (stats["completed"], stats["rows"]) == (False, 1)
+    stats = await rating_service.reset_stale(db, second_id, chunk_size=1)
+    assert stats["resumed"] and stats["completed"] and stats["rows"] >= 1
+    assert not await r.exists(rating_service.checkpoint_key(second_id))
+    db.expire_all()
+    rows = (await db.execute(select(Profile).filter(Profile.id.in_(ids)))).scalars().all()
+    assert all(p.rating_season_id == second_id for p in rows)
+    assert (by_id[idle_id].elo_score, by_id[idle_id].voted_count) == (1200, 0)
+    archived = (await db.execute(
+        select(ProfileSeasonRating).filter(ProfileSeasonRating.profile_id.in_(ids))
+    )).scalars().all()
+    assert {(r.profile_id, r.season_id) for r in archived} == {(pid, first_id) for pid in ids}
+    assert {r.profile_id: r.elo_score for r in archived}[idle_id] == 1250
+
+    # Un voto que llega antes que el barrido parte de los valores iniciales
+    await db.execute(update(Profile).where(Profile.id == idle_id).values(rating_season_id=first_id, elo_score=1400))
+    await db.commit()
+    await voting_service.record_vote(db, idle_id, b_id)
+    assert by_id[idle_id].rating_season_id == second_id
+    assert by_id[idle_id].voted_count == 1 and 1200 < by_id[idle_id].elo_score < 1400
+
+    resp = await client.get(f"{settings.API_V1_STR}/profiles/{a_id}/seasons")
+    history = resp.json()
+    assert [h["season_id"] for h in history] == [second_id, first_id]
+    assert history[1]["elo_score"] == s1_elo
+    assert (history[1]["voted_count"], history[1]["win_count"]) == (1, 1)
+
+    for p in rows:
+        p.is_active = False
+    await db.commit()
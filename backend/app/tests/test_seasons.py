@@ -1,5 +1,6 @@
 import pytest
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.rating_service import rating_service
 from app.services.season_service import season_service
 from app.models.profile import Profile, ProfileType, Gender
 from app.models.user import User
@@ -25,8 +26,16 @@ async def test_ranking_reset_and_badges(db: AsyncSession):
     
     # 2. Run reset (Async)
     await season_service.async_reset_rankings_and_award_badges(db, "Test Season")
-    
-    # 3. Verify
+    season = await season_service.get_active_season(db)
+
+    # 3. Verify: the rollover only flips the season, old ratings already read as 1200
+    ids = [p1.id, p2.id, p3.id, p4.id]
+    result = await db.execute(select(Profile.id, *rating_service.columns()).filter(Profile.id.in_(ids)))
+    assert {(row.elo_score, row.voted_count, row.win_count) for row in result.all()} == {(1200, 0, 0)}
+
+    # The background job archives and resets the rows
+    stats = await rating_service.reset_stale(db, season.id)
+    assert stats["completed"]
     await db.refresh(p1)
     await db.refresh(p2)
     await db.refresh(p3)
@@ -0,0 +1,47 @@
+import os
+
+import fakeredis
+import pytest
+
+from app.core.streams import RedisStreamQueue
+
+
+@pytest.mark.asyncio
+async def test_consumers_are_per_process_and_reclaim_dead_entries():
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    assert RedisStreamQueue("test:stream", "g").consumer.endswith(f":{os.getpid()}")
+
+    dead = RedisStreamQueue("test:stream", "g", consumer="host-a:1")
+    alive = RedisStreamQueue("test:stream", "g", consumer="host-b:2", claim_idle_ms=60000)
+    dead.client = alive.client = r
+    for i in range(3):
+        await dead.add({"n": i})
+
+    # El primer consumidor lee y cae sin confirmar: el otro no las ve como nuevas
+    assert [data["n"] for _, data in await dead.read(10)] == [0, 1, 2]
+    assert await alive.read(10) == []
+
+    # Pasado el tiempo de inactividad las reclama, en orden de llegada
+    alive.claim_idle_ms = 0
+    claimed = await alive.read(10)
+    assert [data["n"] for _, data in claimed] == [0, 1, 2]
+    await alive.ack([entry_id for entry_id, _ in claimed])
+    assert await alive.read(10) == []
+    assert (await alive.lag())["length"] == 0
+
+
+@pytest.mark.asyncio
+async def test_delivery_counts_with_ids_that_do_not_sort_as_text():
+    r = fakeredis.FakeAsyncRedis(decode_responses=True)
+    queue = RedisStreamQueue("test:stream:ids", "g", consumer="host-a:1")
+    queue.client = r
+    await queue.ensure_group()
+    # Mismo milisegundo, secuencias de distinto número de dígitos: "…-10" < "…-9" como texto
+    ids = ["1700000000000-9", "1700000000000-10", "1700000000000-11"]
+    for entry_id in ids:
+        await r.xadd(queue.stream, {"data": "{}"}, id=entry_id)
+
+    await queue.read(10)
+    assert await queue.delivery_counts(ids) == {entry_id: 1 for entry_id in ids}
+    await queue.read(10)
+    assert await queue.delivery_counts(ids) == {entry_id: 2 for entry_id in ids}
@@ -0,0 +1,156 @@
+import pytest
+import fakeredis
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.models.vote import Vote
+from app.services.vote_ingestion import VoteIngestionService
+
+
+async def _make_profiles(db: AsyncSession, email: str, n: int = 3):
+    user = User(email=email, hashed_password="x", full_name="Queue", is_active=True)
+    db.add(user)
+    await db.commit()
+    await db.refresh(user)
+    profiles = [
+        Profile(
+            user_id=user.id,
+            type=ProfileType.REAL,
+            gender=Gender.OTHER,
+            image_url=f"http://example.com/q{i}.jpg",
+            is_active=True,
+            is_approved=True,
+        )
+        for i in range(n)
+    ]
+    db.add_all(profiles)
+    await db.commit()
+    return user, profiles
+
+
+@pytest.mark.asyncio
+async def test_queued_votes_applied_in_one_batch(db: AsyncSession):
+    voter, (a, b, c) = await _make_profiles(db, "queue_voter@example.com")
+    service = VoteIngestionService()
+    service.queue.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    await service.enqueue(db, a.id, b.id, voter.id)
+    await service.enqueue(db, c.id, a.id, voter.id)
+    # Duplicado del primer par en sentido inverso: se descarta al aplicar
+    await service.enqueue(db, b.id, a.id, voter.id)
+    assert (await service.metrics())["queue"]["length"] == 3
+
+    consumed = await service.process_batch(db)
+    assert consumed == 3
+    metrics = await service.metrics()
+    assert metrics["applied_total"] == 2
+    assert metrics["skipped_total"] == 1
+    assert metrics["queue"]["length"] == 0
+
+    result = await db.execute(select(Vote).filter(Vote.voter_id == voter.id))
+    assert len(result.scalars().all()) == 2
+
+    ids = (a.id, b.id, c.id, voter.id)
+    db.expire_all()
+    result = await db.execute(select(Profile).filter(Profile.id.in_(ids[:3])))
+    by_id = {p.id: p for p in result.scalars().all()}
+    assert by_id[ids[0]].voted_count == 2 and by_id[ids[0]].win_count == 1
+    assert by_id[ids[1]].voted_count == 1 and by_id[ids[1]].win_count == 0
+    assert by_id[ids[2]].win_count == 1
+    assert by_id[ids[2]].elo_score > 1200
+
+    # Ya votado: se rechaza al encolar
+    with pytest.raises(ValueError):
+        await service.enqueue(db, ids[0], ids[1], ids[3])
+
+
+@pytest.mark.asyncio
+async def test_cast_vote_returns_202_in_queue_mode(client, db: AsyncSession, monkeypatch):
+    from app.services.vote_ingestion import vote_ingestion_service
+
+    _, (a, b, _) = await _make_profiles(db, "queue_owner@example.com")
+    email = "queue_api@example.com"
+    await client.post(f"{settings.API_V1_STR}/auth/register", json={"email": email, "password": "pass123", "full_name": "Q"})
+    r = await client.post(f"{settings.API_V1_STR}/auth/login/access-token", data={"username": email, "password": "pass123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    monkeypatch.setattr(settings, "VOTE_INGESTION_MODE", "queue")
+    monkeypatch.setattr(vote_ingestion_service.queue, "client", fakeredis.FakeAsyncRedis(decode_responses=True))
+
+    r = await client.post(f"{settings.API_V1_STR}/votes/", json={"winner_id": a.id, "loser_id": b.id}, headers=headers)
+    assert r.status_code == 202, r.text
+    assert r.json()["status"] == "queued"
+    assert await vote_ingestion_service.process_batch(db) == 1
+
+
+@pytest.mark.asyncio
+async def test_bad_entry_is_parked_without_blocking_the_queue(db: AsyncSession, monkeypatch):
+    from app.services.ranking_service import ranking_service
+
+    voter, (a, b, c) = await _make_profiles(db, "queue_poison@example.com")
+    voter_id = voter.id
+    service = VoteIngestionService()
+    service.queue.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    monkeypatch.setattr(settings, "VOTE_QUEUE_MAX_DELIVERIES", 2)
+
+    async def broken(*args, **kwargs):
+        raise ConnectionError("redis down")
+
+    # Un fallo de Redis tras el commit no deja el lote sin confirmar
+    monkeypatch.setattr(ranking_service, "invalidate_namespaces", broken)
+
+    await service.enqueue(db, a.id, b.id, voter.id)
+    await service.queue.add({"winner_id": a.id})  # Entrada mal formada
+    await service.enqueue(db, c.id, a.id, voter.id)
+
+    # El lote falla por la entrada mala: los votos buenos se aplican uno a uno
+    assert await service.process_batch(db) == 3
+    metrics = await service.metrics()
+    assert metrics["applied_total"] == 2
+    assert metrics["queue"]["length"] == 1
+
+    # Agotadas sus entregas se aparta al stream de descartes
+    assert await service.process_batch(db) == 1
+    metrics = await service.metrics()
+    assert metrics["dead_lettered_total"] == 1
+    assert metrics["queue"]["length"] == 0
+    assert await service.queue.client.xlen(service.queue.dead_stream) == 1
+    assert await service.process_batch(db) == 0
+
+    result = await db.execute(select(Vote).filter(Vote.voter_id == voter_id))
+    assert len(result.scalars().all()) == 2
+
+
+@pytest.mark.asyncio
+async def test_batch_rates_only_votes_actually_inserted(db: AsyncSession, monkeypatch):
+    voter, (a, b, c) = await _make_profiles(db, "queue_conflict@example.com")
+    ids = (a.id, b.id, c.id, voter.id)
+    service = VoteIngestionService()
+    service.queue.client = fakeredis.FakeAsyncRedis(decode_responses=True)
+
+    await service.enqueue(db, a.id, b.id, voter.id)
+    await service.enqueue(db, c.id, a.id, voter.id)
+
+    # Otro escritor guarda el mismo voto entre la comprobación y el INSERT
+    async def nothing_seen(*args):
+        return set()
+
+    monkeypatch.setattr(service, "_voted_pairs", nothing_seen)
+    db.add(Vote(winner_id=ids[1], loser_id=ids[0], voter_id=ids[3]))
+    await db.commit()
+
+    assert await service.process_batch(db) == 2
+    metrics = await service.metrics()
+    assert metrics["applied_total"] == 1
+    assert metrics["skipped_total"] == 1
+
+    db.expire_all()
+    result = await db.execute(select(Profile).filter(Profile.id.in_(ids[:3])))
+    by_id = {p.id: p for p in result.scalars().all()}
+    # Solo cuenta c > a: el voto a > b chocó con el índice único
+    assert (by_id[ids[0]].voted_count, by_id[ids[0]].win_count) == (1, 0)
+    assert (by_id[ids[1]].voted_count, by_id[ids[1]].elo_score) == (0, 1200)
+    assert by_id[ids[2]].win_count == 1
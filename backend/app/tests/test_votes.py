@@ -0,0 +1,88 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import func
+
+from app.core.config import settings
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.models.vote import Vote
+
+
+@pytest.mark.asyncio
+async def test_duplicate_vote_in_either_direction_is_rejected(client: AsyncClient, db: AsyncSession):
+    owner = User(email="dupowner@example.com", hashed_password="x", full_name="Dup Owner", is_active=True)
+    db.add(owner)
+    await db.commit()
+    await db.refresh(owner)
+    a = Profile(user_id=owner.id, type=ProfileType.REAL, gender=Gender.OTHER, image_url="http://example.com/da.jpg", is_active=True, is_approved=True)
+    b = Profile(user_id=owner.id, type=ProfileType.REAL, gender=Gender.OTHER, image_url="http://example.com/db.jpg", is_active=True, is_approved=True)
+    db.add_all([a, b])
+    await db.commit()
+    a_id, b_id = a.id, b.id
+
+    email = "dupvoter@example.com"
+    await client.post(f"{settings.API_V1_STR}/auth/register", json={"email": email, "password": "pass123", "full_name": "Dup"})
+    r = await client.post(f"{settings.API_V1_STR}/auth/login/access-token", data={"username": email, "password": "pass123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    r = await client.post(f"{settings.API_V1_STR}/votes/", json={"winner_id": a_id, "loser_id": b_id}, headers=headers)
+    assert r.status_code == 200, r.text
+    voter_id = r.json()["voter_id"]
+
+    r = await client.post(f"{settings.API_V1_STR}/votes/", json={"winner_id": b_id, "loser_id": a_id}, headers=headers)
+    assert r.status_code == 409
+    assert "Ya has votado" in r.json()["detail"]
+
+    count = await db.execute(select(func.count(Vote.id)).filter(Vote.voter_id == voter_id))
+    assert count.scalar() == 1
+    db.expire_all()
+    result = await db.execute(select(Profile).filter(Profile.id.in_([a_id, b_id])))
+    assert sorted(p.voted_count for p in result.scalars().all()) == [1, 1]
+
+
+@pytest.mark.asyncio
+async def test_redis_failure_after_commit_keeps_vote_successful(client: AsyncClient, db: AsyncSession, monkeypatch):
+    from app.services.badge_events import badge_event_service
+    from app.services.pair_service import pair_service
+    from app.services.ranking_service import ranking_service
+
+    owner = User(email="aftercommit@example.com", hashed_password="x", full_name="After", is_active=True)
+    db.add(owner)
+    await db.commit()
+    a = Profile(user_id=owner.id, type=ProfileType.REAL, gender=Gender.OTHER, image_url="http://example.com/ac-a.jpg", is_active=True, is_approved=True)
+    b = Profile(user_id=owner.id, type=ProfileType.REAL, gender=Gender.OTHER, image_url="http://example.com/ac-b.jpg", is_active=True, is_approved=True)
+    db.add_all([a, b])
+    await db.commit()
+    a_id, b_id = a.id, b.id
+
+    async def broken(*args, **kwargs):
+        raise ConnectionError("redis down")
+
+    detected = []
+
+    async def detect(*profiles):
+        detected.extend(p.id for p in profiles)
+        return 0
+
+    def broken_exposure(*profiles):
+        raise RuntimeError("sampler out of sync")
+
+    monkeypatch.setattr(ranking_service, "invalidate_namespaces", broken)
+    monkeypatch.setattr(badge_event_service, "detect", detect)
+    monkeypatch.setattr(pair_service, "update_exposure", broken_exposure)
+
+    email = "aftercommit_voter@example.com"
+    await client.post(f"{settings.API_V1_STR}/auth/register", json={"email": email, "password": "pass123", "full_name": "After"})
+    r = await client.post(f"{settings.API_V1_STR}/auth/login/access-token", data={"username": email, "password": "pass123"})
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+    # El voto ya confirmado no se convierte en 500 y los pasos siguientes se ejecutan
+    r = await client.post(f"{settings.API_V1_STR}/votes/", json={"winner_id": a_id, "loser_id": b_id}, headers=headers)
+    assert r.status_code == 200, r.text
+    assert detected == [a_id]
+
+    db.expire_all()
+    result = await db.execute(select(Profile).filter(Profile.id.in_([a_id, b_id])))
+    assert sorted(p.voted_count for p in result.scalars().all()) == [1, 1]
@@ -0,0 +1,86 @@
+import random
+from collections import Counter
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.weighted_sampler import WeightedSampler
+from app.models.category import Category
+from app.models.profile import Profile, ProfileType, Gender
+from app.models.user import User
+from app.services.pair_service import PairMode, exposure_weight, pair_service
+
+
+def _frequencies(draws):
+    counts = Counter(draws)
+    return {k: v / len(draws) for k, v in counts.items()}
+
+
+def test_sample_follows_weights_and_incremental_updates():
+    random.seed(1234)
+    sampler = WeightedSampler([(10, 1.0), (20, 2.0), (30, 3.0), (40, 4.0)])
+    assert sampler.total == pytest.approx(10.0)
+
+    freq = _frequencies([sampler.sample() for _ in range(40000)])
+    for key, expected in {10: 0.1, 20: 0.2, 30: 0.3, 40: 0.4}.items():
+        assert freq[key] == pytest.approx(expected, abs=0.015)
+
+    # Cambios incrementales: quitar, reponderar y añadir sin reconstruir
+    sampler.remove(40)
+    sampler.set(10, 5.0)
+    sampler.set(50, 2.0)
+    assert len(sampler) == 4 and 40 not in sampler
+    assert sampler.total == pytest.approx(12.0)
+    freq = _frequencies([sampler.sample() for _ in range(40000)])
+    assert 40 not in freq
+    for key, expected in {10: 5 / 12, 20: 2 / 12, 30: 3 / 12, 50: 2 / 12}.items():
+        assert freq[key] == pytest.approx(expected, abs=0.015)
+
+
+def test_sample_pair_draws_second_from_the_rest():
+    random.seed(99)
+    sampler = WeightedSampler([(1, 6.0), (2, 3.0), (3, 1.0)])
+    pairs = [sampler.sample_pair() for _ in range(40000)]
+    assert all(a != b for a, b in pairs)
+    # P(segundo = 2 | primero = 1) = 3 / (3 + 1)
+    after_one = [b for a, b in pairs if a == 1]
+    assert _frequencies(after_one)[2] == pytest.approx(0.75, abs=0.02)
+    assert sampler.total == pytest.approx(10.0)
+
+
+@pytest.mark.asyncio
+async def test_explore_mode_favours_under_voted_profiles(db: AsyncSession):
+    owner = User(email="explore@example.com", hashed_password="x", full_name="Explore", is_active=True)
+    category = Category(name="Explore", slug="explore")
+    db.add_all([owner, category])
+    await db.commit()
+    veterans = [
+        Profile(user_id=owner.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                image_url=f"http://example.com/ex{i}.jpg", voted_count=99, is_active=True, is_approved=True)
+        for i in range(4)
+    ]
+    newcomer = Profile(user_id=owner.id, category_id=category.id, type=ProfileType.REAL, gender=Gender.FEMALE,
+                       image_url="http://example.com/ex-new.jpg", voted_count=0, is_active=True, is_approved=True)
+    db.add_all(veterans + [newcomer])
+    await db.commit()
+
+    random.seed(7)
+    pool = await pair_service.candidate_pool(db, ProfileType.REAL, Gender.FEMALE, category.id, PairMode.EXPLORE)
+    assert len(pool) == 5
+    pairs = await pool.sample(2000)
+    share = sum(newcomer.id in pair for pair in pairs) / len(pairs)
+    # Uniforme daría 2/5; con peso 1 frente a 4 x 1/100 aparece casi siempre
+    assert share > 0.9
+
+    # Los votos que llegan actualizan el peso sin recargar el pool
+    newcomer.voted_count = 99
+    await db.commit()
+    await db.refresh(newcomer)
+    pair_service.update_exposure(newcomer)
+    assert pool.sampler.weight(newcomer.id) == pytest.approx(exposure_weight(99))
+
+    for p in veterans + [newcomer]:
+        p.is_active = False
+    await db.commit()
+    pair_service.update_exposure(*veterans, newcomer)
+    assert len(pool.sampler) == 0
@@ -0,0 +1,40 @@
+"""
+Barrido de badges de la temporada activa.
+
+Recorre el ranking global una sola vez por bloques y otorga en bloque todas
+las badges de ranking ganadas. Si se interrumpe, la siguiente ejecución
+continúa desde el último bloque confirmado (salvo --restart).
+
+Uso:
+    python scripts/badge_sweep.py [--chunk-size 1000] [--restart] [--max-chunks N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.redis_client import init_async_redis, close_async_redis
+from app.db.session import AsyncSessionLocal
+from app.services.badge_sweep import badge_sweep_service
+
+
+async def main(chunk_size: int, restart: bool, max_chunks: int):
+    await init_async_redis()
+    async with AsyncSessionLocal() as db:
+        stats = await badge_sweep_service.sweep(
+            db, chunk_size=chunk_size, restart=restart, max_chunks=max_chunks or None
+        )
+    for key, value in stats.items():
+        print(f"{key}={value}")
+    await close_async_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--restart", action="store_true")
+    parser.add_argument("--max-chunks", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.chunk_size, args.restart, args.max_chunks))
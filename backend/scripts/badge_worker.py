@@ -0,0 +1,48 @@
+"""
+Worker de badges por eventos.
+
+Consume los cruces de umbral de posición que emite el camino del voto,
+otorga las badges correspondientes y envía las notificaciones. Útil para
+correrlo fuera del proceso web (BADGE_WORKER_IN_PROCESS=false).
+
+Uso:
+    python scripts/badge_worker.py [--batch-size 100] [--flush-interval-ms 500]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.redis_client import init_async_redis, close_async_redis
+from app.db.session import AsyncSessionLocal
+from app.services.badge_events import badge_event_service
+
+
+async def main(batch_size: int, flush_interval_ms: int):
+    if batch_size:
+        badge_event_service.batch_size = batch_size
+    if flush_interval_ms:
+        badge_event_service.flush_interval = flush_interval_ms / 1000
+
+    await init_async_redis()
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+    await badge_event_service.run(AsyncSessionLocal, stop_event)
+    print(await badge_event_service.metrics())
+    await close_async_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=0)
+    parser.add_argument("--flush-interval-ms", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.flush_interval_ms))
@@ -11,7 +11,7 @@ import sys, os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from app.main import app
 from app.core.config import settings
-from app.core.redis_client import redis_client
+from app.core.redis_client import init_async_redis, close_async_redis
 from app.db.base import Base
 from app.api.deps import get_async_db, get_db
 from app.models.user import User
@@ -45,6 +45,7 @@ async def setup_data(db: AsyncSession):
     await db.commit()
 
 async def bench():
+    redis_client = await init_async_redis()
     SQLALCHEMY_DATABASE_URL = "sqlite:///./carometro_bench.db"
     ASYNC_SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./carometro_bench.db"
     engine_sync = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
@@ -71,10 +72,8 @@ async def bench():
     async with AsyncClient(transport=transport, base_url="http://test") as client:
         if redis_client:
             try:
-                for key in redis_client.scan_iter("ranking:*"):
-                    redis_client.delete(key)
-                for key in redis_client.scan_iter("pair_candidates:*"):
-                    redis_client.delete(key)
+                async for key in redis_client.scan_iter("ranking:*"):
+                    await redis_client.delete(key)
             except Exception:
                 pass
         t0 = time.perf_counter()
@@ -93,6 +92,7 @@ async def bench():
         print("pair_first_ms", round((p1 - p0) * 1000, 2))
         print("pair_second_ms", round((p2 - p1) * 1000, 2))
     app.dependency_overrides.clear()
+    await close_async_redis()
 
 if __name__ == "__main__":
     asyncio.run(bench())
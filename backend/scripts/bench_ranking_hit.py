@@ -0,0 +1,87 @@
+"""
+Microbenchmark del coste de CPU de un acierto de caché de GET /profiles/ranking.
+
+Compara, por acierto y sin la pila HTTP:
+  - decode: lo que se hacía antes, json.loads del payload, validación
+    contra List[schemas.Profile], re-serialización y gzip (GZipMiddleware).
+  - bytes: lo que se hace ahora, GET de la variante gzip ya guardada y
+    base64 -> bytes.
+
+Uso:
+    python scripts/bench_ranking_hit.py [limit] [iteraciones]
+    python scripts/bench_ranking_hit.py 100 2000
+"""
+import asyncio
+import base64
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fakeredis
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app import schemas
+from app.core import redis_client as redis_module
+from app.core.cache import CacheNamespace
+
+
+def sample_ranking(limit: int):
+    now = datetime.now(timezone.utc).isoformat()
+    return [
+        {
+            "id": i, "type": "real", "gender": "female", "image_url": f"https://cdn.example.com/profiles/{i}.jpg",
+            "elo_score": 1600 - i, "voted_count": 300 + i, "win_count": 150 + i, "user_id": 1000 + i,
+            "category_id": 1, "is_active": True, "is_approved": True, "created_at": now, "updated_at": now,
+        }
+        for i in range(limit)
+    ]
+
+
+def cpu_ms_per_call(fn, iterations: int) -> float:
+    fn()
+    started = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - started) * 1000 / iterations
+
+
+def main(limit: int, iterations: int):
+    # Se escribe con el cliente async de la app y se lee con uno síncrono
+    # sobre el mismo servidor en memoria, para medir solo CPU
+    server = fakeredis.FakeServer()
+    redis_module.async_redis = fakeredis.FakeAsyncRedis(server=server, decode_responses=True)
+    ns = CacheNamespace("bench_ranking", ttl=600, encodings=("gzip",))
+    key = ns.key("real:female:1", limit)
+    asyncio.run(ns.set(key, sample_ranking(limit)))
+    r = fakeredis.FakeRedis(server=server, decode_responses=True)
+    adapter = TypeAdapter(list[schemas.Profile])
+
+    def decode_path():
+        data = json.loads(r.get(key))
+        validated = adapter.validate_python(data)
+        body = json.dumps(jsonable_encoder(validated), separators=(",", ":")).encode()
+        return gzip.compress(body, compresslevel=9)
+
+    def bytes_path():
+        return base64.b64decode(r.get(f"{key}:gzip"))
+
+    same_ids = [p["id"] for p in json.loads(gzip.decompress(bytes_path()))]
+    assert same_ids == [p["id"] for p in json.loads(gzip.decompress(decode_path()))]
+    decode_ms = cpu_ms_per_call(decode_path, iterations)
+    bytes_ms = cpu_ms_per_call(bytes_path, iterations)
+    print(f"limit={limit} iterations={iterations}")
+    print(f"decode_validate_gzip_cpu_ms={decode_ms:.3f}")
+    print(f"stored_bytes_cpu_ms={bytes_ms:.3f}")
+    print(f"cpu_saved_per_hit_ms={decode_ms - bytes_ms:.3f} speedup={decode_ms / bytes_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    n_limit = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    n_iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    main(n_limit, n_iterations)
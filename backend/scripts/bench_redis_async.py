@@ -0,0 +1,148 @@
+"""
+Benchmark de concurrencia del cliente de Redis: síncrono (redis.Redis) frente
+a redis.asyncio con el pool compartido, detrás de un proxy TCP que añade
+~2 ms de latencia por respuesta (como un Redis en otra máquina).
+
+Cada "petición" hace varios GET seguidos (versiones de caché + cuerpo), y se
+lanzan N peticiones concurrentes en el mismo event loop. Con el cliente
+síncrono cada GET bloquea el loop; con el async las esperas se solapan.
+Además se mide el retraso máximo de un tick de 1 ms del loop.
+
+Sin --target se levanta un servidor en memoria (fakeredis TcpFakeServer).
+
+Uso:
+    python scripts/bench_redis_async.py [--concurrency 50,200] [--gets 3] [--latency-ms 2] [--target host:port]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_fake_server() -> tuple:
+    from fakeredis import TcpFakeServer
+
+    address = ("127.0.0.1", free_port())
+    server = TcpFakeServer(address)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return address
+
+
+def start_delay_proxy(target: tuple, latency: float) -> tuple:
+    """Proxy TCP en su propio hilo y loop: el cliente síncrono no lo bloquea."""
+    port = free_port()
+    ready = threading.Event()
+
+    async def pump(reader, writer, delay: float):
+        try:
+            while data := await reader.read(65536):
+                if delay:
+                    await asyncio.sleep(delay)
+                writer.write(data)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle(client_reader, client_writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection(*target)
+        await asyncio.gather(
+            pump(client_reader, upstream_writer, 0),
+            pump(upstream_reader, client_writer, latency),
+        )
+
+    async def serve():
+        server = await asyncio.start_server(handle, "127.0.0.1", port)
+        ready.set()
+        async with server:
+            await server.serve_forever()
+
+    threading.Thread(target=lambda: asyncio.run(serve()), daemon=True).start()
+    ready.wait()
+    return "127.0.0.1", port
+
+
+async def loop_lag(stop: asyncio.Event) -> float:
+    """Retraso máximo (ms) de un tick de 1 ms mientras corre la carga."""
+    worst = 0.0
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        worst = max(worst, (time.perf_counter() - started) * 1000 - 1)
+    return worst
+
+
+async def run_load(get, concurrency: int, gets: int, keys) -> tuple:
+    async def request(i: int):
+        for j in range(gets):
+            await get(keys[(i + j) % len(keys)])
+
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(loop_lag(stop))
+    await asyncio.sleep(0)
+    started = time.perf_counter()
+    await asyncio.gather(*(request(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, await lag_task
+
+
+async def bench(host: str, port: int, concurrencies, gets: int):
+    sync_client = redis.Redis(host=host, port=port, decode_responses=True)
+    pool = aioredis.BlockingConnectionPool(
+        host=host, port=port, decode_responses=True,
+        max_connections=settings.REDIS_MAX_CONNECTIONS, timeout=settings.REDIS_POOL_TIMEOUT,
+    )
+    async_client = aioredis.Redis(connection_pool=pool)
+
+    keys = [f"bench:redis_async:{i}" for i in range(100)]
+    await async_client.mset({k: "x" * 200 for k in keys})
+
+    async def sync_get(key):
+        return sync_client.get(key)
+
+    print(f"{'client':>6} {'concurrency':>11} {'gets':>6} {'elapsed_ms':>10} {'req_per_s':>9} {'max_loop_lag_ms':>15}")
+    for concurrency in concurrencies:
+        for name, get in (("sync", sync_get), ("async", async_client.get)):
+            await run_load(get, concurrency, 1, keys)  # calentar conexiones del pool
+            elapsed, lag = await run_load(get, concurrency, gets, keys)
+            print(f"{name:>6} {concurrency:>11} {concurrency * gets:>6} {elapsed * 1000:>10.1f} "
+                  f"{concurrency / elapsed:>9.0f} {lag:>15.1f}")
+
+    await async_client.delete(*keys)
+    await async_client.aclose(close_connection_pool=True)
+    sync_client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", default="50,200")
+    parser.add_argument("--gets", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    parser.add_argument("--target", default="")
+    args = parser.parse_args()
+
+    if args.target:
+        target_host, target_port = args.target.rsplit(":", 1)
+        target = (target_host, int(target_port))
+    else:
+        target = start_fake_server()
+    proxy = start_delay_proxy(target, args.latency_ms / 1000)
+    asyncio.run(bench(*proxy, [int(c) for c in args.concurrency.split(",")], args.gets))
@@ -0,0 +1,161 @@
+"""
+Benchmark de la serialización de los listados calientes (rankings y pares,
+notificaciones, seguidores) con 50/500/5000 filas.
+
+Compara, por endpoint y sin la pila HTTP:
+  - orm: lo que se hacía antes, entidades ORM, schemas.X.model_validate
+    (from_attributes), jsonable_encoder y json.dumps; los seguidores además
+    con tres consultas de contadores por usuario.
+  - projection: columnas como filas planas, TypeAdapter precompilado y
+    dump_json (el camino de FastAPI con response_model); los seguidores con
+    los contadores en subconsultas correlacionadas.
+
+Uso:
+    python scripts/bench_serialization.py [iteraciones]
+    python scripts/bench_serialization.py 5
+"""
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.future import select
+from sqlalchemy.orm import sessionmaker
+
+from app import models, schemas
+from app.api.api_v1.endpoints.users import _user_list_query
+from app.db.base import Base
+from app.models.profile import Profile, ProfileType, Gender
+from app.services.profile_card_service import CARD_COLUMNS
+
+DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite+aiosqlite:///./carometro_serialization.db")
+SIZES = (50, 500, 5000)
+
+
+async def seed(db: AsyncSession, n: int) -> int:
+    target = models.User(email="target@example.com", hashed_password="x", full_name="Target", is_active=True)
+    db.add(target)
+    await db.flush()
+    users = [models.User(email=f"u{i}@example.com", hashed_password="x", full_name=f"User {i}", is_active=True)
+             for i in range(n)]
+    db.add_all(users)
+    await db.flush()
+    db.add_all([models.Follow(follower_id=u.id, following_id=target.id) for u in users])
+    db.add_all([
+        models.Notification(user_id=target.id, type="badge", payload={"badge": i, "profile_id": i}, is_read=i % 2 == 0)
+        for i in range(n)
+    ])
+    db.add_all([
+        Profile(type=ProfileType.REAL, gender=Gender.FEMALE, image_url=f"https://cdn.example.com/p/{i}.jpg",
+                elo_score=1200 + i % 400, is_active=True, is_approved=True)
+        for i in range(n)
+    ])
+    await db.commit()
+    return target.id
+
+
+def orm_dump(model, objs) -> bytes:
+    return json.dumps(jsonable_encoder([model.model_validate(o) for o in objs])).encode()
+
+
+def adapter_dump(adapter: TypeAdapter, rows) -> bytes:
+    return adapter.dump_json(adapter.validate_python(rows))
+
+
+async def bench(session_factory, target_id: int, limit: int, iterations: int):
+    profiles_adapter = TypeAdapter(List[schemas.Profile])
+    notifications_adapter = TypeAdapter(List[schemas.Notification])
+    users_adapter = TypeAdapter(List[schemas.User])
+    N, U, F = models.Notification, models.User, models.Follow
+
+    async def profiles_orm(db):
+        result = await db.execute(select(Profile).order_by(Profile.elo_score.desc()).limit(limit))
+        return orm_dump(schemas.Profile, result.scalars().all())
+
+    async def profiles_projection(db):
+        result = await db.execute(select(*CARD_COLUMNS).order_by(Profile.elo_score.desc()).limit(limit))
+        return adapter_dump(profiles_adapter, result.mappings().all())
+
+    async def notifications_orm(db):
+        result = await db.execute(select(N).filter(N.user_id == target_id).order_by(N.created_at.desc()).limit(limit))
+        return orm_dump(schemas.Notification, result.scalars().all())
+
+    async def notifications_projection(db):
+        result = await db.execute(
+            select(N.id, N.user_id, N.type, N.payload, N.is_read, N.created_at)
+            .filter(N.user_id == target_id).order_by(N.created_at.desc()).limit(limit)
+        )
+        return adapter_dump(notifications_adapter, result.mappings().all())
+
+    async def followers_orm(db):
+        result = await db.execute(
+            select(U).join(F, F.follower_id == U.id).filter(F.following_id == target_id).limit(limit)
+        )
+        users = []
+        for u in result.scalars().all():
+            counts = []
+            for stmt in (
+                select(func.count(F.id)).filter(F.following_id == u.id),
+                select(func.count(F.id)).filter(F.follower_id == u.id),
+                select(func.count(models.Vote.id)).filter(models.Vote.voter_id == u.id),
+            ):
+                counts.append((await db.execute(stmt)).scalar() or 0)
+            users.append(schemas.User(
+                id=u.id, email=u.email, full_name=u.full_name, avatar_url=u.avatar_url, is_active=u.is_active,
+                is_superuser=u.is_superuser, follower_count=counts[0], following_count=counts[1],
+                votes_cast_count=counts[2],
+            ))
+        return json.dumps(jsonable_encoder(users)).encode()
+
+    async def followers_projection(db):
+        result = await db.execute(_user_list_query(F.follower_id == U.id, F.following_id == target_id).limit(limit))
+        return adapter_dump(users_adapter, result.mappings().all())
+
+    cases = [
+        ("ranking/pair", profiles_orm, profiles_projection),
+        ("notifications", notifications_orm, notifications_projection),
+        ("followers", followers_orm, followers_projection),
+    ]
+    for name, old, new in cases:
+        timings = []
+        for fn in (old, new):
+            async with session_factory() as db:
+                body = await fn(db)
+            started = time.perf_counter()
+            for _ in range(iterations):
+                # Sesión nueva en cada iteración, como en una petición
+                async with session_factory() as db:
+                    await fn(db)
+            timings.append((time.perf_counter() - started) * 1000 / iterations)
+            rows = len(json.loads(body))
+        assert rows == limit, (name, rows)
+        orm_ms, projection_ms = timings
+        print(f"{name:>13} {limit:>5} {orm_ms:>9.2f} {projection_ms:>12.2f} {orm_ms / projection_ms:>7.1f}x")
+
+
+async def run(iterations: int):
+    engine = create_async_engine(DATABASE_URL)
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with session_factory() as db:
+        target_id = await seed(db, max(SIZES))
+
+    print(f"{'endpoint':>13} {'rows':>5} {'orm_ms':>9} {'projection_ms':>12} {'speedup':>7}")
+    for limit in SIZES:
+        await bench(session_factory, target_id, limit, iterations)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    n_iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    asyncio.run(run(n_iterations))
@@ -0,0 +1,92 @@
+"""
+Prueba de carga de la caché de rankings ante estampidas: en cada ronda se
+invalida la vista (como hace cada voto) y se lanzan N peticiones
+concurrentes a GET /profiles/ranking, cada una con su propia sesión.
+Cuenta las consultas de ranking que llegan a la BD por ronda.
+
+Uso:
+    python scripts/load_test_stampede.py [concurrencia] [rondas]
+    python scripts/load_test_stampede.py 200 10
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.api.deps import get_async_db
+from app.core.config import settings
+from app.core.redis_client import init_async_redis, close_async_redis
+from app.db.base import Base
+from app.main import app
+from app.models.profile import Profile, ProfileType, Gender
+from app.services.ranking_service import ranking_cache, ranking_service
+
+DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite+aiosqlite:///./carometro_stampede.db")
+
+
+async def run(concurrency: int, rounds: int):
+    await init_async_redis()
+    is_sqlite = DATABASE_URL.startswith("sqlite")
+    engine = create_async_engine(
+        DATABASE_URL, poolclass=NullPool,
+        connect_args={"check_same_thread": False, "timeout": 30} if is_sqlite else {},
+    )
+    session_factory = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    async with session_factory() as db:
+        db.add_all([
+            Profile(type=ProfileType.REAL, gender=Gender.FEMALE, image_url=f"http://example.com/stampede/{i}.jpg",
+                    elo_score=1200 + (i % 300), is_active=True, is_approved=True)
+            for i in range(2000)
+        ])
+        await db.commit()
+        sample = await db.get(Profile, 1)
+
+    async def override_get_async_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    queries = []
+
+    def capture(conn, cursor, statement, *args):
+        if statement.startswith("SELECT profile.id"):
+            queries.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", capture)
+    url = f"{settings.API_V1_STR}/profiles/ranking?gender=female&limit=100"
+    print(f"{'round':>5} {'requests':>8} {'db_queries':>10} {'p50_ms':>8} {'max_ms':>8}")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        async def timed_get():
+            t0 = time.perf_counter()
+            resp = await client.get(url)
+            resp.raise_for_status()
+            return (time.perf_counter() - t0) * 1000
+
+        for n in range(1, rounds + 1):
+            queries.clear()
+            await ranking_service.invalidate_profiles(sample)
+            latencies = sorted(await asyncio.gather(*(timed_get() for _ in range(concurrency))))
+            print(f"{n:>5} {concurrency:>8} {len(queries):>10} {latencies[len(latencies) // 2]:>8.2f} {latencies[-1]:>8.2f}")
+
+    print(ranking_cache.snapshot())
+    app.dependency_overrides.clear()
+    await engine.dispose()
+    await close_async_redis()
+
+
+if __name__ == "__main__":
+    n_concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    n_rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    asyncio.run(run(n_concurrency, n_rounds))
@@ -0,0 +1,35 @@
+"""
+Reconstruye los pools de candidatos de Redis (un SET por tipo/género/categoría)
+que usa la selección de emparejamientos, a partir de la base de datos.
+
+Uso:
+    python scripts/rebuild_pair_pools.py [--chunk-size 5000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.redis_client import init_async_redis, close_async_redis
+from app.db.session import AsyncSessionLocal
+from app.services.pair_service import pair_service
+
+
+async def main(chunk_size: int):
+    await init_async_redis()
+    t0 = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        loaded = await pair_service.rebuild_pools(db, chunk_size=chunk_size)
+    elapsed = time.perf_counter() - t0
+    print(f"loaded={loaded} elapsed_s={elapsed:.2f} ready={await pair_service.pools_ready()}")
+    await close_async_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.chunk_size))
@@ -0,0 +1,47 @@
+"""
+Archivo y reinicio de los ratings de temporadas pasadas.
+
+Al abrir una temporada solo cambia la activa; los perfiles que siguen con
+valores de la anterior se leen como 1200 hasta que este barrido los copia a
+profile_season_rating y los reinicia, un bloque por transacción. Si se
+interrumpe, la siguiente ejecución continúa desde el último bloque
+confirmado (salvo --restart).
+
+Uso:
+    python scripts/reset_season_ratings.py [--chunk-size 1000] [--restart] [--max-chunks N]
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.redis_client import init_async_redis, close_async_redis
+from app.db.session import AsyncSessionLocal
+from app.services.rating_service import rating_service
+from app.services.season_service import season_service
+
+
+async def main(chunk_size: int, restart: bool, max_chunks: int):
+    await init_async_redis()
+    async with AsyncSessionLocal() as db:
+        season = await season_service.get_active_season(db)
+        if not season:
+            print("no active season")
+        else:
+            stats = await rating_service.reset_stale(
+                db, season.id, chunk_size=chunk_size, restart=restart, max_chunks=max_chunks or None
+            )
+            for key, value in stats.items():
+                print(f"{key}={value}")
+    await close_async_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--restart", action="store_true")
+    parser.add_argument("--max-chunks", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.chunk_size, args.restart, args.max_chunks))
@@ -0,0 +1,51 @@
+"""
+Reparte de nuevo Profile.random_key, la posición usada para muestrear los
+pools grandes dentro de la BD. Los votos no la tocan: un perfil que cae
+justo después de un hueco grande entre claves sale más a menudo, y
+barajarlas de vez en cuando (p. ej. una vez al día) reparte ese sesgo.
+
+Se recorre la tabla por id en bloques, con una transacción por bloque.
+
+Uso:
+    python scripts/reshuffle_random_keys.py [--chunk-size 5000]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy import update
+from sqlalchemy.future import select
+
+from app.db.session import AsyncSessionLocal
+from app.models.profile import Profile
+
+
+async def main(chunk_size: int):
+    t0 = time.perf_counter()
+    updated = 0
+    last_id = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            ids = (await db.execute(
+                select(Profile.id).filter(Profile.id > last_id).order_by(Profile.id).limit(chunk_size)
+            )).scalars().all()
+            if not ids:
+                break
+            await db.execute(update(Profile), [{"id": pid, "random_key": random.random()} for pid in ids])
+            await db.commit()
+            updated += len(ids)
+            last_id = ids[-1]
+    elapsed = time.perf_counter() - t0
+    print(f"updated={updated} elapsed_s={elapsed:.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    args = parser.parse_args()
+    asyncio.run(main(args.chunk_size))
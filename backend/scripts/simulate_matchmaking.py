@@ -0,0 +1,128 @@
+"""
+Simulación offline del emparejamiento: cuántos votos hacen falta para que el
+ranking ELO alcance una correlación de rangos (Spearman) objetivo con la
+habilidad real, emparejando de forma uniforme o con mode=close.
+
+No usa BD ni Redis: reproduce en memoria la selección de PairService
+(ancla aleatoria + rival dentro de la ventana, mismo window_rank) y la
+actualización de RankingService.calculate_elo.
+
+Uso:
+    python scripts/simulate_matchmaking.py [--profiles 500] [--target 0.9]
+        [--window 100] [--spread 200] [--max-votes 200000] [--seeds 3]
+"""
+import argparse
+import bisect
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.models.profile import DEFAULT_ELO
+from app.services.pair_service import window_rank
+from app.services.ranking_service import ranking_service
+
+
+def _ranks(values):
+    """Rangos medios (empates comparten rango)."""
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    i = 0
+    while i < len(order):
+        j = i
+        while j + 1 < len(order) and values[order[j + 1]] == values[order[i]]:
+            j += 1
+        for k in range(i, j + 1):
+            ranks[order[k]] = (i + j) / 2
+        i = j + 1
+    return ranks
+
+
+def spearman(a, b) -> float:
+    ra, rb = _ranks(a), _ranks(b)
+    n = len(a)
+    ma, mb = sum(ra) / n, sum(rb) / n
+    cov = sum((x - ma) * (y - mb) for x, y in zip(ra, rb))
+    va = sum((x - ma) ** 2 for x in ra)
+    vb = sum((y - mb) ** 2 for y in rb)
+    return cov / (va * vb) ** 0.5 if va and vb else 0.0
+
+
+class SortedRatings:
+    """Índice (elo, id) ordenado, como el sorted set del leaderboard."""
+
+    def __init__(self, ratings):
+        self.keys = sorted((r, pid) for pid, r in enumerate(ratings))
+
+    def update(self, pid, old, new):
+        del self.keys[bisect.bisect_left(self.keys, (old, pid))]
+        bisect.insort(self.keys, (new, pid))
+
+    def close_pair(self, window):
+        anchor = random.randrange(len(self.keys))
+        score = self.keys[anchor][0]
+        lo = bisect.bisect_left(self.keys, (score - window, -1))
+        hi = bisect.bisect_right(self.keys, (score + window, len(self.keys)))
+        return self.keys[anchor][1], self.keys[window_rank(anchor, lo, hi)][1]
+
+
+def simulate(mode, skills, window, target, max_votes, check_every):
+    n = len(skills)
+    ratings = [DEFAULT_ELO] * n
+    index = SortedRatings(ratings)
+    for votes in range(1, max_votes + 1):
+        if mode == "close":
+            a, b = index.close_pair(window)
+        else:
+            a, b = random.sample(range(n), 2)
+        p_a = 1 / (1 + 10 ** ((skills[b] - skills[a]) / 400))
+        winner, loser = (a, b) if random.random() < p_a else (b, a)
+        new_w, new_l = ranking_service.calculate_elo(ratings[winner], ratings[loser])
+        index.update(winner, ratings[winner], new_w)
+        index.update(loser, ratings[loser], new_l)
+        ratings[winner], ratings[loser] = new_w, new_l
+        if votes % check_every == 0:
+            rho = spearman(skills, ratings)
+            if rho >= target:
+                return votes, rho
+    return None, spearman(skills, ratings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=500)
+    parser.add_argument("--target", type=float, default=0.9)
+    parser.add_argument("--window", type=int, default=100)
+    parser.add_argument("--spread", type=float, default=200, help="desviación de la habilidad real (puntos ELO)")
+    parser.add_argument("--max-votes", type=int, default=200000)
+    parser.add_argument("--check-every", type=int, default=0, help="por defecto, una vez por perfil")
+    parser.add_argument("--seeds", type=int, default=3)
+    args = parser.parse_args()
+    check_every = args.check_every or args.profiles
+
+    print(f"profiles={args.profiles} target_rho={args.target} window={args.window} spread={args.spread}")
+    results = {"uniform": [], "close": []}
+    for seed in range(args.seeds):
+        rng = random.Random(seed)
+        skills = [rng.gauss(DEFAULT_ELO, args.spread) for _ in range(args.profiles)]
+        for mode in results:
+            random.seed(seed)
+            t0 = time.perf_counter()
+            votes, rho = simulate(mode, skills, args.window, args.target, args.max_votes, check_every)
+            elapsed = time.perf_counter() - t0
+            results[mode].append(votes)
+            print(f"seed={seed} mode={mode} votes={votes if votes else 'not reached'} rho={rho:.3f} elapsed_s={elapsed:.2f}")
+
+    for mode, votes in results.items():
+        reached = [v for v in votes if v]
+        if not reached:
+            print(f"mode={mode} reached=0/{len(votes)}")
+            continue
+        mean = sum(reached) / len(reached)
+        print(f"mode={mode} reached={len(reached)}/{len(votes)} mean_votes={mean:.0f} votes_per_profile={mean / args.profiles:.1f}")
+
+
+if __name__ == "__main__":
+    main()
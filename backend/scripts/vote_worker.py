@@ -0,0 +1,47 @@
+"""
+Worker de ingesta de votos (modo VOTE_INGESTION_MODE=queue).
+
+Consume el stream de votos en micro-lotes y los aplica con una transacción
+por lote. Útil para correrlo fuera del proceso web (VOTE_WORKER_IN_PROCESS=false).
+
+Uso:
+    python scripts/vote_worker.py [--batch-size 500] [--flush-interval-ms 100]
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.core.redis_client import init_async_redis, close_async_redis
+from app.db.session import AsyncSessionLocal
+from app.services.vote_ingestion import vote_ingestion_service
+
+
+async def main(batch_size: int, flush_interval_ms: int):
+    if batch_size:
+        vote_ingestion_service.batch_size = batch_size
+    if flush_interval_ms:
+        vote_ingestion_service.flush_interval = flush_interval_ms / 1000
+
+    await init_async_redis()
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except NotImplementedError:
+            pass
+    await vote_ingestion_service.run(AsyncSessionLocal, stop_event)
+    print(await vote_ingestion_service.metrics())
+    await close_async_redis()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=0)
+    parser.add_argument("--flush-interval-ms", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size, args.flush_interval_ms))